@@ -0,0 +1,136 @@
+# aggregator.py
+import argparse
+import asyncio
+import ujson as json
+import logging
+import websockets
+from typing import Dict, Any, List
+
+from analyzer import ValueServer, value_key
+from cluster import (Partition, SERVER_PORT, assign_partitions,
+                     enabled_bookmakers, load_cluster)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Пауза перед повторным подключением к экземпляру, секунд
+RECONNECT_DELAY = 0.5
+
+
+class ValueAggregator(ValueServer):
+    """
+    Объединяет потоки значений экземпляров анализатора в один сервер.
+
+    Каждый экземпляр (python analyzer.py --cluster ... --instance ...)
+    анализирует свой раздел букмекеров и видов спорта и раздает все свои
+    значения на своем порту. Агрегатор подключается к экземплярам как
+    обычный клиент, хранит последний список каждого экземпляра и отдает
+    объединение клиентам по протоколу 8765: подписки и запросы top-K
+    работают так же, как у одиночного анализатора. Запрос книги
+    коэффициентов ({"book": pinnacle_id}) агрегатор не обслуживает: книгу
+    события отдает экземпляр, и в ней только букмекеры его раздела.
+    """
+
+    def __init__(self, partitions: Dict[str, Partition],
+                 port: int = SERVER_PORT):
+        super().__init__(port)
+        self.partitions = partitions
+        # Ключи значений, пришедших от каждого экземпляра
+        self.instance_keys: Dict[str, set] = {name: set()
+                                              for name in partitions}
+
+    async def start(self):
+        tasks = [
+            asyncio.create_task(self.connect_to_instance(partition))
+            for partition in self.partitions.values()
+        ]
+        tasks += [
+            asyncio.create_task(self.broadcast_data_loop()),
+            asyncio.create_task(self.start_websocket_server()),
+        ]
+        await asyncio.gather(*tasks)
+
+    async def connect_to_instance(self, partition: Partition):
+        uri = f"ws://localhost:{partition.port}"
+        while True:
+            try:
+                async with websockets.connect(
+                        uri, max_size=None, timeout=10, ping_interval=20,
+                        ping_timeout=10
+                ) as websocket:
+                    logger.info(f"Connected to {partition.name} on port "
+                                f"{partition.port}")
+                    async for message in websocket:
+                        data = json.loads(message)
+                        if isinstance(data, list):
+                            await self.merge_values(partition.name, data)
+            except (websockets.exceptions.ConnectionClosed,
+                    asyncio.TimeoutError, OSError) as e:
+                logger.warning(
+                    f"Connection to {partition.name} closed. Reconnecting...")
+                logger.debug(f"Connection exception details: {e}")
+            except Exception as e:
+                logger.exception(
+                    f"Error in connect_to_instance for {partition.name}: {e}")
+            # Значения недоступного экземпляра устаревают, не дожидаясь его
+            await self.drop_instance(partition.name)
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def merge_values(self, name: str, data: List[Dict[str, Any]]):
+        """
+        Заменяет значения экземпляра его новым списком.
+
+        :param name: Имя экземпляра
+        :param data: Все текущие значения экземпляра
+        """
+        keys = set()
+        async with self.values_lock:
+            for value in data:
+                key = value_key(value['bookmaker'], value['other_id'],
+                                value['outcome'], value['line'])
+                keys.add(key)
+                self.values[key] = value
+                self.yield_index.update(key, value)
+            for key in self.instance_keys[name] - keys:
+                if key in self.values:
+                    self.drop_value(key)
+            self.instance_keys[name] = keys
+        self.data_updated_event.set()
+
+    async def drop_instance(self, name: str):
+        async with self.values_lock:
+            keys, self.instance_keys[name] = self.instance_keys[name], set()
+            for key in keys:
+                if key in self.values:
+                    self.drop_value(key)
+        if keys:
+            self.data_updated_event.set()
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description='Агрегатор значений экземпляров анализатора')
+    parser.add_argument('--config', default='bookmakers.json',
+                        help='Конфиг букмекеров')
+    parser.add_argument('--cluster', default='analyzer_cluster.json',
+                        help='Конфиг кластера экземпляров (см. cluster.py)')
+    args = parser.parse_args()
+
+    with open(args.config, 'r') as f:
+        config = json.load(f)
+    cluster = load_cluster(args.cluster)
+    partitions = assign_partitions(cluster, enabled_bookmakers(config))
+    for partition in partitions.values():
+        logger.info(f"Instance {partition.name} on port {partition.port}: "
+                    f"bookmakers {sorted(partition.bookmakers)}, sports "
+                    f"{sorted(partition.sports) if partition.sports else 'all'}")
+
+    aggregator = ValueAggregator(partitions, cluster.get('port', SERVER_PORT))
+    await aggregator.start()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
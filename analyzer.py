@@ -1,11 +1,20 @@
 # analyzer.py
+import argparse
 import asyncio
+import heapq
+import re
 import ujson as json
 import logging
 import websockets
 import time
-from typing import Dict, Any
+from bisect import bisect_left, insort
+from collections import namedtuple
+from itertools import islice, takewhile
+from typing import Dict, Any, List, Optional
+from cluster import (Partition, SERVER_PORT, assign_partitions,
+                     enabled_bookmakers, load_cluster)
 from matching.match_finder import MatchFinder
+from models import Match
 
 # Настройка логирования
 logging.basicConfig(
@@ -14,13 +23,363 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Очередь входящих сообщений парсеров: при заполнении чтение из сокетов
+# приостанавливается, пока писатель не догонит
+INGEST_QUEUE_SIZE = 1000
+# Сколько сообщений писатель применяет за один проход
+INGEST_BATCH_SIZE = 200
+# Периодичность удаления устаревших матчей и значений, секунд. Проход
+# снимает с кучи сроков только истекшие записи, поэтому может быть частым
+CLEANUP_INTERVAL = 0.5
+# Периодичность полного анализа (прематч и страховочный проход по лайву)
+ANALYZE_INTERVAL = 2
+# Сколько live-лейн ждет после первого обновления, собирая соседние
+LIVE_DEBOUNCE = 0.075
 
-class AdvancedAnalyzer:
-    def __init__(self, config_path: str):
+# Подписка клиента сервера 8765. Клиент присылает
+# {"subscribe": {"bookmakers": [...], "sports": [...], "type_event": [...],
+#                "min_yield": 0, "outcomes": [...]}};
+# отсутствующее поле (None) - без ограничения. Без подписки клиент
+# получает все значения, как раньше. Запрос {"top": {"k": 20, ...}} с теми
+# же полями возвращает лучшие значения по доходности (см. YieldIndex).
+# Запрос {"book": pinnacle_id} возвращает книгу коэффициентов события
+# (см. AdvancedAnalyzer.event_book).
+SubscriptionFilter = namedtuple('SubscriptionFilter', [
+    'bookmakers', 'sports', 'type_event', 'min_yield', 'outcomes'])
+DEFAULT_FILTER = SubscriptionFilter(None, None, None, None, None)
+
+# Семейства исходов (см. "Стандарт перевода данных"): в поле outcomes
+# подписки можно указать семейство или конкретный тип исхода
+OUTCOME_FAMILIES = {
+    '1': '1X2', 'X': '1X2', '2': '1X2',
+    'AH1': 'AH', 'AH2': 'AH',
+    'O': 'TOTAL', 'U': 'TOTAL',
+    'THO': 'TEAM_TOTAL', 'THU': 'TEAM_TOTAL',
+    'TAO': 'TEAM_TOTAL', 'TAU': 'TEAM_TOTAL',
+    'HTO': 'TEAM_TOTAL', 'HTU': 'TEAM_TOTAL',
+    'ATO': 'TEAM_TOTAL', 'ATU': 'TEAM_TOTAL',
+}
+# Префикс периода: "1HO" - тотал первого тайма
+PERIOD_PREFIX = re.compile(r'^\d+H(?=.)')
+
+
+def value_key(bookmaker: str, other_id: str, outcome: str, line) -> str:
+    """Ключ значения в values: "{bookmaker}_{other_id}_{outcome}_{line}"."""
+    return f"{bookmaker}_{other_id}_{outcome}_{line}"
+
+
+def outcome_family(outcome_type: str) -> str:
+    outcome_type = PERIOD_PREFIX.sub('', outcome_type or '')
+    return OUTCOME_FAMILIES.get(outcome_type, outcome_type)
+
+
+def parse_subscription(message: Dict[str, Any]) -> SubscriptionFilter:
+    """
+    Разбирает сообщение подписки клиента.
+
+    :param message: {"subscribe": {...}}
+    :return: SubscriptionFilter
+    :raises ValueError: если сообщение не является подпиской
+    """
+    subscription = message.get('subscribe') if isinstance(message, dict) else None
+    if not isinstance(subscription, dict):
+        raise ValueError("expected {\"subscribe\": {...}}")
+
+    def as_set(field, lower=False):
+        values = subscription.get(field)
+        if values is None:
+            return None
+        if isinstance(values, str):
+            values = [values]
+        if not isinstance(values, list) or not all(
+                isinstance(value, str) for value in values):
+            raise ValueError(f"{field}: expected a string or a list of strings")
+        return frozenset(value.lower() if lower else value for value in values)
+
+    min_yield = subscription.get('min_yield')
+    return SubscriptionFilter(
+        bookmakers=as_set('bookmakers'),
+        sports=as_set('sports'),
+        type_event=as_set('type_event', lower=True),
+        min_yield=float(min_yield) if min_yield is not None else None,
+        outcomes=as_set('outcomes'),
+    )
+
+
+def matches_filter(value: Dict[str, Any],
+                   subscription: SubscriptionFilter) -> bool:
+    if subscription.bookmakers is not None and \
+            value.get('bookmaker') not in subscription.bookmakers:
+        return False
+    if subscription.sports is not None and \
+            value.get('sport') not in subscription.sports:
+        return False
+    if subscription.type_event is not None and \
+            value.get('type_event') not in subscription.type_event:
+        return False
+    if subscription.min_yield is not None and \
+            value.get('yield', 0) < subscription.min_yield:
+        return False
+    if subscription.outcomes is not None:
+        outcome = value.get('outcome')
+        if outcome not in subscription.outcomes and \
+                outcome_family(outcome) not in subscription.outcomes:
+            return False
+    return True
+
+
+class YieldIndex:
+    """
+    Упорядоченный по доходности индекс значений.
+
+    Значения разбиты на разделы (bookmaker, sport, type_event); внутри
+    раздела записи (-yield, key) лежат в отсортированном списке, который
+    обновляется при каждом изменении значения. Лучшие значения по нескольким
+    разделам собираются слиянием (heapq.merge), так что запрос top-K
+    просматривает K записей, а не все значения.
+    """
+
+    def __init__(self):
+        self.partitions: Dict[tuple, list] = {}
+        # key -> (раздел, запись) для удаления и перемещения значения
+        self.entries: Dict[str, tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def update(self, key: str, value: Dict[str, Any]):
+        partition = (value.get('bookmaker'), value.get('sport'),
+                     value.get('type_event'))
+        current = (partition, (-value['yield'], key))
+        previous = self.entries.get(key)
+        if previous == current:
+            return
+        if previous is not None:
+            self.remove_entry(previous)
+        insort(self.partitions.setdefault(partition, []), current[1])
+        self.entries[key] = current
+
+    def remove(self, key: str):
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.remove_entry(previous)
+
+    def remove_entry(self, previous: tuple):
+        partition, entry = previous
+        entries = self.partitions[partition]
+        del entries[bisect_left(entries, entry)]
+        if not entries:
+            del self.partitions[partition]
+
+    def top(self, k: Optional[int] = None,
+            subscription: SubscriptionFilter = DEFAULT_FILTER,
+            values: Dict[str, Any] = None) -> List[str]:
+        """
+        Ключи лучших значений по убыванию доходности.
+
+        :param k: Сколько значений вернуть (None - все)
+        :param subscription: Ограничения по букмекерам, видам спорта,
+                             type_event, минимальной доходности и исходам
+        :param values: Словарь значений, нужен только для фильтра по исходам
+        :return: Список ключей
+        """
+        sources = [
+            entries for (bookmaker, sport, type_event), entries in
+            self.partitions.items()
+            if (subscription.bookmakers is None or bookmaker in subscription.bookmakers)
+            and (subscription.sports is None or sport in subscription.sports)
+            and (subscription.type_event is None or type_event in subscription.type_event)
+        ]
+        entries = heapq.merge(*sources)
+        if subscription.min_yield is not None:
+            entries = takewhile(
+                lambda entry: -entry[0] >= subscription.min_yield, entries)
+        keys = (key for neg_yield, key in entries)
+        if subscription.outcomes is not None:
+            keys = (key for key in keys if matches_filter(values[key], subscription))
+        return list(islice(keys, k))
+
+
+class ValueServer:
+    """
+    Сервер значений (по умолчанию порт 8765): рассылка клиентам с учетом
+    подписок и ответы на запросы top-K. Общая часть анализатора и
+    агрегатора экземпляров (см. aggregator.py); values наполняют наследники.
+    """
+
+    def __init__(self, port: int = SERVER_PORT):
+        self.port = port
+        self.values: Dict[str, Any] = {}
+        # Блокировка для синхронизации доступа к values
+        self.values_lock = asyncio.Lock()
+
+        # Set of connected clients
+        self.connected_clients = set()
+        # Подписки клиентов; клиент без подписки получает все значения
+        self.client_filters: Dict[Any, SubscriptionFilter] = {}
+        # Индекс values по доходности для запросов top-K
+        self.yield_index = YieldIndex()
+        self.clients_lock = asyncio.Lock()
+
+        # Event to signal data updates
+        self.data_updated_event = asyncio.Event()
+
+    async def start_websocket_server(self):
+        server = await websockets.serve(
+            self.websocket_handler,
+            "localhost",
+            self.port,
+            max_size=None,
+            ping_interval=10,
+            ping_timeout=10
+        )
+        logger.info(f"WebSocket server started on ws://localhost:{self.port}")
+        await server.wait_closed()
+
+    async def broadcast_data_loop(self):
+        while True:
+            await self.data_updated_event.wait()
+            self.data_updated_event.clear()
+
+            async with self.values_lock:
+                data = list(self.values.values())
+            logger.info(f"Broadcasting data len {len(data)}")
+
+            async with self.clients_lock:
+                clients = list(self.connected_clients)
+
+            if not clients:
+                continue  # Нет подключенных клиентов, пропускаем отправку
+
+            # Данные фильтруются и кодируются один раз на каждую подписку,
+            # клиенты с одинаковой подпиской получают одну и ту же строку
+            payloads = {}
+            send_tasks = []
+            for client in clients:
+                subscription = self.client_filters.get(client, DEFAULT_FILTER)
+                json_data = payloads.get(subscription)
+                if json_data is None:
+                    if subscription == DEFAULT_FILTER:
+                        selected = data
+                    else:
+                        selected = [value for value in data
+                                    if matches_filter(value, subscription)]
+                    json_data = payloads[subscription] = json.dumps(
+                        selected, default=str)
+                # Создаем задачи для отправки данных всем клиентам параллельно
+                send_tasks.append(self.send_to_client(client, json_data))
+
+            # Запускаем все задачи параллельно и ждем их завершения
+            await asyncio.gather(*send_tasks, return_exceptions=True)
+
+    async def send_to_client(self, client, data):
+        try:
+            await client.send(data)
+
+        except websockets.exceptions.ConnectionClosed:
+            logger.info(f"Клиент отключился: {client.remote_address}")
+            async with self.clients_lock:
+                self.connected_clients.remove(client)
+        except Exception as e:
+            logger.error(
+                f"Ошибка при отправке данных клиенту {client.remote_address}: {e}")
+
+    async def websocket_handler(self, websocket, path):
+        logger.info(f"New client connected: {websocket.remote_address}")
+        try:
+            async with self.clients_lock:
+                self.connected_clients.add(websocket)
+            # Сообщения от клиента - подписки и запросы (top-K, книга)
+            async for message in websocket:
+                try:
+                    request = json.loads(message)
+                    if await self.handle_request(websocket, request):
+                        continue
+                    subscription = parse_subscription(request)
+                except (ValueError, TypeError) as e:
+                    logger.warning(
+                        f"Invalid request from {websocket.remote_address}: {e}")
+                    continue
+                async with self.clients_lock:
+                    self.client_filters[websocket] = subscription
+                logger.info(
+                    f"Client {websocket.remote_address} subscribed: {subscription}")
+                self.data_updated_event.set()
+        except websockets.exceptions.ConnectionClosed:
+            logger.info(f"Client disconnected: {websocket.remote_address}")
+        except Exception as e:
+            logger.error(f"Unhandled error in websocket_handler: {e}")
+        finally:
+            async with self.clients_lock:
+                self.connected_clients.discard(websocket)
+                self.client_filters.pop(websocket, None)
+            logger.info(
+                f"Client connection closed: {websocket.remote_address}")
+
+    def drop_value(self, key: str):
+        """Удаляет значение из values и индекса (вызывается под values_lock)."""
+        del self.values[key]
+        self.yield_index.remove(key)
+
+    def top_values(self, k: Optional[int] = None,
+                   subscription: SubscriptionFilter = DEFAULT_FILTER
+                   ) -> List[Dict[str, Any]]:
+        """
+        Лучшие значения по убыванию доходности.
+
+        :param k: Сколько значений вернуть (None - все, прошедшие фильтр)
+        :param subscription: Фильтр, как у подписки (min_yield - порог)
+        :return: Копии значений
+        """
+        return [dict(self.values[key]) for key in
+                self.yield_index.top(k, subscription, self.values)]
+
+    async def handle_request(self, websocket, request: Any) -> bool:
+        """
+        Отвечает на запрос клиента, если это не подписка.
+
+        :return: True, если запрос обработан
+        :raises ValueError: если запрос некорректен
+        """
+        if isinstance(request, dict) and isinstance(request.get('top'), dict):
+            await self.send_top(websocket, request['top'])
+            return True
+        return False
+
+    async def send_top(self, websocket, request: Dict[str, Any]):
+        """
+        Отвечает на запрос {"top": {"k": 20, "min_yield": 0, ...}} клиента;
+        остальные поля такие же, как у подписки.
+        """
+        k = request.get('k')
+        subscription = parse_subscription({'subscribe': request})
+        top = self.top_values(int(k) if k is not None else None,
+                              subscription)
+        await websocket.send(json.dumps({'top': top}, default=str))
+
+
+class AdvancedAnalyzer(ValueServer):
+    def __init__(self, config_path: str, partition: Partition = None):
+        """
+        :param config_path: Путь к bookmakers.json
+        :param partition: Раздел экземпляра в кластере (см. cluster.py):
+                          анализируются только его букмекеры и виды спорта,
+                          значения раздаются на его порту. None - все
+                          букмекеры на порту 8765, как раньше
+        """
+        super().__init__(partition.port if partition else SERVER_PORT)
         with open(config_path, 'r') as f:
             self.config = json.load(f)
 
-        self.values: Dict[str, Any] = {}
+        self.partition = partition
+        self.sports = partition.sports if partition else None
+        if partition is not None:
+            # Pinnacle нужен каждому экземпляру как эталон
+            self.config = {
+                bookmaker: config for bookmaker, config in self.config.items()
+                if bookmaker == 'pinnacle' or bookmaker in partition.bookmakers
+            }
+
         self.bookmaker_data: Dict[str, Dict[str, Dict[str, Any]]] = {
             bookmaker: {
                 'live': {},
@@ -44,16 +403,43 @@ class AdvancedAnalyzer:
         self.PREMATCH_MAX_AGE = 30  # секунд
         self.LIVE_MAX_AGE = 3  # секунд
 
-        # Блокировки для синхронизации доступа к общим данным
-        self.values_lock = asyncio.Lock()
-        self.bookmaker_data_lock = asyncio.Lock()
-
-        # Set of connected clients
-        self.connected_clients = set()
-        self.clients_lock = asyncio.Lock()
+        # bookmaker_data меняет только ingest_loop (единственный писатель),
+        # читатели сокетов лишь кладут сообщения в очередь, а анализ
+        # работает со снимком (см. get_snapshot)
+        self.ingest_queue: asyncio.Queue = asyncio.Queue(
+            maxsize=INGEST_QUEUE_SIZE)
+        self.data_version = 0
+        self.snapshot = None
+        self.snapshot_version = -1
+        # Копирование при записи: снимки разделяют словари матчей с
+        # bookmaker_data. Поколение растет при каждой публикации снимка;
+        # словарь вида спорта, созданный в более раннем поколении, может
+        # входить в снимок, и писатель копирует его перед первым изменением
+        # (см. writable_matches). {(bookmaker, match_type, sport): поколение}
+        self.generation = 0
+        self.sport_generations: Dict[tuple, int] = {}
+        self.last_cleanup = 0.0
+        # Сроки устаревания: min-кучи (срок, ключ) с ленивым удалением.
+        # В *_deadlines хранится актуальный срок каждого ключа; запись кучи
+        # с другим сроком считается устаревшей и пропускается. Если матч
+        # или значение обновились, при извлечении срок переносится.
+        self.match_expiry = []
+        self.match_deadlines: Dict[tuple, float] = {}
+        self.value_expiry = []
+        self.value_deadlines: Dict[str, float] = {}
+        # Лайв-матчи, обновленные с последнего прохода live-лейна:
+        # {bookmaker: {(sport, match_id)}}
+        self.live_touched: Dict[str, set] = {}
+        self.live_updated_event = asyncio.Event()
 
-        # Event to signal data updates
-        self.data_updated_event = asyncio.Event()
+        # Книга коэффициентов по событиям Pinnacle:
+        # {pinnacle_id: {(type, line): {bookmaker: odds}}}
+        self.odds_book: Dict[str, Dict[tuple, Dict[str, float]]] = {}
+        # Индекс исходов Pinnacle: {pinnacle_id: (запись матча, {(type, line): исход})}
+        self.pinnacle_outcomes: Dict[str, tuple] = {}
+        # Ключи values по паре (букмекер, матч Pinnacle): значения снятого
+        # соответствия удаляются без прохода по всем values
+        self.event_value_keys: Dict[tuple, set] = {}
 
     async def start(self):
         tasks = [
@@ -64,11 +450,12 @@ class AdvancedAnalyzer:
             if config['enabled']
         ]
         tasks += [
+            asyncio.create_task(self.ingest_loop()),
             asyncio.create_task(self.analyze_loop()),
+            asyncio.create_task(self.live_analysis_loop()),
             asyncio.create_task(self.broadcast_data_loop()),
             asyncio.create_task(self.start_websocket_server()),
             asyncio.create_task(self.cleanup_values_loop()),
-            asyncio.create_task(self.cleanup_bookmaker_data_loop())
         ]
         await asyncio.gather(*tasks)
 
@@ -99,28 +486,240 @@ class AdvancedAnalyzer:
                 await asyncio.sleep(0.1)
 
     async def handle_message(self, bookmaker: str, data: Dict[str, Any]):
-        try:
-            async with self.bookmaker_data_lock:
-                self.update_bookmaker_data(bookmaker, data)
-        except Exception as e:
-            logger.error(f"Error in handle_message: {e}")
+        await self.ingest_queue.put((bookmaker, data))
+
+    async def ingest_loop(self):
+        """
+        Единственный писатель bookmaker_data.
+
+        Забирает из очереди накопившиеся сообщения пачкой, применяет
+        обновления, удаляет значения снятых матчей за один проход по values
+        и раз в CLEANUP_INTERVAL удаляет устаревшие матчи.
+        """
+        while True:
+            batch = []
+            try:
+                batch.append(await asyncio.wait_for(self.ingest_queue.get(),
+                                                    timeout=CLEANUP_INTERVAL))
+                while len(batch) < INGEST_BATCH_SIZE:
+                    batch.append(self.ingest_queue.get_nowait())
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                pass
+
+            try:
+                removed = set()
+                for bookmaker, data in batch:
+                    # Ошибка в одном сообщении не отменяет остальные
+                    try:
+                        removed.update(
+                            self.update_bookmaker_data(bookmaker, data))
+                    except Exception as e:
+                        logger.error(
+                            f"Error applying message from {bookmaker}: {e}")
+                if batch:
+                    self.data_version += 1
+                if self.live_touched:
+                    self.live_updated_event.set()
+
+                current_time = time.time()
+                if current_time - self.last_cleanup >= CLEANUP_INTERVAL:
+                    self.last_cleanup = current_time
+                    expired = self.expire_bookmaker_data(current_time)
+                    if expired:
+                        self.data_version += 1
+                        # Значения устаревших матчей удаляются в том же проходе
+                        removed.update(expired)
+
+                if removed:
+                    await self.delete_values_by_matches(removed)
+            except Exception as e:
+                logger.error(f"Error in ingest_loop: {e}")
 
     def update_bookmaker_data(self, bookmaker: str,
-                              data: Dict[str, Any]):
+                              data: Dict[str, Any]) -> set:
+        """
+        Применяет одно сообщение парсера.
+
+        :return: Множество (bookmaker, match_id) снятых матчей и матчей без
+                 исходов, значения которых нужно удалить
+        """
+        removed = set()
         for match_id, match_data in data.items():
             if not match_data or not match_data.get('outcomes'):
-                # Запланировать удаление соответствующих значений
-                asyncio.create_task(
-                    self.delete_match_values(bookmaker, match_id))
+                # Снятый парсером матч ({match_id: None}) удаляется сразу,
+                # иначе следующий проход анализа восстановит его значения
+                self.remove_match(bookmaker, match_id)
+                removed.add((bookmaker, match_id))
                 continue
             sport = match_data.get('sport', 'unknown')
+            if self.sports is not None and sport not in self.sports:
+                continue
             match_type = match_data.get('type', 'prematch').lower()
 
-            if sport not in self.bookmaker_data[bookmaker][match_type]:
-                self.bookmaker_data[bookmaker][match_type][sport] = {}
+            matches = self.writable_matches(bookmaker, match_type, sport)
+            if match_id not in matches:
+                self.schedule(self.match_expiry, self.match_deadlines,
+                              (bookmaker, match_type, sport, match_id),
+                              match_data.get('time', 0) +
+                              self.max_age(match_type))
+            matches[match_id] = Match.from_dict(match_data)
+            if match_type == 'live':
+                self.live_touched.setdefault(bookmaker, set()).add(
+                    (sport, match_id))
+        return removed
+
+    def writable_matches(self, bookmaker: str, match_type: str,
+                         sport: str) -> Dict[str, Any]:
+        """
+        Словарь матчей вида спорта, который писатель может менять.
+
+        Если словарь мог попасть в опубликованный снимок, вместо него
+        подставляется копия, так что снимок не меняется. Копируется только
+        изменяемый вид спорта и не чаще одного раза за поколение.
+
+        :return: {match_id: Match}
+        """
+        sports = self.bookmaker_data[bookmaker][match_type]
+        key = (bookmaker, match_type, sport)
+        matches = sports.get(sport)
+        if matches is None:
+            matches = sports[sport] = {}
+        elif self.sport_generations.get(key, -1) == self.generation:
+            return matches
+        else:
+            matches = sports[sport] = dict(matches)
+        self.sport_generations[key] = self.generation
+        return matches
+
+    def max_age(self, match_type: str) -> float:
+        return self.LIVE_MAX_AGE if match_type == 'live' else self.PREMATCH_MAX_AGE
+
+    def value_deadline(self, value: Dict[str, Any]) -> float:
+        """Момент, после которого значение устаревает."""
+        if value.get('is_live', False) or value.get('type_event', '') == 'live':
+            return value['last_update_time'] + self.LIVE_MAX_AGE
+        return value['last_update_time'] + self.PREMATCH_MAX_AGE
+
+    @staticmethod
+    def schedule(heap: list, deadlines: Dict[Any, float], key: Any,
+                 deadline: float):
+        deadlines[key] = deadline
+        heapq.heappush(heap, (deadline, key))
+
+    @staticmethod
+    def due_entries(heap: list, deadlines: Dict[Any, float],
+                    current_time: float):
+        """
+        Извлекает из кучи ключи, срок которых истек, пропуская устаревшие
+        записи кучи. Вызывающий либо удаляет запись, либо переносит срок
+        через schedule.
+        """
+        while heap and heap[0][0] < current_time:
+            deadline, key = heapq.heappop(heap)
+            if deadlines.get(key) != deadline:
+                continue
+            del deadlines[key]
+            yield key
+
+    def expire_bookmaker_data(self, current_time: float) -> set:
+        """
+        Удаляет матчи, которые давно не обновлялись, и пустые виды спорта.
+        Просматриваются только матчи с истекшим сроком.
+
+        :return: Множество (bookmaker, match_id) удаленных матчей
+        """
+        expired = set()
+        for key in self.due_entries(self.match_expiry, self.match_deadlines,
+                                    current_time):
+            bookmaker, match_type, sport, match_id = key
+            sports = self.bookmaker_data[bookmaker][match_type]
+            matches = sports.get(sport, {})
+            match_data = matches.get(match_id)
+            if match_data is None:
+                continue
+            deadline = match_data.get('time', 0) + self.max_age(match_type)
+            if deadline >= current_time:
+                # Матч обновлялся после постановки в кучу
+                self.schedule(self.match_expiry, self.match_deadlines, key,
+                              deadline)
+                continue
+            self.drop_match(bookmaker, match_type, sport, match_id)
+            expired.add((bookmaker, match_id))
+        return expired
+
+    def remove_match(self, bookmaker: str, match_id: str):
+        """Удаляет матч букмекера, где бы он ни лежал (тип и вид спорта неизвестны)."""
+        for match_type, sports in self.bookmaker_data[bookmaker].items():
+            for sport in [sport for sport, matches in sports.items()
+                          if match_id in matches]:
+                self.match_deadlines.pop(
+                    (bookmaker, match_type, sport, match_id), None)
+                self.drop_match(bookmaker, match_type, sport, match_id)
+
+    def drop_match(self, bookmaker: str, match_type: str, sport: str,
+                   match_id: str):
+        """Удаляет матч из копии вида спорта (снимок не меняется) и пустой вид спорта."""
+        matches = self.writable_matches(bookmaker, match_type, sport)
+        del matches[match_id]
+        if not matches:
+            del self.bookmaker_data[bookmaker][match_type][sport]
+            del self.sport_generations[(bookmaker, match_type, sport)]
+
+    def expire_values(self, current_time: float) -> int:
+        """
+        Удаляет устаревшие значения (вызывается под values_lock).
 
-            self.bookmaker_data[bookmaker][match_type][sport][
-                match_id] = match_data
+        :return: Количество удаленных значений
+        """
+        deleted = 0
+        for key in self.due_entries(self.value_expiry, self.value_deadlines,
+                                    current_time):
+            value = self.values.get(key)
+            if value is None:
+                continue
+            deadline = self.value_deadline(value)
+            if deadline >= current_time:
+                self.schedule(self.value_expiry, self.value_deadlines, key,
+                              deadline)
+                continue
+            self.drop_value(key)
+            deleted += 1
+        return deleted
+
+    def get_snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Неизменяемый снимок bookmaker_data для анализа.
+
+        Снимок ссылается на те же словари матчей, что и bookmaker_data,
+        копируются только словари видов спорта. После публикации поколение
+        увеличивается, и писатель при следующем изменении вида спорта
+        работает с его копией (см. writable_matches), поэтому анализ видит
+        согласованные данные на всех await, а писатель не ждет читателей.
+        Снимок пересобирается, только если данные изменились.
+        """
+        if self.snapshot_version != self.data_version:
+            self.snapshot = {
+                bookmaker: {match_type: dict(sports)
+                            for match_type, sports in data.items()}
+                for bookmaker, data in self.bookmaker_data.items()
+            }
+            self.snapshot_version = self.data_version
+            self.generation += 1
+        return self.snapshot
+
+    async def delete_values_by_matches(self, matches: set):
+        """
+        Удаляет значения снятых матчей за один проход по values.
+
+        :param matches: Множество (bookmaker, match_id)
+        """
+        prefixes = tuple(f"{bookmaker}_{match_id}_"
+                         for bookmaker, match_id in matches)
+        async with self.values_lock:
+            keys_to_delete = [key for key in self.values if
+                              key.startswith(prefixes)]
+            for key in keys_to_delete:
+                self.drop_value(key)
 
     async def delete_match_values(self, bookmaker: str, match_id: str):
         prefix = f"{bookmaker}_{match_id}_"
@@ -128,113 +727,179 @@ class AdvancedAnalyzer:
             keys_to_delete = [key for key in self.values if
                               key.startswith(prefix)]
             for key in keys_to_delete:
-                del self.values[key]
+                self.drop_value(key)
             # Логирование при необходимости
             # logger.debug(f"Deleted {len(keys_to_delete)} values for match {match_id} by {bookmaker}")
 
     async def analyze_loop(self):
         while True:
             try:
-                # Получаем копию данных под блокировкой
-                async with self.bookmaker_data_lock:
-                    pinnacle_data = self.bookmaker_data.get('pinnacle',
-                                                            {}).copy()
-                    other_bookmaker_data = {
-                        bookmaker: self.bookmaker_data.get(bookmaker,
-                                                           {}).copy()
-                        for bookmaker in self.config
-                        if bookmaker != 'pinnacle' and self.config[bookmaker][
-                            'enabled']
-                    }
-
-                for bookmaker, other_data in other_bookmaker_data.items():
-                    await self.analyze_bookmaker(pinnacle_data, other_data,
-                                                 bookmaker)
+                snapshot = self.get_snapshot()
+                pinnacle_data = snapshot.get('pinnacle', {})
+                other_bookmaker_data = {
+                    bookmaker: snapshot.get(bookmaker, {})
+                    for bookmaker in self.config
+                    if bookmaker != 'pinnacle' and self.config[bookmaker][
+                        'enabled']
+                }
+
+                await self.analyze_events(pinnacle_data, other_bookmaker_data)
                 print("Analyzed all bookmakers")
                 # Signal that data has been updated
                 self.data_updated_event.set()
                 # await asyncio.sleep(2)
             except Exception as e:
                 logger.error(f"Error in analyze_loop: {e}")
-            await asyncio.sleep(2)
+            await asyncio.sleep(ANALYZE_INTERVAL)
 
-    async def analyze_bookmaker(self, pinnacle_data: Dict[str, Any],
-                                other_data: Dict[str, Any], bookmaker: str):
-        match_finder = self.match_finders[bookmaker]
-        current_time = time.time()
+    async def live_analysis_loop(self):
+        """
+        Live-лейн: после прихода лайв-обновлений от Pinnacle или букмекера
+        (с задержкой LIVE_DEBOUNCE, чтобы собрать пачку) анализирует только
+        затронутые лайв-матчи и сразу отправляет результат клиентам.
+        """
+        while True:
+            await self.live_updated_event.wait()
+            await asyncio.sleep(LIVE_DEBOUNCE)
+            self.live_updated_event.clear()
+            touched, self.live_touched = self.live_touched, {}
+            try:
+                if await self.analyze_live_matches(touched):
+                    self.data_updated_event.set()
+            except Exception as e:
+                logger.error(f"Error in live_analysis_loop: {e}")
 
-        for match_type in ['live', 'prematch']:
-            max_age = self.LIVE_MAX_AGE if match_type == 'live' else self.PREMATCH_MAX_AGE
+    def collect_live_pairs(self, touched: Dict[str, set]) -> Dict[str, set]:
+        """
+        Определяет, какие пары (букмекер, матч Pinnacle) нужно пересчитать.
 
-            # Собираем все виды спорта
-            pinnacle_sports = pinnacle_data.get(match_type, {}).keys()
-            other_sports = other_data.get(match_type, {}).keys()
-            all_sports = set(pinnacle_sports).union(other_sports)
+        :param touched: {bookmaker: {(sport, match_id)}} обновленных матчей
+        :return: {bookmaker: {(sport, pinnacle_id)}}
+        """
+        bookmakers = [bookmaker for bookmaker in self.match_finders
+                      if self.config[bookmaker]['enabled']]
+        pinnacle_live = self.bookmaker_data['pinnacle']['live']
+        pairs = {bookmaker: set() for bookmaker in bookmakers}
 
-            for sport in all_sports:
-                if not sport or sport == 'unknown':
+        for sport, pinnacle_id in touched.get('pinnacle', ()):
+            for bookmaker in bookmakers:
+                pairs[bookmaker].add((sport, pinnacle_id))
+
+        for bookmaker in bookmakers:
+            match_finder = self.match_finders[bookmaker]
+            for sport, other_id in touched.get(bookmaker, ()):
+                pinnacle_id = match_finder.find_pinnacle_id(other_id)
+                if pinnacle_id in pinnacle_live.get(sport, {}):
+                    pairs[bookmaker].add((sport, pinnacle_id))
+        return pairs
+
+    async def analyze_live_matches(self, touched: Dict[str, set]) -> bool:
+        """
+        Пересчитывает значения затронутых лайв-матчей.
+
+        Матчи берутся прямо из bookmaker_data без снимка: писатель заменяет
+        записи матчей целиком, а не меняет их, так что ссылки, взятые до
+        первого await, остаются согласованными.
+
+        :return: True, если был пересчитан хотя бы один матч
+        """
+        pinnacle_live = self.bookmaker_data['pinnacle']['live']
+        events = {}
+        unmatched = {}
+        for bookmaker, pinnacle_ids in self.collect_live_pairs(touched).items():
+            match_finder = self.match_finders[bookmaker]
+            other_live = self.bookmaker_data[bookmaker]['live']
+            for sport, pinnacle_id in pinnacle_ids:
+                pinnacle_match = pinnacle_live.get(sport, {}).get(pinnacle_id)
+                if pinnacle_match is None:
                     continue
+                found = match_finder.find_match_by_pinnacle_id(
+                    pinnacle_id, other_live.get(sport, {}))
+                if found:
+                    events.setdefault(pinnacle_id, (pinnacle_match, []))[
+                        1].append((bookmaker, *found))
+                else:
+                    unmatched.setdefault(bookmaker, set()).add(pinnacle_id)
 
-                fresh_pinnacle_data = pinnacle_data.get(match_type, {}).get(
-                    sport, {})
-                fresh_other_data = other_data.get(match_type, {}).get(sport,
-                                                                      {})
+        for pinnacle_id, (pinnacle_match, matched) in events.items():
+            await self.analyze_event(pinnacle_id, pinnacle_match, matched)
+        for bookmaker, pinnacle_ids in unmatched.items():
+            await self.delete_matches_by_pinnacle_ids(bookmaker, pinnacle_ids)
+        return bool(events or unmatched)
 
+    async def analyze_events(self, pinnacle_data: Dict[str, Any],
+                             other_bookmaker_data: Dict[str, Dict[str, Any]]):
+        """
+        Полный проход: каждый матч Pinnacle обрабатывается один раз, его
+        соответствия у всех букмекеров анализируются вместе (см. analyze_event).
+
+        :param pinnacle_data: {match_type: {sport: {match_id: match}}} Pinnacle
+        :param other_bookmaker_data: {bookmaker: {match_type: {sport: ...}}}
+        """
+        seen = set()
+        for match_type in ['live', 'prematch']:
+            for sport, pinnacle_matches in pinnacle_data.get(match_type,
+                                                             {}).items():
+                if not sport or sport == 'unknown':
+                    continue
+
+                other_sport_data = {
+                    bookmaker: other_data.get(match_type, {}).get(sport, {})
+                    for bookmaker, other_data in other_bookmaker_data.items()
+                }
                 logger.info(
-                    f"Analyzing {len(fresh_pinnacle_data)} {match_type} {sport} matches from Pinnacle for {bookmaker}"
+                    f"Analyzing {len(pinnacle_matches)} {match_type} {sport} matches from Pinnacle for {len(other_sport_data)} bookmakers"
                 )
-                set_to_delete = set()
-                for pinnacle_id, pinnacle_match in fresh_pinnacle_data.items():
-                    corresponding_match = match_finder.find_corresponding_match(
-                        pinnacle_match,
-                        fresh_other_data)
-
-                    if corresponding_match:
-                        # print(corresponding_match)
-                        other_id = corresponding_match['id']
-                        await self.analyze_match(
-                            bookmaker, pinnacle_id, pinnacle_match, other_id,
-                            corresponding_match
-                        )
-                    else:
-                        # print("No corresponding match found")
-                        set_to_delete.add((bookmaker, pinnacle_id))
-                        # await self.delete_match_by_pinnacle_id(bookmaker,
-                        #                                        pinnacle_id)
+                unmatched = {bookmaker: set() for bookmaker in other_sport_data}
+                for pinnacle_id, pinnacle_match in pinnacle_matches.items():
+                    seen.add(pinnacle_id)
+                    matched = []
+                    for bookmaker, fresh_other_data in other_sport_data.items():
+                        found = self.match_finders[
+                            bookmaker].find_match_by_pinnacle_id(
+                            pinnacle_id, fresh_other_data)
+                        if found:
+                            matched.append((bookmaker, *found))
+                        else:
+                            unmatched[bookmaker].add(pinnacle_id)
+                    if matched:
+                        await self.analyze_event(pinnacle_id, pinnacle_match,
+                                                 matched)
 
-                if set_to_delete:
+                for bookmaker, pinnacle_ids in unmatched.items():
                     await self.delete_matches_by_pinnacle_ids(bookmaker,
-                                                              set_to_delete)
+                                                              pinnacle_ids)
 
-                logger.info(
-                    f"Finished analyzing {len(fresh_pinnacle_data)} {match_type} {sport} matches from Pinnacle for {bookmaker}"
-                )
+        # Матчи, которых больше нет у Pinnacle, убираем из книги и кэша
+        for pinnacle_id in self.odds_book.keys() - seen:
+            del self.odds_book[pinnacle_id]
+        for pinnacle_id in self.pinnacle_outcomes.keys() - seen:
+            del self.pinnacle_outcomes[pinnacle_id]
 
     async def delete_matches_by_pinnacle_ids(self, bookmaker: str,
                                              pinnacle_ids: set):
         if not pinnacle_ids:
             return
+        self.drop_book_prices(bookmaker, pinnacle_ids)
         async with self.values_lock:
             keys_to_delete = [
-                key for key, value in self.values.items()
-                if value.get('bookmaker') == bookmaker and value.get(
-                    'pinnacle_id') in pinnacle_ids
+                key for pinnacle_id in pinnacle_ids
+                for key in self.event_value_keys.get((bookmaker, pinnacle_id),
+                                                     ())
             ]
             for key in keys_to_delete:
-                del self.values[key]
+                self.drop_value(key)
             logger.debug(
                 f"Deleted {len(keys_to_delete)} values for {len(pinnacle_ids)} Pinnacle matches by {bookmaker}")
 
     async def delete_match_by_pinnacle_id(self, bookmaker: str,
                                           pinnacle_id: str):
+        self.drop_book_prices(bookmaker, {pinnacle_id})
         async with self.values_lock:
-            keys_to_delete = [
-                key for key, value in self.values.items()
-                if value.get('pinnacle_id') == pinnacle_id and value.get(
-                    'bookmaker') == bookmaker
-            ]
+            keys_to_delete = list(
+                self.event_value_keys.get((bookmaker, pinnacle_id), ()))
             for key in keys_to_delete:
-                del self.values[key]
+                self.drop_value(key)
             # Логирование при необходимости
             # logger.debug(f"Deleted {len(keys_to_delete)} values for Pinnacle match {pinnacle_id} by {bookmaker}")
 
@@ -246,35 +911,155 @@ class AdvancedAnalyzer:
             if current_time - match_data.get('time', 0) <= max_age
         }
 
-    async def analyze_match(self, bookmaker: str, pinnacle_id: str,
+    def outcome_index(self, pinnacle_id: str,
+                      pinnacle_match: Dict[str, Any]) -> Dict[tuple, Any]:
+        """
+        Исходы матча Pinnacle по (type, line). Строится один раз на запись
+        матча: писатель заменяет запись при обновлении, и кэш перестраивается.
+        """
+        cached = self.pinnacle_outcomes.get(pinnacle_id)
+        if cached is not None and cached[0] is pinnacle_match:
+            return cached[1]
+        index = {(o['type'], o['line']): o for o in
+                 pinnacle_match.get('outcomes', [])}
+        self.pinnacle_outcomes[pinnacle_id] = (pinnacle_match, index)
+        return index
+
+    async def analyze_event(self, pinnacle_id: str,
                             pinnacle_match: Dict[str, Any],
-                            other_id: str, other_match: Dict[str, Any]):
-        if not pinnacle_match.get('outcomes') or not other_match.get(
-                'outcomes'):
+                            matched: List[tuple]):
+        """
+        Анализирует матч Pinnacle сразу для всех сопоставленных букмекеров:
+        обновляет книгу коэффициентов события и фиксирует все значения
+        одним захватом values_lock.
+
+        :param matched: Список (bookmaker, other_id, other_match)
+        """
+        pinnacle_outcomes = self.outcome_index(pinnacle_id, pinnacle_match)
+        book = self.odds_book.setdefault(pinnacle_id, {})
+        current_time = time.time()
+        type_event = pinnacle_match.get('type', 'prematch').lower()
+        batches = []
+        empty = []
+        for bookmaker, other_id, other_match in matched:
+            # Цены букмекера в книге заменяются целиком
+            for prices in book.values():
+                prices.pop(bookmaker, None)
+            if not pinnacle_outcomes or not other_match.get('outcomes'):
+                empty.append((bookmaker, other_id))
+                continue
+
+            other_outcomes = {(o['type'], o['line']): o for o in
+                              other_match.get('outcomes', [])}
+            updates = []
+            for outcome_key, other_outcome in other_outcomes.items():
+                pinnacle_outcome = pinnacle_outcomes.get(outcome_key)
+                if pinnacle_outcome is None:
+                    continue
+                book.setdefault(outcome_key, {})[bookmaker] = other_outcome['odds']
+                yield_value = self.calculate_yield(pinnacle_outcome,
+                                                   other_outcome)
+                if yield_value is None:
+                    continue
+                key = value_key(bookmaker, other_id, pinnacle_outcome['type'],
+                                pinnacle_outcome['line'])
+                updates.append((key, pinnacle_outcome, other_outcome, {
+                    'type_event': type_event,
+                    'pinnacle_odds': pinnacle_outcome['odds'],
+                    'other_odds': other_outcome['odds'],
+                    'yield': yield_value,
+                    'last_update_time': current_time,
+                    'betOfferId': other_outcome.get('betOfferId'),
+                    'id': other_outcome.get('id'),
+                    'criterion': other_outcome.get('criterion'),
+                    # Обновляем Pinnacle-специфичные данные, если они изменились
+                    'line_id': pinnacle_outcome.get('line_id'),
+                    'alt_line_id': pinnacle_outcome.get('alt_line_id'),
+                    'period_number': pinnacle_outcome.get('period_number'),
+                    'team': pinnacle_outcome.get('team'),
+                    'side': pinnacle_outcome.get('side'),
+                    'bet_type': pinnacle_outcome.get('bet_type'),
+                    # Для гандикапа
+                    'absolute_line': other_outcome.get('absolute_line'),
+                }))
+
+            if updates:
+                base = self.match_value_base(bookmaker, pinnacle_id, other_id,
+                                             pinnacle_match, other_match)
+                batches.append((base, updates))
+
+        for outcome_key in [outcome_key for outcome_key, prices in
+                            book.items() if not prices]:
+            del book[outcome_key]
+
+        for bookmaker, other_id in empty:
             await self.delete_match_values(bookmaker, other_id)
-            return
+        if batches:
+            await self.commit_values(batches, current_time)
+
+    def event_book(self, pinnacle_id: str) -> Dict[tuple, Dict[str, Any]]:
+        """
+        Книга коэффициентов события Pinnacle: по каждому исходу (type, line)
+        цена Pinnacle, цены всех сопоставленных букмекеров и лучшая из них.
+
+        :return: {(type, line): {'pinnacle': odds, 'prices': {bookmaker: odds},
+                                 'best': (bookmaker, odds)}}
+        """
+        cached = self.pinnacle_outcomes.get(pinnacle_id)
+        pinnacle_outcomes = cached[1] if cached else {}
+        return {
+            outcome_key: {
+                'pinnacle': pinnacle_outcomes.get(outcome_key, {}).get('odds'),
+                'prices': dict(prices),
+                'best': max(prices.items(), key=lambda item: item[1]),
+            }
+            for outcome_key, prices in self.odds_book.get(pinnacle_id,
+                                                          {}).items()
+        }
+
+    async def handle_request(self, websocket, request: Any) -> bool:
+        if isinstance(request, dict) and 'book' in request:
+            await self.send_book(websocket, request['book'])
+            return True
+        return await super().handle_request(websocket, request)
+
+    async def send_book(self, websocket, pinnacle_id: Any):
+        """
+        Отвечает на запрос {"book": pinnacle_id}:
+        {"book": {"pinnacle_id": ..., "outcomes": [{"type", "line", "pinnacle",
+        "prices": {bookmaker: odds}, "best": {"bookmaker", "odds"}}]}}
+        """
+        if isinstance(pinnacle_id, bool) or not isinstance(pinnacle_id,
+                                                           (str, int)):
+            raise ValueError("book: expected a Pinnacle match id")
+        pinnacle_id = str(pinnacle_id)
+        outcomes = [
+            {
+                'type': outcome_type,
+                'line': line,
+                'pinnacle': entry['pinnacle'],
+                'prices': entry['prices'],
+                'best': {'bookmaker': entry['best'][0],
+                         'odds': entry['best'][1]},
+            }
+            for (outcome_type, line), entry in
+            self.event_book(pinnacle_id).items()
+        ]
+        await websocket.send(json.dumps(
+            {'book': {'pinnacle_id': pinnacle_id, 'outcomes': outcomes}},
+            default=str))
 
-        pinnacle_outcomes = {(o['type'], o['line']): o for o in
-                             pinnacle_match.get('outcomes', [])}
-        other_outcomes = {(o['type'], o['line']): o for o in
-                          other_match.get('outcomes', [])}
-
-        common_outcomes = set(pinnacle_outcomes.keys()) & set(
-            other_outcomes.keys())
-
-        update_tasks = []
-        for outcome_key in common_outcomes:
-            pinnacle_outcome = pinnacle_outcomes[outcome_key]
-            other_outcome = other_outcomes[outcome_key]
-            key = f"{bookmaker}_{other_id}_{pinnacle_outcome['type']}_{pinnacle_outcome['line']}"
-            yield_value = self.calculate_yield(pinnacle_outcome,
-                                               other_outcome)
-            if yield_value is None:
+    def drop_book_prices(self, bookmaker: str, pinnacle_ids: set):
+        """Убирает из книги цены букмекера, чей матч больше не сопоставлен."""
+        for pinnacle_id in pinnacle_ids:
+            book = self.odds_book.get(pinnacle_id)
+            if not book:
                 continue
-            await self.update_value(
-                bookmaker, pinnacle_id, other_id, pinnacle_match, other_match,
-                pinnacle_outcome, other_outcome, yield_value, key
-            )
+            for outcome_key in list(book):
+                prices = book[outcome_key]
+                prices.pop(bookmaker, None)
+                if not prices:
+                    del book[outcome_key]
 
     def calculate_yield(self, pinnacle_outcome: Dict[str, Any],
                         other_outcome: Dict[str, Any]) -> float:
@@ -295,215 +1080,131 @@ class AdvancedAnalyzer:
                 return percent
         return 1.0
 
-    async def update_value(self, bookmaker: str, pinnacle_id: str,
-                           other_id: str,
-                           pinnacle_match: Dict[str, Any],
-                           other_match: Dict[str, Any],
-                           pinnacle_outcome: Dict[str, Any],
-                           other_outcome: Dict[str, Any],
-                           yield_value: float, key: str):
-        current_time = time.time()
+    def match_value_base(self, bookmaker: str, pinnacle_id: str,
+                         other_id: str, pinnacle_match: Dict[str, Any],
+                         other_match: Dict[str, Any]) -> Dict[str, Any]:
+        """Поля значения, общие для всех исходов матча."""
+        return {
+            'pinnacle_id': pinnacle_id,
+            'other_id': other_id,
+            'bookmaker': bookmaker,
+            'home_team': pinnacle_match['home_team'],
+            'away_team': pinnacle_match['away_team'],
+            "match_start_time": pinnacle_match.get('start_time'),
+            'sport': pinnacle_match['sport'],
+            'league': other_match.get('league',
+                                      pinnacle_match.get('league')),
+            'league_pin': pinnacle_match.get('league'),
+            'country': pinnacle_match['country'],
+            'home_team_other': other_match['home_team'],
+            'away_team_other': other_match['away_team'],
+        }
+
+    async def commit_values(self, batches: List[tuple], current_time: float):
+        """
+        Записывает значения одного события Pinnacle за один захват values_lock.
+
+        :param batches: Список (base, updates) по букмекерам: base - общие
+                        поля матча (см. match_value_base), новые значения
+                        создаются копией этого шаблона; updates - список
+                        (key, pinnacle_outcome, other_outcome, поля для
+                        обновления)
+        :param current_time: Время расчета значений
+        """
         async with self.values_lock:
-            if key not in self.values:
-                self.values[key] = {
-                    'pinnacle_id': pinnacle_id,
-                    'other_id': other_id,
-                    'bookmaker': bookmaker,
-                    'home_team': pinnacle_match['home_team'],
-                    'away_team': pinnacle_match['away_team'],
+            for base, updates in batches:
+                self.apply_updates(base, updates, current_time)
+
+    def apply_updates(self, base: Dict[str, Any], updates: list,
+                      current_time: float):
+        for key, pinnacle_outcome, other_outcome, fields in updates:
+            value = self.values.get(key)
+            if value is None:
+                value = self.values[key] = dict(base)
+                self.event_value_keys.setdefault(
+                    (base['bookmaker'], base['pinnacle_id']), set()).add(key)
+                value.update({
                     'outcome': pinnacle_outcome['type'],
-                    'betOfferId': other_outcome.get('betOfferId'),
-                    'id': other_outcome.get('id'),
                     'line': pinnacle_outcome['line'],
                     'start_time': current_time,
-                    'positive_start_time': current_time if yield_value > 0 else None,
-                    "match_start_time": pinnacle_match.get('start_time'),
-                    'sport': pinnacle_match['sport'],
-                    'league': other_match.get('league',
-                                              pinnacle_match.get('league')),
-                    'league_pin': pinnacle_match.get('league'),
-                    'country': pinnacle_match['country'],
-                    'criterion': other_outcome.get('criterion'),
+                    'positive_start_time': None,
                     'path': other_outcome.get('path'),
-                    'home_team_other': other_match['home_team'],
-                    'away_team_other': other_match['away_team'],
                     'type': other_outcome.get('type'),
-                    'type_event': pinnacle_match.get('type',
-                                                     'prematch').lower(),
                     'single': other_outcome.get('single', True),
-                    # Pinnacle-specific data
-                    'line_id': pinnacle_outcome.get('line_id'),
-                    'alt_line_id': pinnacle_outcome.get('alt_line_id'),
-                    'period_number': pinnacle_outcome.get('period_number'),
-                    'team': pinnacle_outcome.get('team'),
-                    'side': pinnacle_outcome.get('side'),
-                    'bet_type': pinnacle_outcome.get('bet_type'),
-                }
-
-            value = self.values[key]
-            # print(pinnacle_match)
-            value.update({
-                'type_event': pinnacle_match.get('type',
-                                                 'prematch').lower(),
-                'pinnacle_odds': pinnacle_outcome['odds'],
-                'other_odds': other_outcome['odds'],
-                'yield': yield_value,
-                'last_update_time': current_time,
-                'betOfferId': other_outcome.get('betOfferId'),
-                'id': other_outcome.get('id'),
-                'criterion': other_outcome.get('criterion'),
-                # Обновляем Pinnacle-специфичные данные, если они изменились
-                'line_id': pinnacle_outcome.get('line_id'),
-                'alt_line_id': pinnacle_outcome.get('alt_line_id'),
-                'period_number': pinnacle_outcome.get('period_number'),
-                'team': pinnacle_outcome.get('team'),
-                'side': pinnacle_outcome.get('side'),
-                'bet_type': pinnacle_outcome.get('bet_type'),
-                # Для гандикапа
-                'absolute_line': other_outcome.get('absolute_line'),
-            })
-
-            if yield_value > 0 and value.get('positive_start_time') is None:
-                value['positive_start_time'] = current_time
-
-            if yield_value <= 0:
-                value['positive_start_time'] = None
-
-    async def start_websocket_server(self):
-        server = await websockets.serve(
-            self.websocket_handler,
-            "localhost",
-            8765,
-            max_size=None,
-            ping_interval=10,
-            ping_timeout=10
-        )
-        logger.info("WebSocket server started on ws://localhost:8765")
-        await server.wait_closed()
-
-    async def broadcast_data_loop(self):
-        while True:
-            await self.data_updated_event.wait()
-            self.data_updated_event.clear()
-
-            async with self.values_lock:
-                data = list(self.values.values())
-            logger.info(f"Broadcasting data len {len(data)}")
-            json_data = json.dumps(data, default=str)
-
-            async with self.clients_lock:
-                clients = list(self.connected_clients)
-
-            if not clients:
-                continue  # Нет подключенных клиентов, пропускаем отправку
-
-            # Создаем задачи для отправки данных всем клиентам параллельно
-            send_tasks = [
-                self.send_to_client(client, json_data)
-                for client in clients
-            ]
-
-            # Запускаем все задачи параллельно и ждем их завершения
-            await asyncio.gather(*send_tasks, return_exceptions=True)
+                })
 
-    async def send_to_client(self, client, data):
-        try:
-            await client.send(data)
+            value.update(fields)
+            self.yield_index.update(key, value)
 
-        except websockets.exceptions.ConnectionClosed:
-            logger.info(f"Клиент отключился: {client.remote_address}")
-            async with self.clients_lock:
-                self.connected_clients.remove(client)
-        except Exception as e:
-            logger.error(
-                f"Ошибка при отправке данных клиенту {client.remote_address}: {e}")
+            # Срок ставится для нового значения и переносится вперед
+            # лениво; раньше он сдвигается, только если матч ушел в лайв
+            deadline = self.value_deadline(value)
+            scheduled = self.value_deadlines.get(key)
+            if scheduled is None or deadline < scheduled:
+                self.schedule(self.value_expiry, self.value_deadlines,
+                              key, deadline)
 
-    async def cleanup_bookmaker_data_loop(self):
-        while True:
-            try:
-                current_time = time.time()
-                async with self.bookmaker_data_lock:
-                    for bookmaker in self.bookmaker_data:
-                        for match_type in ['live', 'prematch']:
-                            sports = list(self.bookmaker_data[bookmaker][
-                                              match_type].keys())
-                            for sport in sports:
-                                matches = \
-                                    self.bookmaker_data[bookmaker][
-                                        match_type][
-                                        sport]
-                                match_ids = list(matches.keys())
-                                for match_id in match_ids:
-                                    match_data = matches[match_id]
-                                    match_time = match_data.get('time', 0)
-                                    max_age = self.LIVE_MAX_AGE if match_type == 'live' else self.PREMATCH_MAX_AGE
-                                    if current_time - match_time > max_age:
-                                        del matches[match_id]
-                                # Удаляем пустые виды спорта
-                                if not matches:
-                                    del self.bookmaker_data[bookmaker][
-                                        match_type][sport]
-            except Exception as e:
-                logger.error(f"Error in cleanup_bookmaker_data_loop: {e}")
-            await asyncio.sleep(2)  # Периодичность очистки
+            if fields['yield'] <= 0:
+                value['positive_start_time'] = None
+            elif value.get('positive_start_time') is None:
+                value['positive_start_time'] = current_time
 
     async def cleanup_values_loop(self):
         while True:
             try:
                 current_time = time.time()
                 async with self.values_lock:
-                    keys_to_delete = [
-                        key for key, value in self.values.items()
-                        if not self.is_value_recent(value, current_time)
-                    ]
-                    for key in keys_to_delete:
-                        del self.values[key]
-                    if keys_to_delete:
-                        logger.debug(
-                            f"Cleaned up {len(keys_to_delete)} outdated values")
+                    deleted = self.expire_values(current_time)
+                if deleted:
+                    logger.debug(f"Cleaned up {deleted} outdated values")
+                    # Клиенты сразу получают список без устаревших значений
+                    self.data_updated_event.set()
 
             except Exception as e:
                 logger.error(f"Error in cleanup_values_loop: {e}")
-            await asyncio.sleep(
-                2)  # Период очистки, например, каждые 2 секунд
+            await asyncio.sleep(CLEANUP_INTERVAL)
 
-    async def websocket_handler(self, websocket, path):
-        logger.info(f"New client connected: {websocket.remote_address}")
-        try:
-            async with self.clients_lock:
-                self.connected_clients.add(websocket)
-            while True:
-                try:
-                    await asyncio.sleep(1)
-                except websockets.exceptions.ConnectionClosed:
-                    logger.info(
-                        f"Client disconnected: {websocket.remote_address}")
-                    break
-                except Exception as e:
-                    logger.error(f"Error in websocket_handler: {e}")
-        except Exception as e:
-            logger.error(f"Unhandled error in websocket_handler: {e}")
-        finally:
-            async with self.clients_lock:
-                self.connected_clients.discard(websocket)
-            logger.info(
-                f"Client connection closed: {websocket.remote_address}")
+    def drop_value(self, key: str):
+        value = self.values[key]
+        super().drop_value(key)
+        event = (value['bookmaker'], value['pinnacle_id'])
+        keys = self.event_value_keys.get(event)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.event_value_keys[event]
 
     def is_value_recent(self, value: Dict[str, Any],
                         current_time: float) -> bool:
-
-        update_age = current_time - value['last_update_time']
-        # print(value.get('type_event'))
-        if value.get('is_live', False) or value.get('type_event',
-                                                    '') == 'live':
-            # print(value.get('type_event'))
-            return update_age <= self.LIVE_MAX_AGE
-        else:
-            return update_age <= self.PREMATCH_MAX_AGE
+        return current_time <= self.value_deadline(value)
 
 
 async def main():
-    analyzer = AdvancedAnalyzer('bookmakers.json')
+    parser = argparse.ArgumentParser(description='AdvancedAnalyzer')
+    parser.add_argument('--config', default='bookmakers.json',
+                        help='Конфиг букмекеров')
+    parser.add_argument('--cluster',
+                        help='Конфиг кластера экземпляров (см. cluster.py)')
+    parser.add_argument('--instance',
+                        help='Имя экземпляра в конфиге кластера')
+    args = parser.parse_args()
+
+    partition = None
+    if args.cluster:
+        if not args.instance:
+            parser.error('--cluster requires --instance')
+        with open(args.config, 'r') as f:
+            config = json.load(f)
+        partitions = assign_partitions(load_cluster(args.cluster),
+                                       enabled_bookmakers(config))
+        if args.instance not in partitions:
+            parser.error(f'unknown instance {args.instance}')
+        partition = partitions[args.instance]
+        logger.info(f"Partition {partition.name}: bookmakers "
+                    f"{sorted(partition.bookmakers)}, sports "
+                    f"{sorted(partition.sports) if partition.sports else 'all'}")
+
+    analyzer = AdvancedAnalyzer(args.config, partition)
     await analyzer.start()
 
 
@@ -0,0 +1,101 @@
+# cluster.py
+import hashlib
+import json
+import logging
+from bisect import bisect
+from collections import namedtuple
+from typing import Any, Dict, Iterable, Optional
+
+# Порт, на котором агрегатор (или одиночный анализатор) раздает значения
+SERVER_PORT = 8765
+# Виртуальных узлов на экземпляр в кольце: сглаживает распределение
+RING_REPLICAS = 64
+
+# Раздел одного экземпляра анализатора: имя, порт его сервера значений,
+# букмекеры (без Pinnacle, он нужен всем) и виды спорта (None - все)
+Partition = namedtuple('Partition', ['name', 'port', 'bookmakers', 'sports'])
+
+
+def ring_hash(key: str) -> int:
+    return int(hashlib.md5(key.encode('utf-8')).hexdigest()[:16], 16)
+
+
+class HashRing:
+    """
+    Кольцо консистентного хеширования букмекеров по экземплярам.
+
+    При добавлении или удалении экземпляра переезжает только часть
+    букмекеров, остальные остаются на своих экземплярах.
+    """
+
+    def __init__(self, nodes: Iterable[str], replicas: int = RING_REPLICAS):
+        self.points = sorted(
+            (ring_hash(f"{node}#{replica}"), node)
+            for node in nodes for replica in range(replicas))
+        self.hashes = [point for point, node in self.points]
+
+    def node_for(self, key: str) -> Optional[str]:
+        if not self.points:
+            return None
+        index = bisect(self.hashes, ring_hash(key)) % len(self.points)
+        return self.points[index][1]
+
+
+def load_cluster(cluster_path: str) -> Dict[str, Any]:
+    with open(cluster_path, 'r') as f:
+        return json.load(f)
+
+
+def assign_partitions(cluster: Dict[str, Any],
+                      bookmakers: Iterable[str]) -> Dict[str, Partition]:
+    """
+    Распределяет букмекеров по экземплярам анализатора.
+
+    Экземпляр с явным списком "bookmakers" получает ровно этих букмекеров;
+    остальные букмекеры раскладываются консистентным хешированием по
+    экземплярам без списка. Необязательный "sports" ограничивает виды
+    спорта экземпляра, так что одного букмекера можно разделить между
+    экземплярами по видам спорта. Разделы не должны пересекаться по паре
+    (букмекер, вид спорта): агрегатор различает значения только по ключу.
+
+    :param cluster: {"port": 8765, "instances": {name: {"port": ...,
+                    "bookmakers": [...], "sports": [...]}}}
+    :param bookmakers: Включенные букмекеры, кроме Pinnacle
+    :return: {name: Partition}
+    """
+    instances = cluster['instances']
+    explicit = set()
+    owned = {}
+    for name, instance in instances.items():
+        if instance.get('bookmakers') is not None:
+            owned[name] = set(instance['bookmakers'])
+            explicit.update(owned[name])
+
+    ring = HashRing(name for name in instances if name not in owned)
+    hashed = {name: set() for name in instances if name not in owned}
+    for bookmaker in bookmakers:
+        if bookmaker in explicit:
+            continue
+        name = ring.node_for(bookmaker)
+        if name is None:
+            logging.warning(f"Букмекер {bookmaker} не назначен ни одному экземпляру")
+            continue
+        hashed[name].add(bookmaker)
+    owned.update(hashed)
+
+    return {
+        name: Partition(
+            name=name,
+            port=instance['port'],
+            bookmakers=frozenset(owned[name]),
+            sports=frozenset(instance['sports'])
+            if instance.get('sports') is not None else None,
+        )
+        for name, instance in instances.items()
+    }
+
+
+def enabled_bookmakers(config: Dict[str, Dict[str, Any]]) -> list:
+    """Включенные в bookmakers.json букмекеры, кроме Pinnacle."""
+    return [bookmaker for bookmaker, bookmaker_config in config.items()
+            if bookmaker != 'pinnacle' and bookmaker_config['enabled']]
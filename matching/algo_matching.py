@@ -1,17 +1,52 @@
-from mappings import mappings
+from mappings import Mappings, mappings as shared_mappings
+from parsers.name_keys import event_keys, team_keys
 from typing import Dict, Any, List, Tuple
 from fuzzywuzzy import fuzz
-from collections import defaultdict
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, namedtuple
 from datetime import datetime, timedelta
 
+# Допустимая разница во времени начала для первых двух кругов, секунды
+MATCH_TIME_WINDOW = 10 * 60
+
+# Признаки события для сопоставления. Считаются один раз за цикл
+# match_events и используются всеми кругами вместо повторной обработки
+# строк и обращений к маппингам в каждом круге.
+EventFeatures = namedtuple('EventFeatures', [
+    'country',       # страна после маппинга, для тенниса "None"
+    'league',        # лига после маппинга, для тенниса WTA/Challenger/ATP/ITF
+    'sport',
+    'start_time',    # начало матча (timestamp)
+    'day',           # дата начала матча
+    'home_team',
+    'away_team',
+    'names',         # "home away" для fuzz.ratio
+    'tennis_home',   # имена для сравнения теннисистов (в нижнем регистре),
+    'tennis_away',   # None, если обработка зависит от имени соперника
+    'outcomes',      # отпечаток исходов (см. MatchPairer.outcome_fingerprint)
+    'home_key',      # ключи команд для точного сопоставления
+    'away_key',      # (см. parsers.name_keys.event_keys)
+])
+
+TENNIS_LEAGUES = (('wta', 'WTA'), ('challenger', 'Challenger'),
+                  ('atp', 'ATP'), ('itf', 'ITF'))
+
 
 class MatchPairer:
-    def __init__(self, bookmaker: str, debug: bool = False):
-        self.mappings = mappings
+    def __init__(self, bookmaker: str, debug: bool = False,
+                 mappings: Mappings = None):
+        self.mappings = mappings if mappings is not None else shared_mappings
         self.bookmaker = bookmaker
         self.debug = debug
         self.high_fuzz_threshold = 85
         self.low_fuzz_threshold = 62
+        self.pinnacle_features: Dict[int, EventFeatures] = {}
+        self.other_features: Dict[int, EventFeatures] = {}
+        self.features_version = None
+        # Сопоставленные команды события другого букмекера для первого круга,
+        # сбрасываются при изменении маппингов команд
+        self.mapped_teams_cache: Dict[int, tuple] = {}
+        self.mapped_teams_version = None
 
     def load_matched_events(self) -> Dict[Tuple[int, int], Dict[str, Any]]:
         events = self.mappings.load_matched_events(self.bookmaker)
@@ -31,9 +66,27 @@ class MatchPairer:
             unmatched_pinnacle.pop(pin_id, None)
             unmatched_other.pop(other_id, None)
 
+        self.pinnacle_features = self.extract_features(unmatched_pinnacle,
+                                                       is_pinnacle=True)
+        self.other_features = self.extract_features(unmatched_other)
+        self.features_version = self.grouping_version()
+        self.mapped_teams_cache = {}
+        self.mapped_teams_version = None
+
+        # Точный поиск по ключам имен и общему индексу алиасов до нечеткого
+        # сравнения
+        alias_matches = self.match_by_alias(unmatched_pinnacle,
+                                            unmatched_other)
+        matched_events.extend(alias_matches)
+
+        for match in alias_matches:
+            unmatched_pinnacle.pop(match['pinnacle_id'], None)
+            unmatched_other.pop(match['other_id'], None)
+
         # Первый круг: сопоставление с учетом лиги
-        grouped_pinnacle = self.group_events(unmatched_pinnacle)
-        grouped_other = self.group_events(unmatched_other)
+        grouped_pinnacle = self.group_events(unmatched_pinnacle,
+                                             self.pinnacle_features)
+        grouped_other = self.group_events(unmatched_other, self.other_features)
 
         # New step: Match based on one known team
         single_team_matches = self.match_on_single_team(grouped_pinnacle,
@@ -57,9 +110,11 @@ class MatchPairer:
             unmatched_other.pop(match['other_id'], None)
 
         # Второй круг: сопоставление без учета лиги
+        self.refresh_features(unmatched_pinnacle, unmatched_other)
         grouped_pinnacle_no_league = self.group_events_no_league(
-            unmatched_pinnacle)
-        grouped_other_no_league = self.group_events_no_league(unmatched_other)
+            unmatched_pinnacle, self.pinnacle_features)
+        grouped_other_no_league = self.group_events_no_league(
+            unmatched_other, self.other_features)
 
         second_round_matches = self.second_round_matching(
             grouped_pinnacle_no_league, grouped_other_no_league,
@@ -71,8 +126,12 @@ class MatchPairer:
             unmatched_other.pop(match['other_id'], None)
 
         # Третий круг: сопоставление с учетом времени, округленного до дня
-        grouped_pinnacle_by_day = self.group_events_by_day(unmatched_pinnacle)
-        grouped_other_by_day = self.group_events_by_day(unmatched_other)
+        # (маппинги лиг могли пополниться в первых кругах)
+        self.refresh_features(unmatched_pinnacle, unmatched_other)
+        grouped_pinnacle_by_day = self.group_events_by_day(
+            unmatched_pinnacle, self.pinnacle_features)
+        grouped_other_by_day = self.group_events_by_day(unmatched_other,
+                                                        self.other_features)
 
         third_round_matches = self.third_round_matching(
             grouped_pinnacle_by_day, grouped_other_by_day, unmatched_pinnacle,
@@ -92,189 +151,354 @@ class MatchPairer:
 
         return matched_events, unmatched_pinnacle, unmatched_other
 
-    def compare_tennis_names(self, pinnacle_name, other_name, bookmaker):
-        def process_name(name, is_pinnacle=False):
-
-            if is_pinnacle and bookmaker.lower() == 'sansabet':
-                # Для Pinnacle: оставляем только первую букву фамилии
-                words = name.split()
-                if len(words) > 1:
-                    return f"{' '.join(words[1:])} {words[0][0]}."
-
-            if is_pinnacle and bookmaker.lower() == 'fonbet':
-                # Для Pinnacle: оставляем только первую букву фамилии
-                words = name.split()
-                if len(words) > 1:
-                    name = words[0]
-                    if len(other_name.split()[-1]) == 1:
-                        name = name[0]
-                    return f"{' '.join(words[1:])} {name}"
-            if not is_pinnacle and bookmaker.lower() == 'admiralbet_me':
-                #     имя и фамилия записаны через запятую, меняем местами
-                if ',' in name:
-                    last_name, first_name = name.split(',', 1)
-                    return f"{first_name.strip()} {last_name.strip()}"
-            # elif any(bk in bookmaker.lower() for bk in
-            #          ['unibet', 'bingoal', 'scooore']):
-            #     # Для Unibet, Bingoal, Scooore: меняем местами части имени
-            #     if ',' in name:
-            #         last_name, first_name = name.split(',', 1)
-            #         return f"{first_name.strip()} {last_name.strip()}"
-
-            return name
-
-        processed_pinnacle = process_name(pinnacle_name, is_pinnacle=True)
-        processed_other = process_name(other_name)
-
-        similarity = fuzz.ratio(processed_pinnacle.lower(),
-                                processed_other.lower())
+    def process_tennis_name(self, name: str, is_pinnacle: bool = False,
+                            other_name: str = None) -> str:
+        bookmaker = self.bookmaker.lower()
+        if is_pinnacle and bookmaker == 'sansabet':
+            # Для Pinnacle: оставляем только первую букву фамилии
+            words = name.split()
+            if len(words) > 1:
+                return f"{' '.join(words[1:])} {words[0][0]}."
+
+        if is_pinnacle and bookmaker == 'fonbet':
+            # Для Pinnacle: оставляем только первую букву фамилии
+            words = name.split()
+            if len(words) > 1:
+                name = words[0]
+                if len(other_name.split()[-1]) == 1:
+                    name = name[0]
+                return f"{' '.join(words[1:])} {name}"
+        if not is_pinnacle and bookmaker == 'admiralbet_me':
+            #     имя и фамилия записаны через запятую, меняем местами
+            if ',' in name:
+                last_name, first_name = name.split(',', 1)
+                return f"{first_name.strip()} {last_name.strip()}"
+        # elif any(bk in bookmaker.lower() for bk in
+        #          ['unibet', 'bingoal', 'scooore']):
+        #     # Для Unibet, Bingoal, Scooore: меняем местами части имени
+        #     if ',' in name:
+        #         last_name, first_name = name.split(',', 1)
+        #         return f"{first_name.strip()} {last_name.strip()}"
+
+        return name
+
+    def prepare_tennis_name(self, name: str, is_pinnacle: bool = False):
+        """Обработанное имя в нижнем регистре или None, если оно зависит от соперника."""
+        if is_pinnacle and self.bookmaker.lower() == 'fonbet':
+            return None
+        return self.process_tennis_name(name, is_pinnacle).lower()
+
+    def compare_tennis_names(self, pinnacle_name, other_name, bookmaker,
+                             processed_pinnacle=None, processed_other=None):
+        if processed_pinnacle is None:
+            processed_pinnacle = self.process_tennis_name(
+                pinnacle_name, is_pinnacle=True, other_name=other_name).lower()
+        if processed_other is None:
+            processed_other = self.process_tennis_name(other_name).lower()
+
+        similarity = fuzz.ratio(processed_pinnacle, processed_other)
         # if similarity > 85:
         #     print(f"Сравнение имен: Сравнение имен{processed_pinnacle} vs {processed_other} -> {similarity}")
 
         return similarity
 
-    def group_events(self, events: Dict[int, Dict[str, Any]]) -> Dict[
-        Tuple[str, datetime, str, str], List[int]]:
-        grouped = defaultdict(list)
+    def tennis_similarity(self, pinnacle_features: EventFeatures,
+                          other_home: str, other_away: str,
+                          other_tennis_home: str = None,
+                          other_tennis_away: str = None) -> float:
+        return (self.compare_tennis_names(pinnacle_features.home_team,
+                                          other_home, self.bookmaker,
+                                          pinnacle_features.tennis_home,
+                                          other_tennis_home) +
+                self.compare_tennis_names(pinnacle_features.away_team,
+                                          other_away, self.bookmaker,
+                                          pinnacle_features.tennis_away,
+                                          other_tennis_away)) / 2
+
+    @staticmethod
+    def tennis_league(league: str) -> str:
+        league_lower = league.lower()
+        for marker, bucket in TENNIS_LEAGUES:
+            if marker in league_lower:
+                return bucket
+        return league
+
+    def grouping_version(self) -> tuple:
+        return (self.mappings.get_version(self.bookmaker, 'countries'),
+                self.mappings.get_version(self.bookmaker, 'leagues'))
+
+    def extract_features(self, events: Dict[int, Dict[str, Any]],
+                         is_pinnacle: bool = False) -> Dict[int, EventFeatures]:
+        """
+        Вычисляет признаки событий для всех кругов сопоставления.
+
+        :param events: События {id: событие}
+        :param is_pinnacle: События Pinnacle (влияет на обработку имен теннисистов)
+        :return: {id: EventFeatures}
+        """
+        features = {}
+        # Одинаковые страны и лиги встречаются у многих событий
+        countries = {}
+        leagues = {}
         for event_id, event in events.items():
             start_time = datetime.fromtimestamp(event["start_time"])
-            rounded_time = self.round_time(start_time, timedelta(minutes=10))
-            country = event["country"]
-            if not country:
-                country = "Unknown"
-            country = country.lower()
-            # print(country)
-            country = self.mappings.get_country(self.bookmaker, country)
-            # print(country)
-            league = event["league"]
-            league = self.mappings.get_league(self.bookmaker, league)
+
+            raw_country = event["country"]
+            if not raw_country:
+                raw_country = "Unknown"
+            country = countries.get(raw_country)
+            if country is None:
+                country = countries[raw_country] = self.mappings.get_country(
+                    self.bookmaker, raw_country.lower())
 
             sport = event.get("sport", "Unknown")
+            raw_league = event["league"]
+            league = leagues.get((raw_league, sport))
+            if league is None:
+                league = self.mappings.get_league(self.bookmaker, raw_league)
+                if league == raw_league and not is_pinnacle:
+                    # Лига еще не сопоставлена у этого букмекера, но могла
+                    # быть выучена на другом
+                    league = self.mappings.canonical.resolve_league(
+                        sport, raw_league) or raw_league
+                leagues[(raw_league, sport)] = league
+
+            home_team = event['home_team']
+            away_team = event['away_team']
+            # Ключи считает парсер; для старых данных считаем здесь
+            keys = event.get('name_keys') or event_keys(
+                home_team, away_team, raw_league, sport)
+            tennis_home = tennis_away = None
             if sport == "Tennis":
-                if "wta" in league.lower():
-                    league = "WTA"
-                elif "challenger" in league.lower():
-                    league = "Challenger"
-                elif "atp" in league.lower():
-                    league = "ATP"
-                elif "itf" in league.lower():
-                    league = "ITF"
-
-                translated_league = league
-                league = translated_league
+                league = self.tennis_league(league)
                 country = "None"
-            key = (country, rounded_time, league, sport)
+                tennis_home = self.prepare_tennis_name(home_team, is_pinnacle)
+                tennis_away = self.prepare_tennis_name(away_team, is_pinnacle)
+
+            features[event_id] = EventFeatures(
+                country=country,
+                league=league,
+                sport=sport,
+                start_time=event["start_time"],
+                day=start_time.date(),
+                home_team=home_team,
+                away_team=away_team,
+                names=f"{home_team} {away_team}",
+                tennis_home=tennis_home,
+                tennis_away=tennis_away,
+                outcomes=self.outcome_fingerprint(event.get('outcomes', [])),
+                home_key=keys['home_key'],
+                away_key=keys['away_key'],
+            )
+        return features
+
+    def refresh_features(self, unmatched_pinnacle: Dict[int, Dict[str, Any]],
+                         unmatched_other: Dict[int, Dict[str, Any]]):
+        """Пересчитывает признаки, если маппинги стран или лиг изменились."""
+        version = self.grouping_version()
+        if version == self.features_version:
+            return
+        self.pinnacle_features = self.extract_features(unmatched_pinnacle,
+                                                       is_pinnacle=True)
+        self.other_features = self.extract_features(unmatched_other)
+        self.features_version = version
+
+    def group_events(self, events: Dict[int, Dict[str, Any]],
+                     features_by_id: Dict[int, EventFeatures] = None) -> Dict[
+        Tuple[str, str, str], List[int]]:
+        """
+        Группирует события по (страна, лига, спорт), внутри группы события
+        отсортированы по времени начала для поиска в окне MATCH_TIME_WINDOW.
+        """
+        if features_by_id is None:
+            features_by_id = self.extract_features(events)
+        grouped = defaultdict(list)
+        for event_id in events:
+            features = features_by_id[event_id]
+            key = (features.country, features.league, features.sport)
             grouped[key].append(event_id)
-        return grouped
+        return self.sort_groups(grouped, features_by_id)
 
-    def group_events_no_league(self, events: Dict[int, Dict[str, Any]]) -> \
+    def group_events_no_league(self, events: Dict[int, Dict[str, Any]],
+                               features_by_id: Dict[int, EventFeatures] = None) -> \
             Dict[
-                Tuple[str, datetime, str], List[int]]:
+                Tuple[str, str], List[int]]:
+        if features_by_id is None:
+            features_by_id = self.extract_features(events)
         grouped = defaultdict(list)
-        for event_id, event in events.items():
-            start_time = datetime.fromtimestamp(
-                event["start_time"])
-            rounded_time = self.round_time(start_time, timedelta(minutes=10))
-            country = event["country"]
-            if not country:
-                country = "Unknown"
-            country = country.lower()
-            country = self.mappings.get_country(self.bookmaker, country)
-            sport = event.get("sport", "Unknown")
-            if sport == "Tennis":
-                country = "None"
-
-            key = (country, rounded_time, sport)
+        for event_id in events:
+            features = features_by_id[event_id]
+            key = (features.country, features.sport)
             grouped[key].append(event_id)
-        return grouped
+        return self.sort_groups(grouped, features_by_id)
 
-    def group_events_by_day(self, events: Dict[int, Dict[str, Any]]) -> Dict[
+    def group_events_by_day(self, events: Dict[int, Dict[str, Any]],
+                            features_by_id: Dict[int, EventFeatures] = None) -> Dict[
         Tuple[str, datetime.date, str], List[int]]:
+        if features_by_id is None:
+            features_by_id = self.extract_features(events)
         grouped = defaultdict(list)
-        for event_id, event in events.items():
-            start_time = datetime.fromtimestamp(
-                event["start_time"])
-            day = start_time.date()
-            country = event["country"]
-            if not country:
-                country = "Unknown"
-            country = country.lower()
-            country = self.mappings.get_country(self.bookmaker, country)
-            league = event["league"]
-            league = self.mappings.get_league(self.bookmaker, league)
-            sport = event.get("sport", "Unknown")
-
-            if sport == "Tennis":
-                translated_league = league
-                if "wta" in league.lower():
-                    translated_league = "WTA"
-                elif "challenger" in league.lower():
-                    translated_league = "Challenger"
-                elif "atp" in league.lower():
-                    translated_league = "ATP"
-                elif "itf" in league.lower():
-                    translated_league = "ITF"
-                league = translated_league
-                country = "None"
-            key = (country, day, sport, league)
+        for event_id in events:
+            features = features_by_id[event_id]
+            key = (features.country, features.day, features.sport,
+                   features.league)
             grouped[key].append(event_id)
         return grouped
 
+    @staticmethod
+    def sort_groups(grouped: Dict[tuple, List[int]],
+                    features_by_id: Dict[int, EventFeatures]) -> Dict[
+        tuple, List[int]]:
+        for event_ids in grouped.values():
+            event_ids.sort(key=lambda event_id: features_by_id[event_id].start_time)
+        return grouped
+
+    def window_candidates(self, pinnacle_features: EventFeatures,
+                          other_group: List[int], other_times: List[float],
+                          matched_other: set) -> List[int]:
+        """
+        Несопоставленные события группы, начинающиеся не дальше
+        MATCH_TIME_WINDOW от события Pinnacle, ближайшие по времени первыми.
+
+        :param other_group: События группы, отсортированные по времени начала
+        :param other_times: Времена начала событий other_group
+        :param matched_other: Уже сопоставленные в этом круге события
+        """
+        start_time = pinnacle_features.start_time
+        lo = bisect_left(other_times, start_time - MATCH_TIME_WINDOW)
+        hi = bisect_right(other_times, start_time + MATCH_TIME_WINDOW)
+        return self.closest_first(pinnacle_features, other_group[lo:hi],
+                                  matched_other)
+
+    def closest_first(self, pinnacle_features: EventFeatures,
+                      other_ids: List[int], matched_other: set) -> List[int]:
+        start_time = pinnacle_features.start_time
+        candidates = [o_id for o_id in other_ids if o_id not in matched_other]
+        candidates.sort(key=lambda o_id: abs(
+            self.other_features[o_id].start_time - start_time))
+        return candidates
+
+    def group_times(self, other_group: List[int]) -> List[float]:
+        return [self.other_features[o_id].start_time for o_id in other_group]
+
     @staticmethod
     def round_time(dt: datetime, delta: timedelta) -> datetime:
         return dt - (dt - datetime.min) % delta
 
+    def canonical_key(self, sport: str, team: str, team_key: str) -> str:
+        """
+        Ключ команды события другого букмекера: ключ имени Pinnacle, если
+        команда есть в общем индексе алиасов, иначе собственный ключ.
+        """
+        canonical = self.mappings.canonical.resolve_team(sport, team)
+        if canonical is None:
+            return team_key
+        return team_keys(canonical, sport)[1]
+
+    def match_by_alias(self, pinnacle_events: Dict[int, Dict[str, Any]],
+                       other_events: Dict[int, Dict[str, Any]]) -> List[
+        Dict[str, Any]]:
+        """
+        Сопоставляет события по точному совпадению ключей обеих команд
+        (после разрешения алиасов, см. CanonicalIndex) с событием Pinnacle,
+        начинающимся не дальше MATCH_TIME_WINDOW.
+
+        :return: Список совпадений
+        """
+        pinnacle_by_teams = defaultdict(list)
+        for p_id in pinnacle_events:
+            features = self.pinnacle_features[p_id]
+            if features.home_key and features.away_key:
+                key = (features.sport, features.home_key, features.away_key)
+                pinnacle_by_teams[key].append(p_id)
+        if not pinnacle_by_teams:
+            return []
+
+        matches = []
+        matched_pinnacle = set()
+        for o_id in other_events:
+            features = self.other_features[o_id]
+            candidates = pinnacle_by_teams.get((
+                features.sport,
+                self.canonical_key(features.sport, features.home_team,
+                                   features.home_key),
+                self.canonical_key(features.sport, features.away_team,
+                                   features.away_key)))
+            if not candidates:
+                continue
+
+            best_id = None
+            best_delta = MATCH_TIME_WINDOW
+            for p_id in candidates:
+                delta = abs(self.pinnacle_features[p_id].start_time -
+                            features.start_time)
+                if p_id not in matched_pinnacle and delta <= best_delta:
+                    best_id, best_delta = p_id, delta
+            if best_id is None:
+                continue
+
+            match = self.create_match(best_id, o_id, pinnacle_events,
+                                      other_events)
+            matches.append(match)
+            matched_pinnacle.add(best_id)
+            if self.debug:
+                print(f"Alias match found: {match}")
+
+        return matches
+
     def first_round_matching(self, grouped_pinnacle: Dict[
-        Tuple[str, datetime, str, str], List[int]],
+        Tuple[str, str, str], List[int]],
                              grouped_other: Dict[
-                                 Tuple[str, datetime, str, str], List[int]],
+                                 Tuple[str, str, str], List[int]],
                              pinnacle_events: Dict[int, Dict[str, Any]],
                              other_events: Dict[int, Dict[str, Any]]) -> List[
         Dict[str, Any]]:
         matches = []
-        for key in set(grouped_pinnacle.keys()) & set(grouped_other.keys()):
+        matched_other = set()
+        for key in grouped_pinnacle.keys() & grouped_other.keys():
             pinnacle_group = grouped_pinnacle[key]
             other_group = grouped_other[key]
+            other_times = self.group_times(other_group)
 
-            country, _, league, sport = key
+            country, league, sport = key
 
             if self.debug:
                 print(f"Processing group: {country}, {league}, {sport}")
 
             for p_id in pinnacle_group:
                 pinnacle_event = pinnacle_events[p_id]
-                for o_id in other_group:
+                pinnacle_features = self.pinnacle_features[p_id]
+                for o_id in self.window_candidates(pinnacle_features,
+                                                   other_group, other_times,
+                                                   matched_other):
                     other_event = other_events[o_id]
 
-                    mapped_home_team, mapped_away_team = self.get_mapped_teams(
-                        country, league, other_event, sport)
+                    (mapped_home_team, mapped_away_team, mapped_names,
+                     tennis_home, tennis_away) = self.get_cached_mapped_teams(
+                        o_id, country, league, other_event, sport)
 
                     if self.debug:
                         print(
                             f"Comparing: {pinnacle_event['home_team']} vs {mapped_home_team}, {pinnacle_event['away_team']} vs {mapped_away_team}")
 
-                    pin_home = pinnacle_event['home_team']
-                    pin_away = pinnacle_event['away_team']
-
-                    similarity = fuzz.ratio(f"{pin_home} {pin_away}",
-                                            f"{mapped_home_team} {mapped_away_team}")
                     if sport == "Tennis":
-                        similarity = (self.compare_tennis_names(pin_home,
-                                                                mapped_home_team,
-                                                                self.bookmaker) + self.compare_tennis_names(
-                            pin_away, mapped_away_team, self.bookmaker)) / 2
-
-                    # Используем низкий порог, если коэффициенты подходят
-                    if self.check_no_value_and_outcome_count(pinnacle_event,
-                                                             other_event):
-                        fuzz_threshold = self.low_fuzz_threshold
+                        similarity = self.tennis_similarity(
+                            pinnacle_features, mapped_home_team,
+                            mapped_away_team, tennis_home, tennis_away)
                     else:
-                        fuzz_threshold = self.high_fuzz_threshold
+                        similarity = fuzz.ratio(pinnacle_features.names,
+                                                mapped_names)
 
-                    if similarity > fuzz_threshold:
+                    # Используем низкий порог, если коэффициенты подходят
+                    if self.passes_threshold(similarity,
+                                             self.low_fuzz_threshold,
+                                             self.high_fuzz_threshold,
+                                             pinnacle_features,
+                                             self.other_features[o_id]):
                         match = self.create_match(p_id, o_id, pinnacle_events,
                                                   other_events)
                         matches.append(match)
+                        matched_other.add(o_id)
                         if self.debug:
                             print(f"Match found: {match}")
                         # Добавляем новый маппинг
@@ -292,56 +516,53 @@ class MatchPairer:
                                                   pinnacle_event['league'],
                                                   country)
                         break  # Прерываем внутренний цикл после нахождения соответствия
-                if p_id in [match['pinnacle_id'] for match in matches]:
-                    break  # Прерываем внешний цикл, если нашли соответствие
 
         return matches
 
     def second_round_matching(self, grouped_pinnacle: Dict[
-        Tuple[str, datetime, str], List[int]],
+        Tuple[str, str], List[int]],
                               grouped_other: Dict[
-                                  Tuple[str, datetime, str], List[int]],
+                                  Tuple[str, str], List[int]],
                               pinnacle_events: Dict[int, Dict[str, Any]],
                               other_events: Dict[int, Dict[str, Any]]) -> \
             List[Dict[str, Any]]:
         matches = []
-        for key in set(grouped_pinnacle.keys()) & set(grouped_other.keys()):
+        matched_other = set()
+        for key in grouped_pinnacle.keys() & grouped_other.keys():
             pinnacle_group = grouped_pinnacle[key]
             other_group = grouped_other[key]
+            other_times = self.group_times(other_group)
 
-            country, _, sport = key
+            country, sport = key
 
             if self.debug:
                 print(f"Processing group (2nd round): {country}, {sport}")
 
             for p_id in pinnacle_group:
                 pinnacle_event = pinnacle_events[p_id]
-                for o_id in other_group:
+                pinnacle_features = self.pinnacle_features[p_id]
+                for o_id in self.window_candidates(pinnacle_features,
+                                                   other_group, other_times,
+                                                   matched_other):
                     other_event = other_events[o_id]
-
-                    pin_home = pinnacle_event['home_team']
-                    pin_away = pinnacle_event['away_team']
-                    other_home = other_event['home_team']
-                    other_away = other_event['away_team']
-
-                    similarity = fuzz.ratio(f"{pin_home} {pin_away}",
-                                            f"{other_home} {other_away}")
-                    # Используем низкий порог, если коэффициенты подходят
-                    if self.check_no_value_and_outcome_count(pinnacle_event,
-                                                             other_event):
-                        fuzz_threshold = 70
-                    else:
-                        fuzz_threshold = 90
-
+                    other_features = self.other_features[o_id]
                     if sport == "Tennis":
-                        similarity = (self.compare_tennis_names(pin_home,
-                                                                other_home,
-                                                                self.bookmaker) + self.compare_tennis_names(
-                            pin_away, other_away, self.bookmaker)) / 2
-                    if similarity > fuzz_threshold:  # Повышенное требование к соответствию
+                        similarity = self.tennis_similarity(
+                            pinnacle_features, other_features.home_team,
+                            other_features.away_team,
+                            other_features.tennis_home,
+                            other_features.tennis_away)
+                    else:
+                        similarity = fuzz.ratio(pinnacle_features.names,
+                                                other_features.names)
+                    # Используем низкий порог, если коэффициенты подходят
+                    if self.passes_threshold(similarity, 70, 90,
+                                             pinnacle_features,
+                                             other_features):  # Повышенное требование к соответствию
                         match = self.create_match(p_id, o_id, pinnacle_events,
                                                   other_events)
                         matches.append(match)
+                        matched_other.add(o_id)
                         if self.debug:
                             print(f"Second round match found: {match}")
                         # Добавляем новый маппинг с учетом лиги
@@ -361,8 +582,6 @@ class MatchPairer:
                                                   pinnacle_event['league'],
                                                   country)
                         break  # Прерываем внутренний цикл после нахождения соответствия
-                if p_id in [match['pinnacle_id'] for match in matches]:
-                    break  # Прерываем внешний цикл, если нашли соответствие
 
         return matches
 
@@ -374,7 +593,8 @@ class MatchPairer:
                              other_events: Dict[int, Dict[str, Any]]) -> List[
         Dict[str, Any]]:
         matches = []
-        for key in set(grouped_pinnacle.keys()) & set(grouped_other.keys()):
+        matched_other = set()
+        for key in grouped_pinnacle.keys() & grouped_other.keys():
             pinnacle_group = grouped_pinnacle[key]
             other_group = grouped_other[key]
 
@@ -385,31 +605,28 @@ class MatchPairer:
 
             for p_id in pinnacle_group:
                 pinnacle_event = pinnacle_events[p_id]
-                for o_id in other_group:
+                pinnacle_features = self.pinnacle_features[p_id]
+                for o_id in self.closest_first(pinnacle_features, other_group,
+                                               matched_other):
                     other_event = other_events[o_id]
-
-                    pin_home = pinnacle_event['home_team']
-                    pin_away = pinnacle_event['away_team']
-                    other_home = other_event['home_team']
-                    other_away = other_event['away_team']
-
-                    similarity = fuzz.ratio(f"{pin_home} {pin_away}",
-                                            f"{other_home} {other_away}")
-                    # Используем низкий порог, если коэффициенты подходят
-                    if self.check_no_value_and_outcome_count(pinnacle_event,
-                                                             other_event):
-                        fuzz_threshold = 70
-                    else:
-                        fuzz_threshold = 85
+                    other_features = self.other_features[o_id]
                     if sport == "Tennis":
-                        similarity = (self.compare_tennis_names(pin_home,
-                                                                other_home,
-                                                                self.bookmaker) + self.compare_tennis_names(
-                            pin_away, other_away, self.bookmaker)) / 2
-                    if similarity > fuzz_threshold:
+                        similarity = self.tennis_similarity(
+                            pinnacle_features, other_features.home_team,
+                            other_features.away_team,
+                            other_features.tennis_home,
+                            other_features.tennis_away)
+                    else:
+                        similarity = fuzz.ratio(pinnacle_features.names,
+                                                other_features.names)
+                    # Используем низкий порог, если коэффициенты подходят
+                    if self.passes_threshold(similarity, 70, 85,
+                                             pinnacle_features,
+                                             other_features):
                         match = self.create_match(p_id, o_id, pinnacle_events,
                                                   other_events)
                         matches.append(match)
+                        matched_other.add(o_id)
                         if self.debug:
                             print(f"Third round match found: {match}")
                         # Добавляем новый маппинг с учетом лиги
@@ -429,24 +646,23 @@ class MatchPairer:
                                                   pinnacle_event['league'],
                                                   country)
                         break  # Прерываем внутренний цикл после нахождения соответствия
-                if p_id in [match['pinnacle_id'] for match in matches]:
-                    break  # Прерываем внешний цикл, если нашли соответствие
 
         return matches
 
     def match_on_single_team(self, grouped_pinnacle: Dict[
-        Tuple[str, datetime, str, str], List[int]],
+        Tuple[str, str, str], List[int]],
                              grouped_other: Dict[
-                                 Tuple[str, datetime, str, str], List[int]],
+                                 Tuple[str, str, str], List[int]],
                              pinnacle_events: Dict[int, Dict[str, Any]],
                              other_events: Dict[int, Dict[str, Any]]) -> List[
         Dict[str, Any]]:
         new_matches = []
-        for key in set(grouped_pinnacle.keys()) & set(grouped_other.keys()):
+        for key in grouped_pinnacle.keys() & grouped_other.keys():
             pinnacle_group = grouped_pinnacle[key]
             other_group = grouped_other[key]
+            other_times = self.group_times(other_group)
 
-            country, _, league, sport = key
+            country, league, sport = key
 
             for p_id in list(pinnacle_group):
                 pinnacle_event = pinnacle_events[p_id]
@@ -459,7 +675,9 @@ class MatchPairer:
                                                       league, pinnacle_away)
 
                 if matched_home or matched_away:
-                    for o_id in list(other_group):
+                    for o_id in self.window_candidates(
+                            self.pinnacle_features[p_id], other_group,
+                            other_times, ()):
                         other_event = other_events[o_id]
                         other_home = other_event['home_team']
                         other_away = other_event['away_team']
@@ -471,7 +689,9 @@ class MatchPairer:
                                                       other_events)
                             new_matches.append(match)
                             pinnacle_group.remove(p_id)
-                            other_group.remove(o_id)
+                            index = other_group.index(o_id)
+                            del other_group[index]
+                            del other_times[index]
                             break
 
         return new_matches
@@ -503,6 +723,37 @@ class MatchPairer:
 
         return mapped_home_team, mapped_away_team
 
+    def get_cached_mapped_teams(self, other_id: int, country: str,
+                                league: str, event: Dict[str, Any],
+                                sport: str) -> tuple:
+        """
+        get_mapped_teams с кэшем на цикл: команды события сопоставляются
+        один раз, а не для каждой пары в группе. Кэш сбрасывается, когда
+        меняются маппинги команд.
+
+        :return: (home, away, "home away", теннисные имена home/away)
+        """
+        version = self.mappings.get_version(self.bookmaker, 'teams')
+        if version != self.mapped_teams_version:
+            self.mapped_teams_cache = {}
+            self.mapped_teams_version = version
+
+        key = (other_id, country, league)
+        cached = self.mapped_teams_cache.get(key)
+        if cached is None:
+            home_team, away_team = self.get_mapped_teams(country, league,
+                                                         event, sport)
+            tennis_home = tennis_away = None
+            if sport == "Tennis":
+                tennis_home = self.prepare_tennis_name(home_team)
+                tennis_away = self.prepare_tennis_name(away_team)
+            cached = (home_team, away_team, f"{home_team} {away_team}",
+                      tennis_home, tennis_away)
+            # get_mapped_teams мог добавить маппинг, тогда кэш уже устарел
+            if self.mappings.get_version(self.bookmaker, 'teams') == version:
+                self.mapped_teams_cache[key] = cached
+        return cached
+
     def create_match(self, pinnacle_id: int, other_id: int,
                      pinnacle_events: Dict[int, Dict[str, Any]],
                      other_events: Dict[int, Dict[str, Any]]) -> Dict[
@@ -533,23 +784,54 @@ class MatchPairer:
 
     def check_no_value_and_outcome_count(self, event1: Dict[str, Any],
                                          event2: Dict[str, Any]) -> bool:
-        outcomes1 = self.get_outcomes_dict(event1.get('outcomes', []))
-        outcomes2 = self.get_outcomes_dict(event2.get('outcomes', []))
-
-        common_outcomes = set(outcomes1.keys()) & set(outcomes2.keys())
-
-        valid_outcomes_count = sum(1 for outcome in common_outcomes
-                                   if outcomes1[outcome] < 4 and outcomes2[
-                                       outcome] < 4)
-
-        if valid_outcomes_count < 4:
+        return self.compare_fingerprints(
+            self.outcome_fingerprint(event1.get('outcomes', [])),
+            self.outcome_fingerprint(event2.get('outcomes', [])))
+
+    def passes_threshold(self, similarity: float, low_threshold: float,
+                         high_threshold: float,
+                         pinnacle_features: EventFeatures,
+                         other_features: EventFeatures) -> bool:
+        """
+        similarity выше высокого порога или выше низкого, если коэффициенты
+        событий согласуются. Сравнение коэффициентов выполняется, только
+        когда от него зависит результат.
+        """
+        if similarity > high_threshold:
+            return True
+        return similarity > low_threshold and self.compare_fingerprints(
+            pinnacle_features.outcomes, other_features.outcomes)
+
+    @classmethod
+    def outcome_fingerprint(cls, outcomes: List[Dict[str, Any]]) -> Dict[
+        tuple, float]:
+        """
+        Отпечаток исходов события: {(type, line): odds} только для odds < 4,
+        остальные исходы в сравнении не участвуют. Строится один раз на
+        событие за цикл.
+        """
+        return {key: odds for key, odds in cls.get_outcomes_dict(outcomes).items()
+                if odds < 4}
+
+    @classmethod
+    def compare_fingerprints(cls, fingerprint1: Dict[tuple, float],
+                             fingerprint2: Dict[tuple, float]) -> bool:
+        """
+        Не меньше 4 общих исходов с odds < 4 и ни в одном нет перевеса
+        (calculate_value) второго события над первым.
+        """
+        if len(fingerprint1) > len(fingerprint2):
+            common_outcomes = fingerprint2.keys() & fingerprint1.keys()
+        else:
+            common_outcomes = fingerprint1.keys() & fingerprint2.keys()
+
+        if len(common_outcomes) < 4:
             return False
 
         for outcome in common_outcomes:
-            if outcomes1[outcome] < 4 and outcomes2[outcome] < 4:
-                if self.calculate_value(outcomes1[outcome],
-                                        outcomes2[outcome]):
-                    return False
+            if cls.calculate_value(fingerprint1[outcome],
+                                   fingerprint2[outcome]):
+                return False
 
         return True
 
@@ -0,0 +1,95 @@
+import logging
+from typing import Any, Dict, Iterable, Optional
+
+from parsers.name_keys import fold
+
+# Версия схемы ключей алиасов: при ее смене индекс строится заново
+KEYS_VERSION = 2
+# Алиас, который разные подтвержденные совпадения связали с разными
+# каноническими именами; такой алиас не используется
+CONFLICT = ""
+
+
+def alias_key(sport: str, name: str) -> str:
+    """Ключ алиаса: вид спорта и имя, приведенное к ASCII (см. name_keys.fold)."""
+    return f"{sport}|{fold(name)}"
+
+
+class CanonicalIndex:
+    """
+    Общий для всех букмекеров индекс канонических команд и лиг.
+
+    Каноническое имя - имя Pinnacle. Каждое подтвержденное совпадение любого
+    букмекера добавляет алиасы (имя у букмекера -> имя Pinnacle), поэтому
+    то, что выучено на одном букмекере, сразу работает для остальных:
+    события нового букмекера находятся точным поиском по алиасам до
+    нечеткого сравнения. Алиасы хранятся по виду спорта; алиас, который
+    указывает на разные имена, помечается как конфликтный и игнорируется.
+    """
+
+    def __init__(self, teams: Dict[str, str] = None,
+                 leagues: Dict[str, str] = None):
+        self.teams: Dict[str, str] = dict(teams or {})
+        self.leagues: Dict[str, str] = dict(leagues or {})
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CanonicalIndex':
+        return cls(data.get('teams'), data.get('leagues'))
+
+    def to_dict(self) -> Dict[str, Dict[str, str]]:
+        return {'version': KEYS_VERSION, 'teams': dict(self.teams),
+                'leagues': dict(self.leagues)}
+
+    def __len__(self) -> int:
+        return len(self.teams) + len(self.leagues)
+
+    @staticmethod
+    def add_alias(aliases: Dict[str, str], sport: str, alias: str,
+                  canonical: str) -> bool:
+        if not alias or not canonical:
+            return False
+        key = alias_key(sport, alias)
+        known = aliases.get(key)
+        if known is None:
+            aliases[key] = canonical
+            return True
+        if known != canonical and known != CONFLICT:
+            logging.debug(f"Конфликт алиаса {key}: {known} / {canonical}")
+            aliases[key] = CONFLICT
+            return True
+        return False
+
+    def learn_match(self, match: Dict[str, Any]) -> bool:
+        """
+        Добавляет алиасы из подтвержденного совпадения (см. MatchPairer.create_match).
+
+        :return: True, если индекс изменился
+        """
+        sport = match.get('sport', 'Unknown')
+        changed = False
+        for side in ('home_team', 'away_team'):
+            canonical = match.get(f'pinnacle_{side}')
+            # Имя Pinnacle - алиас самого себя
+            changed |= self.add_alias(self.teams, sport, canonical, canonical)
+            changed |= self.add_alias(self.teams, sport,
+                                      match.get(f'other_{side}'), canonical)
+        canonical_league = match.get('pinnacle_league')
+        changed |= self.add_alias(self.leagues, sport, canonical_league,
+                                  canonical_league)
+        changed |= self.add_alias(self.leagues, sport,
+                                  match.get('other_league'), canonical_league)
+        return changed
+
+    def learn_matches(self, matches: Iterable[Dict[str, Any]]) -> int:
+        return sum(1 for match in matches if self.learn_match(match))
+
+    def resolve_team(self, sport: str, name: str) -> Optional[str]:
+        """Каноническое имя команды или None, если алиас неизвестен или конфликтный."""
+        if not name:
+            return None
+        return self.teams.get(alias_key(sport, name)) or None
+
+    def resolve_league(self, sport: str, name: str) -> Optional[str]:
+        if not name:
+            return None
+        return self.leagues.get(alias_key(sport, name)) or None
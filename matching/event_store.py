@@ -0,0 +1,86 @@
+import logging
+import time
+
+from parsers.registry import MatchRegistry
+
+# Сколько секунд букмекер может не присылать матч, прежде чем он считается
+# снятым с линии (парсер переподключается, упал и т.п.)
+EVENT_TTL = 300.0
+# Сколько секунд после начала прематч-матч еще участвует в сопоставлении
+KICKOFF_GRACE = 15 * 60
+MAX_EVENTS = 20000
+# Не чаще одного прохода вытеснения в секунду на букмекера
+EXPIRE_INTERVAL = 1.0
+
+
+class EventStore:
+    """
+    Матчи одного букмекера для сопоставления: {sport: {match_id: match}}.
+
+    Поверх реестра MatchRegistry (last-seen TTL, вытеснение после начала
+    матча, ограничение размера) хранится разбивка по видам спорта, которую
+    отдает get_data. Если матч сменил вид спорта, старая запись удаляется.
+    """
+
+    def __init__(self, name, ttl=EVENT_TTL, kickoff_grace=KICKOFF_GRACE,
+                 max_size=MAX_EVENTS, expire_interval=EXPIRE_INTERVAL):
+        self.name = name
+        self.by_sport = {}
+        self.sport_of = {}
+        self.expire_interval = expire_interval
+        self.last_expire = 0.0
+        self.registry = MatchRegistry(name, ttl=ttl, kickoff_ttl=kickoff_grace,
+                                      max_size=max_size,
+                                      on_evict=self.drop_evicted)
+
+    def __len__(self):
+        return len(self.registry)
+
+    def upsert(self, sport, match_id, match, now=None):
+        old_sport = self.sport_of.get(match_id)
+        if old_sport is not None and old_sport != sport:
+            self.by_sport[old_sport].pop(match_id, None)
+        self.registry.upsert(match_id, match, now)
+        self.by_sport.setdefault(sport, {})[match_id] = match
+        self.sport_of[match_id] = sport
+
+    def remove(self, match_id):
+        if self.registry.remove(match_id) is None:
+            return False
+        sport = self.sport_of.pop(match_id)
+        self.by_sport[sport].pop(match_id, None)
+        return True
+
+    def drop_evicted(self, removed):
+        for match_id in removed:
+            sport = self.sport_of.pop(match_id, None)
+            if sport is not None:
+                self.by_sport[sport].pop(match_id, None)
+
+    def expire(self, now=None, force=False):
+        """
+        Вытесняет устаревшие матчи (не чаще expire_interval, если не force).
+
+        :param now: Текущее время (по умолчанию time.time())
+        :param force: Выполнить проход независимо от интервала
+        :return: Словарь вытесненных матчей {match_id: match}
+        """
+        now = time.time() if now is None else now
+        if not force and now - self.last_expire < self.expire_interval:
+            return {}
+        self.last_expire = now
+        return self.registry.expire(now)
+
+    def get_data(self, sport=None):
+        if sport:
+            return self.by_sport.get(sport, {})
+        return self.by_sport
+
+    def stats(self, now=None):
+        stats = self.registry.stats(now)
+        stats['sports'] = {sport: len(matches)
+                           for sport, matches in self.by_sport.items()}
+        return stats
+
+    def log_stats(self):
+        logging.info(f"{self.name}: {self.stats()}")
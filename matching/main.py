@@ -1,28 +1,38 @@
 import asyncio
 import json
 import logging
+import os
+import sys
 import time
+
+# matching/ запускается из своей директории (python main.py), а общие
+# модули проекта (models.py, parsers/) лежат в корне репозитория
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from aiogram import Bot
 from websocket_client import WebSocketClient, PinnacleDataManager
-from algo_matching import MatchPairer
-from mappings import Mappings
+from parallel import MatchingPool
 
 logging.basicConfig(level=logging.DEBUG,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
 
 async def process_pinnacle_data(ws_client, pinnacle_manager):
+    updates = ws_client.pinnacle_updates
     while True:
         try:
-            pinnacle_data = ws_client.get_data('pinnacle')
-            if pinnacle_data:
-                logging.info(
-                    f"Получены данные Pinnacle: {len(pinnacle_data)} событий")
-                pinnacle_manager.update_matches(pinnacle_data)
-            else:
-                logging.debug("Данные Pinnacle отсутствуют")
-            await asyncio.sleep(
-                0.1)  # Небольшая задержка, чтобы не перегружать процессор
+            try:
+                changes = await asyncio.wait_for(updates.get(), timeout=1)
+            except asyncio.TimeoutError:
+                # Новых данных нет, только удаляем устаревшие матчи
+                pinnacle_manager.expire()
+                continue
+            # Забираем все накопившиеся изменения одним проходом
+            while not updates.empty():
+                changes.extend(updates.get_nowait())
+            applied = pinnacle_manager.apply_changes(changes)
+            pinnacle_manager.expire()
+            logging.debug(f"Применено {applied} изменений Pinnacle")
         except Exception as e:
             logging.error(f"Ошибка при обработке данных Pinnacle: {e}",
                           exc_info=True)
@@ -30,7 +40,8 @@ async def process_pinnacle_data(ws_client, pinnacle_manager):
 
 
 async def process_other_bookmakers(ws_client, bookmakers_config,
-                                   pinnacle_manager, bot, chat_id):
+                                   pinnacle_manager, matching_pool, bot,
+                                   chat_id):
     last_sent_time = time.time() - 19 * 60  # Инициализация времени последней отправки
     report_interval = 20 * 60  # 20 минут в секундах
 
@@ -49,46 +60,54 @@ async def process_other_bookmakers(ws_client, bookmakers_config,
                     else:
                         logging.warning(f"Данные {bookmaker} отсутствуют")
 
+            for bookmaker, stats in ws_client.get_stats().items():
+                logging.info(f"Хранилище {bookmaker}: {stats}")
+
             pinnacle_matches = pinnacle_manager.get_matches()
             logging.info(
                 f"Всего матчей Pinnacle: {sum(len(sport_data) for sport_data in pinnacle_matches.values())}")
 
             matching_data = []
 
-            for bookmaker, bookmaker_data in other_bookmakers_data.items():
-                match_pairer = MatchPairer(bookmaker=bookmaker)
-                for sport in pinnacle_matches.keys():
-                    if sport in bookmaker_data:
-                        new_matches, unmatched_pinnacle, unmatched_other = match_pairer.match_events(
-                            pinnacle_matches[sport], bookmaker_data[sport])
-
-                        total_pinnacle = len(pinnacle_matches[sport])
-                        total_bookmaker = len(bookmaker_data[sport])
-                        matched_percentage = 0
-                        if total_pinnacle > 0 and total_bookmaker > 0:
-                            if total_bookmaker > total_pinnacle:
-                                matched_percentage = 100 - (
-                                            len(unmatched_pinnacle) / total_pinnacle) * 100
-                            else:
-                                matched_percentage = 100 - (
-                                            len(unmatched_other) / total_bookmaker) * 100
-                            matched_percentage = round(matched_percentage, 2)
-                        else:
-                            matched_percentage = 0.0
-
-                        matching_data.append({
-                            'bookmaker': bookmaker,
-                            'sport': sport,
-                            'matched_percentage': matched_percentage,
-                            'total_pinnacle': total_pinnacle,
-                            'total_bookmaker': total_bookmaker
-                        })
-                        logging.info(
-                            f"Новые совпадения с {bookmaker} для {sport}: {len(new_matches)}")
-                        logging.info(
-                            f"Несопоставленные матчи Pinnacle для {sport}: {len(unmatched_pinnacle)}")
-                        logging.info(
-                            f"Несопоставленные матчи {bookmaker} для {sport}: {len(unmatched_other)}")
+            # Все пары (букмекер, спорт) сопоставляются параллельно в пуле
+            # процессов, цикл событий в это время продолжает принимать данные
+            results = await matching_pool.run_cycle(pinnacle_matches,
+                                                    other_bookmakers_data)
+
+            for result in results:
+                bookmaker = result['bookmaker']
+                sport = result['sport']
+                new_matches = result['new_matches']
+                unmatched_pinnacle = result['unmatched_pinnacle']
+                unmatched_other = result['unmatched_other']
+
+                total_pinnacle = result['total_pinnacle']
+                total_bookmaker = result['total_bookmaker']
+                matched_percentage = 0
+                if total_pinnacle > 0 and total_bookmaker > 0:
+                    if total_bookmaker > total_pinnacle:
+                        matched_percentage = 100 - (
+                                    len(unmatched_pinnacle) / total_pinnacle) * 100
+                    else:
+                        matched_percentage = 100 - (
+                                    len(unmatched_other) / total_bookmaker) * 100
+                    matched_percentage = round(matched_percentage, 2)
+                else:
+                    matched_percentage = 0.0
+
+                matching_data.append({
+                    'bookmaker': bookmaker,
+                    'sport': sport,
+                    'matched_percentage': matched_percentage,
+                    'total_pinnacle': total_pinnacle,
+                    'total_bookmaker': total_bookmaker
+                })
+                logging.info(
+                    f"Новые совпадения с {bookmaker} для {sport}: {len(new_matches)}")
+                logging.info(
+                    f"Несопоставленные матчи Pinnacle для {sport}: {len(unmatched_pinnacle)}")
+                logging.info(
+                    f"Несопоставленные матчи {bookmaker} для {sport}: {len(unmatched_other)}")
 
             # Проверяем, прошло ли 20 минут
             current_time = time.time()
@@ -153,6 +172,7 @@ async def main():
 
     ws_client = WebSocketClient(bookmakers_config)
     pinnacle_manager = PinnacleDataManager()
+    matching_pool = MatchingPool()
 
     while True:
         try:
@@ -163,7 +183,7 @@ async def main():
                 process_pinnacle_data(ws_client, pinnacle_manager))
             other_bookmakers_task = asyncio.create_task(
                 process_other_bookmakers(ws_client, bookmakers_config,
-                                         pinnacle_manager, bot,
+                                         pinnacle_manager, matching_pool, bot,
                                          TELEGRAM_CHAT_ID))
 
             # Ожидание завершения всех задач
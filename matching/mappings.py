@@ -1,3 +1,4 @@
+import copy
 import json
 import os
 import threading
@@ -5,6 +6,8 @@ import tempfile
 import shutil
 import logging
 from typing import Dict, Any, List, Tuple
+from models import to_jsonable
+from canonical_index import CanonicalIndex, KEYS_VERSION
 
 # Настройка логирования
 logging.basicConfig(level=logging.DEBUG,
@@ -12,11 +15,18 @@ logging.basicConfig(level=logging.DEBUG,
 
 
 class Mappings:
-    def __init__(self, mappings_dir: str = 'bookmaker_mappings'):
+    def __init__(self, mappings_dir: str = 'bookmaker_mappings',
+                 load: bool = True):
         self.mappings_dir = mappings_dir
         self.bookmaker_mappings: Dict[str, Dict[str, Dict[str, Any]]] = {}
         self.lock = threading.RLock()  # Переиспользуемая блокировка для предотвращения дедлоков
-        self.load_all_mappings()
+        # Счетчик изменений по (букмекер, тип маппинга): по нему кэши
+        # сопоставления понимают, что маппинги поменялись
+        self.versions: Dict[Tuple[str, str], int] = {}
+        # Общий для всех букмекеров индекс алиасов команд и лиг
+        self.canonical = CanonicalIndex()
+        if load:
+            self.load_all_mappings()
 
     def load_mapping(self, bookmaker: str, mapping_type: str) -> Dict[
         str, Any]:
@@ -51,6 +61,48 @@ class Mappings:
                 }
                 logging.info(f"Загружены маппинги для букмекера: {bookmaker}")
 
+        self.load_canonical()
+
+    def canonical_path(self) -> str:
+        return os.path.join(self.mappings_dir, "canonical.json")
+
+    def load_canonical(self):
+        """
+        Загружает общий индекс алиасов. Если файла еще нет или он записан
+        в старой схеме ключей, индекс строится из уже сопоставленных событий
+        всех букмекеров.
+        """
+        file_path = self.canonical_path()
+        data = self.load_json_file(file_path)
+        if data.get('version') == KEYS_VERSION:
+            self.canonical = CanonicalIndex.from_dict(data)
+        else:
+            self.canonical = CanonicalIndex()
+            for bookmaker in self.bookmaker_mappings:
+                self.canonical.learn_matches(
+                    self.load_matched_events(bookmaker))
+            if len(self.canonical):
+                self.save_json_file_atomic(file_path, self.canonical.to_dict())
+        logging.info(f"Загружен общий индекс алиасов: {len(self.canonical)}")
+
+    def learn_canonical(self, matched_events: List[Dict[str, Any]]):
+        """
+        Пополняет общий индекс алиасов подтвержденными совпадениями и
+        сохраняет его, если он изменился.
+
+        :param matched_events: Новые сопоставленные события (любого букмекера)
+        """
+        with self.lock:
+            if self.canonical.learn_matches(matched_events):
+                os.makedirs(self.mappings_dir, exist_ok=True)
+                self.save_json_file_atomic(self.canonical_path(),
+                                           self.canonical.to_dict())
+
+    def canonical_snapshot(self) -> Dict[str, Dict[str, str]]:
+        """Копия общего индекса алиасов для передачи в другой процесс."""
+        with self.lock:
+            return self.canonical.to_dict()
+
     def get_mapped_value(self, bookmaker: str, mapping_type: str,
                          value: str) -> str:
         if bookmaker == 'pinnacle':
@@ -62,6 +114,13 @@ class Mappings:
             f"get_mapped_value: {bookmaker}, {mapping_type}, {value} -> {mapped}")
         return mapped
 
+    def get_version(self, bookmaker: str, mapping_type: str) -> int:
+        return self.versions.get((bookmaker, mapping_type), 0)
+
+    def bump_version(self, bookmaker: str, mapping_type: str):
+        key = (bookmaker, mapping_type)
+        self.versions[key] = self.versions.get(key, 0) + 1
+
     def get_country(self, bookmaker: str, country: str) -> str:
         return self.get_mapped_value(bookmaker, 'countries', country)
 
@@ -104,16 +163,19 @@ class Mappings:
                     mapping_type]:
                     self.bookmaker_mappings[bookmaker][mapping_type][
                         country_league] = {}
-                self.bookmaker_mappings[bookmaker][mapping_type][
-                    country_league][original] = mapped
-                logging.debug(
-                    f"Добавлен маппинг команды: {original} -> {mapped} в {country_league}")
+                target = self.bookmaker_mappings[bookmaker][mapping_type][
+                    country_league]
             else:
-                self.bookmaker_mappings[bookmaker][mapping_type][
-                    original] = mapped
-                logging.debug(
-                    f"Добавлен маппинг {mapping_type}: {original} -> {mapped}")
+                target = self.bookmaker_mappings[bookmaker][mapping_type]
 
+            if target.get(original) == mapped:
+                # Такой маппинг уже есть, файл не переписываем
+                return
+            target[original] = mapped
+            logging.debug(
+                f"Добавлен маппинг {mapping_type}: {original} -> {mapped}")
+
+            self.bump_version(bookmaker, mapping_type)
             self.save_mapping(bookmaker, mapping_type)
             logging.info(
                 f"Добавлен маппинг для {bookmaker} {mapping_type}: {original} -> {mapped}")
@@ -142,10 +204,40 @@ class Mappings:
                     logging.debug(
                         f"Удалён маппинг {mapping_type}: {original} -> {mapped}")
 
+            self.bump_version(bookmaker, mapping_type)
             self.save_mapping(bookmaker, mapping_type)
             logging.info(
                 f"Удалён маппинг для {bookmaker} {mapping_type}: {original} -> {mapped}")
 
+    def snapshot(self, bookmaker: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Копия маппингов букмекера для передачи в другой процесс.
+
+        :param bookmaker: Букмекер
+        :return: {mapping_type: маппинг}
+        """
+        with self.lock:
+            return copy.deepcopy(self.bookmaker_mappings.get(bookmaker, {}))
+
+    def apply_changes(self, bookmaker: str,
+                      changes: List[Tuple[str, tuple, Dict[str, Any]]]):
+        """
+        Применяет изменения маппингов, записанные при сопоставлении в
+        другом процессе (см. parallel.RecordingMappings).
+
+        :param bookmaker: Букмекер
+        :param changes: Список (метод, args, kwargs), метод - 'add' или 'remove'
+        """
+        with self.lock:
+            for method, args, kwargs in changes:
+                if method == 'add':
+                    self.add_mapping(*args, **kwargs)
+                elif method == 'remove':
+                    self.remove_mapping(*args, **kwargs)
+                else:
+                    logging.error(
+                        f"Неизвестное изменение маппинга для {bookmaker}: {method}")
+
     def save_mapping(self, bookmaker: str, mapping_type: str):
         file_path = os.path.join(self.mappings_dir, bookmaker,
                                  f"{mapping_type}.json")
@@ -208,6 +300,8 @@ class Mappings:
 
                 logging.info(
                     f"Сохранено {len(unique_events)} уникальных сопоставленных событий для {bookmaker}")
+
+                self.learn_canonical(new_matched_events)
             except Exception as e:
                 logging.error(
                     f"Ошибка при сохранении сопоставленных событий для {bookmaker}: {e}")
@@ -279,7 +373,8 @@ class Mappings:
             # Используем временный файл для атомарной записи
             with tempfile.NamedTemporaryFile('w', delete=False, dir=dir_name,
                                              encoding='utf-8') as tmp_file:
-                json.dump(data, tmp_file, indent=2, ensure_ascii=False)
+                json.dump(data, tmp_file, indent=2, ensure_ascii=False,
+                          default=to_jsonable)
                 temp_name = tmp_file.name
             # Перемещаем временный файл на место целевого файла
             shutil.move(temp_name, file_path)
@@ -2,16 +2,21 @@ import json
 import os
 import logging
 import time
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+
+# Как часто проверять, не изменился ли файл matched_events.json, секунд
+REFRESH_CHECK_INTERVAL = 1.0
 
 
 class MatchFinder:
     def __init__(self, bookmaker: str):
         self.bookmaker = bookmaker
         self.matched_events_path = self.get_matched_events_path()
+        self.matched_events_mtime = self.get_matched_events_mtime()
         self.matched_events = self.load_matched_events()
-        self.matched_events_dict = self.create_matched_events_dict()
-        self.time_of_last_update = time.time()
+        self.other_ids = self.create_other_ids()
+        self.pinnacle_ids = self.create_pinnacle_ids()
+        self.time_of_last_check = time.time()
 
     def get_matched_events_path(self) -> str:
         """
@@ -36,6 +41,12 @@ class MatchFinder:
 
         return file_path
 
+    def get_matched_events_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.matched_events_path).st_mtime_ns
+        except OSError:
+            return None
+
     def load_matched_events(self) -> list:
         """
         Загружает события из файла matched_events.json.
@@ -54,75 +65,67 @@ class MatchFinder:
             logging.error(f"Ошибка при загрузке данных: {e}")
             return []
 
-    def create_matched_events_dict(self) -> Dict:
-        """
-        Создает словарь для быстрого поиска соответствий матчей.
-        Ключом является кортеж (league, country, home_team, away_team).
-        """
-        matched_events_dict = {}
-        for event in self.matched_events:
-            pinnacle_key = (
-                event['pinnacle_league'],
-                event['country'],
-                event['pinnacle_home_team'],
-                event['pinnacle_away_team']
-            )
-            # Проверяем уникальность ключа
-            # if pinnacle_key in matched_events_dict:
-            #     logging.warning(f"Дублирующий ключ найден: {pinnacle_key}. Перезапись существующего события.")
-            matched_events_dict[pinnacle_key] = event
-        return matched_events_dict
+    def create_other_ids(self) -> Dict:
+        """
+        Создает словарь pinnacle_id -> other_id для соединения матчей по
+        идентификаторам.
+        """
+        return {event['pinnacle_id']: event['other_id']
+                for event in self.matched_events}
+
+    def create_pinnacle_ids(self) -> Dict:
+        """
+        Создает обратный словарь other_id -> pinnacle_id, чтобы по обновлению
+        матча букмекера найти соответствующий матч Pinnacle.
+        """
+        return {event['other_id']: event['pinnacle_id']
+                for event in self.matched_events}
 
     def reload_matched_events(self):
         """
-        Перезагружает события из файла и обновляет словарь соответствий.
+        Перезагружает события из файла и обновляет словари идентификаторов.
         """
+        self.matched_events_mtime = self.get_matched_events_mtime()
         self.matched_events = self.load_matched_events()
-        self.matched_events_dict = self.create_matched_events_dict()
-        self.time_of_last_update = time.time()
+        self.other_ids = self.create_other_ids()
+        self.pinnacle_ids = self.create_pinnacle_ids()
         logging.info(f"Перезагружены события для букмекера {self.bookmaker}.")
 
-    def find_corresponding_match(self, pinnacle_match: Dict[str, Any],
-                                 other_bookmaker_data: Dict[str, Any]) -> \
-            Optional[Dict[str, Any]]:
+    def refresh(self):
         """
-        Ищет соответствующий матч для данного Pinnacle матча.
+        Перезагружает события, если файл matched_events.json изменился.
+        Файл проверяется не чаще REFRESH_CHECK_INTERVAL.
         """
-        # Проверяем, необходимо ли обновить данные
-        if time.time() - self.time_of_last_update > 60:
+        current_time = time.time()
+        if current_time - self.time_of_last_check < REFRESH_CHECK_INTERVAL:
+            return
+        self.time_of_last_check = current_time
+        if self.get_matched_events_mtime() != self.matched_events_mtime:
             self.reload_matched_events()
 
-        pinnacle_key = (
-            pinnacle_match['league'],
-            pinnacle_match['country'],
-            pinnacle_match['home_team'],
-            pinnacle_match['away_team']
-        )
-
-        event = self.matched_events_dict.get(pinnacle_key)
-        if event:
-            other_id = event['other_id']
-            if other_id in other_bookmaker_data:
-                other_match = other_bookmaker_data[other_id]
-                other_match['id'] = other_id  # Добавляем 'id' к other_match для совместимости
-                # logging.debug(
-                #     f"Найдено соответствие: Pinnacle {pinnacle_key} -> {self.bookmaker} {event.get('other_match_name', 'Unknown')}")
-                return other_match
-
-        # logging.debug(f"Не найдено соответствие для Pinnacle матча: {pinnacle_key}")
-        return None
-
-    def find_corresponding_match_by_id(self, pinnacle_id: str) -> Optional[Dict[str, Any]]:
+    def find_match_by_pinnacle_id(self, pinnacle_id: str,
+                                  other_bookmaker_data: Dict[str, Any]) -> \
+            Optional[Tuple[str, Dict[str, Any]]]:
         """
         Ищет соответствующий матч по идентификатору Pinnacle.
+
+        :param pinnacle_id: Идентификатор матча Pinnacle
+        :param other_bookmaker_data: {match_id: match} букмекера
+        :return: (other_id, other_match) или None; данные не изменяются
         """
-        # Проверяем, необходимо ли обновить данные
-        if time.time() - self.time_of_last_update > 60:
-            self.reload_matched_events()
+        self.refresh()
+        other_id = self.other_ids.get(pinnacle_id)
+        if other_id is None:
+            return None
+        other_match = other_bookmaker_data.get(other_id)
+        if other_match is None:
+            return None
+        return other_id, other_match
+
+    def find_pinnacle_id(self, other_id: str) -> Optional[str]:
+        """
+        Ищет идентификатор матча Pinnacle по идентификатору матча букмекера.
+        """
+        self.refresh()
 
-        for event in self.matched_events:
-            if event['pinnacle_id'] == pinnacle_id:
-                # logging.debug(f"Найдено соответствие по ID: {pinnacle_id} -> {event['other_id']}")
-                return event['other_id']
-        # logging.debug(f"Не найдено соответствие по ID: {pinnacle_id}")
-        return None
+        return self.pinnacle_ids.get(other_id)
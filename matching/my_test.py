@@ -1,3 +1,10 @@
+import os
+import sys
+
+# Скрипт запускается из matching/ (python my_test.py), а общие
+# модули проекта (models.py, parsers/) лежат в корне репозитория
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from algo_matching import MatchPairer
 from datetime import datetime, timedelta
 import json
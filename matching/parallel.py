@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Dict, List, Tuple
+
+from algo_matching import MatchPairer
+from canonical_index import CanonicalIndex
+from mappings import Mappings, mappings as shared_mappings
+
+MATCHING_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+
+class RecordingMappings(Mappings):
+    """
+    Маппинги одного букмекера внутри процесса сопоставления.
+
+    Работает с копией, полученной от координатора, и ничего не пишет на
+    диск: add_mapping/remove_mapping применяются к копии (чтобы дальнейшее
+    сопоставление в этой же задаче видело новые маппинги, как раньше) и
+    записываются в changes. Сохранение сопоставленных событий тоже
+    выполняет координатор, он же пополняет общий индекс алиасов.
+    """
+
+    def __init__(self, bookmaker: str, data: Dict[str, Dict[str, Any]],
+                 matched_events: List[Dict[str, Any]],
+                 canonical_data: Dict[str, Dict[str, str]] = None,
+                 mappings_dir: str = 'bookmaker_mappings'):
+        super().__init__(mappings_dir, load=False)
+        self.bookmaker_mappings = {bookmaker: data}
+        self.matched_events = matched_events
+        self.canonical = CanonicalIndex.from_dict(canonical_data or {})
+        self.changes: List[Tuple[str, tuple, Dict[str, Any]]] = []
+
+    def add_mapping(self, *args, **kwargs):
+        self.changes.append(('add', args, kwargs))
+        super().add_mapping(*args, **kwargs)
+
+    def remove_mapping(self, *args, **kwargs):
+        self.changes.append(('remove', args, kwargs))
+        super().remove_mapping(*args, **kwargs)
+
+    def save_mapping(self, bookmaker: str, mapping_type: str):
+        pass
+
+    def load_matched_events(self, bookmaker: str) -> List[Dict[str, Any]]:
+        return self.matched_events
+
+    def save_matched_events(self, bookmaker, new_matched_events):
+        pass
+
+    def save_unmatched_events(self, bookmaker, pinnacle_unmatched,
+                              other_unmatched):
+        pass
+
+
+def run_matching_job(bookmaker: str, sport: str,
+                     pinnacle_events: Dict[str, Any],
+                     other_events: Dict[str, Any],
+                     mapping_data: Dict[str, Dict[str, Any]],
+                     matched_events: List[Dict[str, Any]],
+                     canonical_data: Dict[str, Dict[str, str]] = None
+                     ) -> Dict[str, Any]:
+    """
+    Сопоставляет матчи одной пары (букмекер, спорт) в процессе пула.
+
+    :return: Результат сопоставления и записанные изменения маппингов
+    """
+    started = time.time()
+    job_mappings = RecordingMappings(bookmaker, mapping_data, matched_events,
+                                     canonical_data)
+    match_pairer = MatchPairer(bookmaker=bookmaker, mappings=job_mappings)
+    new_matches, unmatched_pinnacle, unmatched_other = match_pairer.match_events(
+        pinnacle_events, other_events)
+    return {
+        'bookmaker': bookmaker,
+        'sport': sport,
+        'new_matches': new_matches,
+        'unmatched_pinnacle': unmatched_pinnacle,
+        'unmatched_other': unmatched_other,
+        'total_pinnacle': len(pinnacle_events),
+        'total_bookmaker': len(other_events),
+        'changes': job_mappings.changes,
+        'elapsed': time.time() - started,
+    }
+
+
+class MatchingPool:
+    """
+    Параллельное сопоставление всех пар (букмекер, спорт) в пуле процессов.
+
+    Координатор (цикл событий) раздает задачам копии событий и маппингов,
+    а после завершения цикла сам применяет изменения маппингов и сохраняет
+    сопоставленные и несопоставленные события. Цикл событий во время
+    сопоставления не блокируется.
+    """
+
+    def __init__(self, max_workers: int = MATCHING_WORKERS,
+                 mappings: Mappings = shared_mappings):
+        self.max_workers = max_workers
+        self.mappings = mappings
+        self.executor = ProcessPoolExecutor(max_workers=max_workers)
+
+    async def run_cycle(self, pinnacle_matches: Dict[str, Dict[str, Any]],
+                        other_bookmakers_data: Dict[str, Dict[str, Dict[str, Any]]]
+                        ) -> List[Dict[str, Any]]:
+        """
+        Выполняет один цикл сопоставления.
+
+        :param pinnacle_matches: {sport: {match_id: match}} Pinnacle
+        :param other_bookmakers_data: {bookmaker: {sport: {match_id: match}}}
+        :return: Результаты задач в порядке (букмекер, спорт)
+        """
+        loop = asyncio.get_running_loop()
+        futures = []
+        # Алиасы, выученные на любом букмекере, доступны всем задачам цикла
+        canonical_data = self.mappings.canonical_snapshot()
+        for bookmaker, bookmaker_data in other_bookmakers_data.items():
+            mapping_data = self.mappings.snapshot(bookmaker)
+            matched_events = self.mappings.load_matched_events(bookmaker)
+            for sport, sport_matches in pinnacle_matches.items():
+                if sport not in bookmaker_data:
+                    continue
+                # Копии словарей: их сериализует другой поток, пока цикл
+                # событий продолжает принимать данные
+                job = partial(run_matching_job, bookmaker, sport,
+                              dict(sport_matches), dict(bookmaker_data[sport]),
+                              mapping_data, matched_events, canonical_data)
+                futures.append(loop.run_in_executor(self.executor, job))
+
+        results = []
+        for result in await asyncio.gather(*futures, return_exceptions=True):
+            if isinstance(result, Exception):
+                logging.error(f"Ошибка в задаче сопоставления: {result}",
+                              exc_info=result)
+                continue
+            self.merge_result(result)
+            results.append(result)
+        return results
+
+    def merge_result(self, result: Dict[str, Any]):
+        bookmaker = result['bookmaker']
+        self.mappings.apply_changes(bookmaker, result['changes'])
+        self.mappings.save_matched_events(bookmaker, result['new_matches'])
+        self.mappings.save_unmatched_events(bookmaker,
+                                            result['unmatched_pinnacle'],
+                                            result['unmatched_other'])
+        logging.info(
+            f"Сопоставление {bookmaker} {result['sport']}: "
+            f"{len(result['new_matches'])} новых, {len(result['changes'])} "
+            f"изменений маппингов за {result['elapsed']:.2f}с")
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
@@ -1,8 +1,12 @@
 import asyncio
+import heapq
 import logging
+import time
 import websockets
 import json
-from datetime import datetime, timedelta
+from datetime import timedelta
+from models import Match
+from event_store import EventStore
 
 logging.basicConfig(level=logging.DEBUG,
                     format='%(asctime)s - %(levelname)s - %(message)s')
@@ -10,7 +14,11 @@ logging.basicConfig(level=logging.DEBUG,
 class WebSocketClient:
     def __init__(self, bookmakers_config):
         self.bookmakers = bookmakers_config
+        # {bookmaker: EventStore}
         self.data = {}
+        # Изменения Pinnacle для PinnacleDataManager: списки
+        # (sport, match_id, match), match=None означает удаление матча
+        self.pinnacle_updates = asyncio.Queue()
 
     async def connect_to_pinnacle(self, config):
         uri = f"ws://localhost:{config['port']}"
@@ -64,18 +72,30 @@ class WebSocketClient:
                     exc_info=True)
             await asyncio.sleep(10)
 
+    def get_store(self, bookmaker):
+        store = self.data.get(bookmaker)
+        if store is None:
+            store = self.data[bookmaker] = EventStore(bookmaker)
+        return store
+
     def process_pinnacle_data(self, data):
-        if 'pinnacle' not in self.data:
-            self.data['pinnacle'] = {}
+        store = self.get_store('pinnacle')
 
+        changes = []
+        now = time.time()
         for match_id, match_data in data.items():
             if not match_data:
+                store.remove(match_id)
+                changes.append((None, match_id, None))
                 continue
             if match_data.get('type') == 'PreMatch':
                 sport = match_data.get('sport', 'Unknown')
-                if sport not in self.data['pinnacle']:
-                    self.data['pinnacle'][sport] = {}
-                self.data['pinnacle'][sport][match_id] = match_data
+                match = Match.from_dict(match_data)
+                store.upsert(sport, match_id, match, now)
+                changes.append((sport, match_id, match))
+        store.expire(now)
+        if changes:
+            self.pinnacle_updates.put_nowait(changes)
 
     async def connect_to_bookmaker(self, name, config):
         uri = f"ws://localhost:{config['port']}"
@@ -130,15 +150,24 @@ class WebSocketClient:
             await asyncio.sleep(5)
 
     def process_bookmaker_data(self, bookmaker, data):
-        if bookmaker not in self.data:
-            self.data[bookmaker] = {}
+        store = self.get_store(bookmaker)
 
+        now = time.time()
         for match_id, match_data in data.items():
+            if not match_data:
+                # Парсер вытеснил матч и прислал {match_id: None}
+                store.remove(match_id)
+                continue
             if match_data.get('type', '').lower() != 'live':
                 sport = match_data.get('sport', 'Unknown')
-                if sport not in self.data[bookmaker]:
-                    self.data[bookmaker][sport] = {}
-                self.data[bookmaker][sport][match_id] = match_data
+                store.upsert(sport, match_id, Match.from_dict(match_data),
+                             now)
+        store.expire(now)
+
+    def remove_match(self, bookmaker, match_id):
+        store = self.data.get(bookmaker)
+        if store is not None:
+            store.remove(match_id)
 
     async def start(self):
         tasks = []
@@ -153,44 +182,99 @@ class WebSocketClient:
         await asyncio.gather(*tasks)
 
     def get_data(self, bookmaker, sport=None):
-        if sport:
-            return self.data.get(bookmaker, {}).get(sport, {})
-        return self.data.get(bookmaker, {})
+        store = self.data.get(bookmaker)
+        if store is None:
+            return {}
+        # Матчи могли устареть, пока букмекер молчал
+        store.expire()
+        return store.get_data(sport)
+
+    def get_stats(self):
+        return {bookmaker: store.stats() for bookmaker, store in self.data.items()}
 
 
 class PinnacleDataManager:
-    def __init__(self, max_age_minutes=0.35):
+    """
+    Актуальные прематч-матчи Pinnacle для сопоставления.
+
+    Данные применяются пачками изменений из WebSocketClient.pinnacle_updates,
+    поэтому работа пропорциональна числу пришедших матчей, а не общему их
+    количеству. Для устаревания используется куча (expires_at, sport,
+    match_id) с ленивым удалением: запись в куче игнорируется, если матч
+    с тех пор обновлялся или уже удален.
+    """
+
+    def __init__(self, max_age_minutes=1.0):
         self.pinnacle_matches = {}
+        # Время последнего обновления хранится отдельно, чтобы не копировать
+        # каждый матч ради одного дополнительного поля
+        self.last_updated = {}
         self.max_age = timedelta(minutes=max_age_minutes).total_seconds()
+        self.expiry_heap = []
+
+    def apply_changes(self, changes, now=None):
+        """
+        Применяет изменения матчей Pinnacle.
+
+        :param changes: Список (sport, match_id, match); match=None - удаление
+                        (sport=None - удаление из всех видов спорта)
+        :param now: Текущее время (по умолчанию time.time())
+        :return: Количество примененных изменений
+        """
+        now = time.time() if now is None else now
+        applied = 0
+        for sport, match_id, match_data in changes:
+            if match_data is None:
+                sports = [sport] if sport is not None else list(self.pinnacle_matches)
+                for sport_ in sports:
+                    if self.pinnacle_matches.get(sport_, {}).pop(match_id, None) is not None:
+                        del self.last_updated[sport_][match_id]
+                        applied += 1
+                continue
+            if match_data.get('type') != 'PreMatch':
+                continue
+            if sport not in self.pinnacle_matches:
+                self.pinnacle_matches[sport] = {}
+                self.last_updated[sport] = {}
+            self.pinnacle_matches[sport][match_id] = match_data
+            self.last_updated[sport][match_id] = now
+            heapq.heappush(self.expiry_heap, (now + self.max_age, sport, match_id))
+            applied += 1
+        return applied
+
+    def expire(self, now=None):
+        """
+        Удаляет матчи, которые не обновлялись дольше max_age.
+
+        :param now: Текущее время (по умолчанию time.time())
+        :return: Количество удаленных матчей
+        """
+        now = time.time() if now is None else now
+        heap = self.expiry_heap
+        removed = 0
+        while heap and heap[0][0] <= now:
+            _, sport, match_id = heapq.heappop(heap)
+            last_updated = self.last_updated.get(sport, {}).get(match_id)
+            if last_updated is None or now - last_updated < self.max_age:
+                continue
+            del self.last_updated[sport][match_id]
+            del self.pinnacle_matches[sport][match_id]
+            removed += 1
+        if removed:
+            logging.info(f"Удалено {removed} устаревших матчей Pinnacle")
+        return removed
 
     def update_matches(self, new_matches):
-        # logging.info(f"Обновление матчей Pinnacle. Тип данных: {type(new_matches)}")
-
-        current_time = datetime.now().timestamp()
-        if isinstance(new_matches, dict):
-            for sport, sport_data in new_matches.items():
-                if sport not in self.pinnacle_matches:
-                    self.pinnacle_matches[sport] = {}
-                for match_id, match_data in sport_data.items():
-                    if match_data.get('type') == 'PreMatch':
-                        self.pinnacle_matches[sport][match_id] = {
-                            **match_data,
-                            'last_updated': current_time
-                        }
-            logging.info(f"Обновлено {sum(len(sport_data) for sport_data in self.pinnacle_matches.values())} матчей Pinnacle")
-        else:
+        """Применяет полный снимок {sport: {match_id: match}}."""
+        if not isinstance(new_matches, dict):
             logging.error(f"Ошибка: новые матчи Pinnacle должны быть в формате словаря, получено {type(new_matches)}")
-
-        # Удаление старых матчей
-        old_count = sum(len(sport_data) for sport_data in self.pinnacle_matches.values())
-        for sport in self.pinnacle_matches:
-            self.pinnacle_matches[sport] = {
-                match_id: match_data
-                for match_id, match_data in self.pinnacle_matches[sport].items()
-                if current_time - match_data['last_updated'] <= self.max_age
-            }
-        new_count = sum(len(sport_data) for sport_data in self.pinnacle_matches.values())
-        logging.info(f"Удалено {old_count - new_count} устаревших матчей Pinnacle")
+            return
+        now = time.time()
+        self.apply_changes([(sport, match_id, match_data)
+                            for sport, sport_data in new_matches.items()
+                            for match_id, match_data in sport_data.items()
+                            if match_data], now)
+        self.expire(now)
 
     def get_matches(self):
         return self.pinnacle_matches
\ No newline at end of file
@@ -0,0 +1,216 @@
+# models.py
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List
+
+_intern = sys.intern
+_MISSING = object()
+
+# Общие экземпляры повторяющихся чисел (линии 0.5, 2.5, -1.25 ...)
+_SHARED_NUMBERS: Dict[Any, Any] = {}
+SHARED_NUMBERS_LIMIT = 10000
+
+
+def share_number(value: Any) -> Any:
+    """Возвращает общий экземпляр числа, чтобы не хранить тысячи копий."""
+    shared = _SHARED_NUMBERS.get(value)
+    if shared is not None and type(shared) is type(value):
+        return shared
+    if len(_SHARED_NUMBERS) >= SHARED_NUMBERS_LIMIT:
+        _SHARED_NUMBERS.clear()
+    _SHARED_NUMBERS[value] = value
+    return value
+
+
+class Record:
+    """
+    Компактная запись со __slots__ и словарным интерфейсом.
+
+    Известные поля хранятся в слотах (без словаря на каждый объект),
+    повторяющиеся строковые значения из INTERNED интернируются, так что
+    тысячи исходов с типом 'O' или стороной 'OVER' ссылаются на одну строку.
+    Неизвестные ключи складываются в словарь extra, который создается только
+    при необходимости.
+
+    Запись ведет себя как словарь на чтение и запись (record['type'],
+    record.get('line', 0), 'odds' in record, record['id'] = ...), поэтому
+    существующий код работает без изменений. Отсутствующее поле и поле со
+    значением None различаются так же, как в словаре. В dict запись
+    превращается только на границах сериализации (to_dict / to_jsonable).
+    """
+
+    __slots__ = ('extra',)
+
+    FIELDS: tuple = ()
+    FIELD_SET: frozenset = frozenset()
+    INTERNED: frozenset = frozenset()
+    SHARED: frozenset = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.FIELD_SET = frozenset(cls.FIELDS)
+
+    def __init__(self, data: Dict[str, Any] = None, **kwargs):
+        self.extra = None
+        if data:
+            self.update(data)
+        if kwargs:
+            self.update(kwargs)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Record':
+        """
+        Создает запись из словаря (запись того же класса возвращается как есть).
+
+        :param data: Словарь с данными
+        :return: Запись
+        """
+        if isinstance(data, cls):
+            return data
+        return cls(data)
+
+    def convert(self, key: str, value: Any) -> Any:
+        if type(value) is str:
+            if key in self.INTERNED:
+                return _intern(value)
+        elif key in self.SHARED and type(value) in (int, float):
+            return share_number(value)
+        return value
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key in self.FIELD_SET:
+            setattr(self, key, self.convert(key, value))
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key: str):
+        if key in self.FIELD_SET:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self.extra is not None and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key: str) -> bool:
+        if key in self.FIELD_SET:
+            return hasattr(self, key)
+        return self.extra is not None and key in self.extra
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self.FIELD_SET:
+            return getattr(self, key, default)
+        if self.extra is not None:
+            return self.extra.get(key, default)
+        return default
+
+    def keys(self) -> List[str]:
+        keys = [key for key in self.FIELDS if hasattr(self, key)]
+        if self.extra:
+            keys.extend(self.extra)
+        return keys
+
+    def values(self) -> List[Any]:
+        return [self[key] for key in self.keys()]
+
+    def items(self) -> List[tuple]:
+        return [(key, self[key]) for key in self.keys()]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def update(self, data: Dict[str, Any]):
+        for key, value in data.items():
+            self[key] = value
+
+    def copy(self) -> 'Record':
+        return type(self)(self.to_dict())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Поверхностная копия записи в виде обычного словаря."""
+        return dict(self.items())
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is type(self):
+            return (self.extra == other.extra
+                    and all(getattr(self, key, _MISSING) == getattr(other, key, _MISSING)
+                            for key in self.FIELDS))
+        if isinstance(other, (Record, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+Mapping.register(Record)
+
+
+class Outcome(Record):
+    """Исход матча в формате сканера."""
+
+    FIELDS = ('type_name', 'type', 'line', 'odds', 'line_id', 'alt_line_id',
+              'period_number', 'team', 'side', 'bet_type', 'absolute_line')
+    INTERNED = frozenset({'type_name', 'type', 'team', 'side', 'bet_type'})
+    SHARED = frozenset({'line', 'period_number', 'absolute_line'})
+
+    __slots__ = FIELDS
+
+
+class Match(Record):
+    """Матч букмекера с исходами (outcomes - список Outcome)."""
+
+    FIELDS = ('event_id', 'match_id', 'id', 'match_name', 'name', 'url',
+              'start_time', 'home_team', 'away_team', 'league_id', 'league',
+              'country', 'sport', 'type', 'current_score', 'phase',
+              'outcomes', 'time', 'bookmaker', 'name_keys')
+    INTERNED = frozenset({'home_team', 'away_team', 'league', 'country',
+                          'sport', 'type', 'bookmaker', 'phase'})
+
+    __slots__ = FIELDS
+
+    def convert(self, key: str, value: Any) -> Any:
+        if key == 'outcomes' and isinstance(value, list):
+            return [Outcome.from_dict(outcome) if isinstance(outcome, dict)
+                    else outcome for outcome in value]
+        return super().convert(key, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Словарь матча; исходы тоже превращаются в словари."""
+        data = super().to_dict()
+        if isinstance(data.get('outcomes'), list):
+            data['outcomes'] = [outcome.to_dict()
+                                if isinstance(outcome, Record) else outcome
+                                for outcome in data['outcomes']]
+        return data
+
+
+def to_jsonable(obj: Any) -> Any:
+    """
+    Функция для параметра default в json.dumps: превращает записи в словари.
+
+    :param obj: Объект, который json не умеет сериализовать
+    :return: Словарь для записей
+    """
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
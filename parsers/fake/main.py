@@ -0,0 +1,152 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+
+import websockets
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s,%(msecs)d %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s',
+    datefmt='%Y-%m-%d:%H:%M:%S'
+)
+
+# Синтетический парсер для проверки кластера анализаторов на localhost:
+# отдает в формате настоящих парсеров ({match_id: match}) одни и те же
+# события под видом Pinnacle и любого числа букмекеров, а для букмекера
+# записывает matched_events.json, так что MatchFinder находит пары сразу.
+
+UPDATE_INTERVAL = 1.0
+SPORTS = ('Soccer', 'Tennis', 'Basketball')
+# Каждое LIVE_EVERY-е событие - лайв
+LIVE_EVERY = 4
+# Разброс коэффициентов букмекера относительно Pinnacle
+ODDS_SPREAD = 0.12
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+
+def event_id(bookmaker: str, number: int) -> str:
+    if bookmaker == 'pinnacle':
+        return f"p{number}"
+    return f"{bookmaker}-{number}"
+
+
+def base_event(number: int) -> dict:
+    """Неизменные поля события и коэффициенты Pinnacle (зависят только от номера)."""
+    rng = random.Random(number)
+    sport = SPORTS[number % len(SPORTS)]
+    outcomes = [{'type': outcome_type, 'line': 0,
+                 'odds': round(rng.uniform(1.3, 3.5), 2)}
+                for outcome_type in ('1', '2')]
+    if sport == 'Soccer':
+        outcomes.append({'type': 'X', 'line': 0,
+                         'odds': round(rng.uniform(2.8, 3.6), 2)})
+    over = round(rng.uniform(1.6, 2.3), 2)
+    outcomes += [{'type': 'O', 'line': 2.5, 'odds': over},
+                 {'type': 'U', 'line': 2.5,
+                  'odds': round(over / (over - 1), 2)}]
+    return {
+        'sport': sport,
+        'league': f"Fake {sport} League {number % 5}",
+        'country': 'Fakeland',
+        'home_team': f"Home {number}",
+        'away_team': f"Away {number}",
+        'start_time': int(time.time()) + 3600 * (number % 48),
+        'type': 'Live' if number % LIVE_EVERY == 0 else 'Prematch',
+        'outcomes': outcomes,
+    }
+
+
+class FakeParser:
+    def __init__(self, bookmaker: str, port: int, events: int, seed: int):
+        self.bookmaker = bookmaker
+        self.port = port
+        self.events = [base_event(number) for number in range(events)]
+        self.rng = random.Random(seed)
+        self.connected_clients = set()
+
+    def snapshot(self) -> dict:
+        """Все события с текущими коэффициентами: {match_id: match}."""
+        current_time = time.time()
+        data = {}
+        for number, event in enumerate(self.events):
+            match_id = event_id(self.bookmaker, number)
+            outcomes = event['outcomes']
+            if self.bookmaker != 'pinnacle':
+                outcomes = [
+                    dict(outcome, odds=round(outcome['odds'] * self.rng.uniform(
+                        1 - ODDS_SPREAD, 1 + ODDS_SPREAD), 2))
+                    for outcome in outcomes
+                ]
+            data[match_id] = dict(event, id=match_id, event_id=match_id,
+                                  outcomes=outcomes, time=current_time,
+                                  bookmaker=self.bookmaker)
+        return data
+
+    def write_matched_events(self):
+        """Сохраняет пары (Pinnacle, букмекер) для MatchFinder анализатора."""
+        path = os.path.join(PROJECT_ROOT, 'matching', 'bookmaker_mappings',
+                            self.bookmaker, 'matched_events.json')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        matched_events = [{
+            'pinnacle_id': event_id('pinnacle', number),
+            'other_id': event_id(self.bookmaker, number),
+            'pinnacle_league': event['league'],
+            'other_league': event['league'],
+            'country': event['country'],
+            'sport': event['sport'],
+            'pinnacle_home_team': event['home_team'],
+            'pinnacle_away_team': event['away_team'],
+            'other_home_team': event['home_team'],
+            'other_away_team': event['away_team'],
+        } for number, event in enumerate(self.events)]
+        with open(path, 'w') as f:
+            json.dump(matched_events, f, indent=2)
+        logging.info(f"Saved {len(matched_events)} matched events to {path}")
+
+    async def websocket_handler(self, websocket, path):
+        self.connected_clients.add(websocket)
+        logging.info(f"Client connected: {websocket.remote_address}")
+        try:
+            await websocket.wait_closed()
+        finally:
+            self.connected_clients.discard(websocket)
+            logging.info(f"Client disconnected: {websocket.remote_address}")
+
+    async def send_data_to_client(self, client, data: str):
+        try:
+            await client.send(data)
+        except websockets.exceptions.ConnectionClosed:
+            self.connected_clients.discard(client)
+
+    async def run(self):
+        if self.bookmaker != 'pinnacle':
+            self.write_matched_events()
+        await websockets.serve(self.websocket_handler, 'localhost', self.port,
+                               max_size=None)
+        logging.info(f"Fake {self.bookmaker} started on ws://localhost:{self.port}")
+        while True:
+            if self.connected_clients:
+                data = json.dumps(self.snapshot())
+                await asyncio.gather(*(self.send_data_to_client(client, data)
+                                       for client in list(self.connected_clients)))
+            await asyncio.sleep(UPDATE_INTERVAL)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Синтетический парсер')
+    parser.add_argument('--bookmaker', required=True,
+                        help="pinnacle или имя букмекера из конфига")
+    parser.add_argument('--port', type=int, required=True)
+    parser.add_argument('--events', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    asyncio.run(FakeParser(args.bookmaker, args.port, args.events,
+                           args.seed).run())
@@ -4,10 +4,11 @@ import asyncio
 import logging
 import time
 import random
-import re
 from typing import List, Dict
 from datetime import datetime
 from aiohttp import ClientSession
+from parsers.lobbet_me.utils import get_sport_and_country
+from parsers.lobbet_me.markets import LIVE_FOOTBALL, LIVE_TENNIS, convert_pick
 
 BOOKIE = 'lobbet_me'
 MAIN_URL = 'https://www.lobbet.me'
@@ -191,384 +192,12 @@ class LiveOddsParser:
     def convert_live_pick_football(self, pick: Dict, market_name: str,
                                    handicap_param_value: str = None,
                                    score_difference: int = 0) -> Dict | bool:
-        market_name = market_name.lower()
-        pick_label = pick.get('liveBetPickLabel', '').lower()
-        odd_value = pick.get('oddValue')
-        special_value = pick.get('specialValue')
-
-        # 1X2
-        if market_name in ['full time', 'final result']:
-            if 'ft 1' in pick_label:
-                pick_type = '1'
-            elif 'ft x' in pick_label:
-                pick_type = 'X'
-            elif 'ft 2' in pick_label:
-                pick_type = '2'
-            else:
-                return False
-            return {
-                "type_name": '1X2',
-                "type": pick_type,
-                "line": 0,
-                "odds": float(odd_value)
-            }
-
-        # Тоталы
-        elif market_name in ['total goals live',
-                             'total goals - without overtime']:
-            if not special_value:
-                return False
-            try:
-                line = float(special_value)
-            except ValueError:
-                return False
-
-            if 'goals ft<' in pick_label:
-                pick_type = 'U'
-            elif 'goals ft>' in pick_label:
-                pick_type = 'O'
-            else:
-                return False
-            return {
-                "type_name": 'Total',
-                "type": pick_type,
-                "line": line,
-                "odds": float(odd_value)
-            }
-
-        # Индивидуальные тоталы команды 1 (домашней)
-        elif market_name == 'home team total goals' or market_name == 'home team total goals live':
-            if not special_value:
-                return False
-            try:
-                line = float(special_value)
-            except ValueError:
-                return False
-
-            if 'team1goal tg<' in pick_label:
-                pick_type = 'THU'
-            elif 'team1goal tg>' in pick_label:
-                pick_type = 'THO'
-            else:
-                return False
-            return {
-                "type_name": 'Individual Total',
-                "type": pick_type,
-                "line": line,
-                "odds": float(odd_value)
-            }
-
-        # Индивидуальные тоталы команды 2 (гостевой)
-        elif market_name == 'away team total goals live' or market_name == 'away team total goals':
-            if not special_value:
-                return False
-            try:
-                line = float(special_value)
-            except ValueError:
-                return False
-
-            if 'team2goal tg<' in pick_label:
-                pick_type = 'TAU'
-            elif 'team2goal tg>' in pick_label:
-                pick_type = 'TAO'
-            else:
-                return False
-            return {
-                "type_name": 'Individual Total',
-                "type": pick_type,
-                "line": line,
-                "odds": float(odd_value)
-            }
-
-        # Азиатские гандикапы
-        elif 'handicap' in market_name:
-            if not handicap_param_value:
-                return False
-            try:
-                line = float(handicap_param_value)
-            except ValueError:
-                return False
-
-            # Определяем, какая команда (1 или 2)
-            if 'h 1' in pick_label:
-                pick_type = 'AH1'
-                # Корректируем линию:
-                # 1. Реверсируем для команды 1 (домашней) - не требуется, так как это первая команда
-                # 2. Вычитаем 0.5 для преобразования европейского в азиатский
-                # 3. Прибавляем разницу счета
-                adjusted_line = line - 0.5 + score_difference
-                absolute_line = line - 0.5
-            elif 'h 2' in pick_label:
-                pick_type = 'AH2'
-                # Для команды 2 (гостевой):
-                # 1. Реверсируем линию (меняем знак)
-                # 2. Вычитаем 0.5 для преобразования
-                # 3. Вычитаем разницу счета
-                adjusted_line = -line - 0.5 - score_difference
-                absolute_line = -line - 0.5
-            else:
-                return False
-
-            return {
-                "type_name": 'Asian Handicap',
-                "type": pick_type,
-                "line": adjusted_line,
-                "odds": float(odd_value),
-                "absolute_line": absolute_line
-            }
-
-        # 1X2 по таймам (Первый тайм)
-        elif market_name == 'first half':
-            if 'h 1' in pick_label:
-                pick_type = '1H1'
-            elif 'h x' in pick_label:
-                pick_type = '1HX'
-            elif 'h 2' in pick_label:
-                pick_type = '1H2'
-            else:
-                return False
-            return {
-                "type_name": 'First Half 1X2',
-                "type": pick_type,
-                "line": 0,
-                "odds": float(odd_value)
-            }
-
-        # Тоталы по таймам (Первый тайм)
-        elif market_name == 'total goals first half' or market_name == 'total goals first half live':
-            if not special_value:
-                return False
-            try:
-                line = float(special_value)
-            except ValueError:
-                return False
-
-            if 'goals ht<' in pick_label or 'h<' in pick_label:
-                pick_type = '1HU'
-            elif 'goals ht>' in pick_label or 'h>' in pick_label:
-                pick_type = '1HO'
-            else:
-                return False
-            return {
-                "type_name": 'First Half Total',
-                "type": pick_type,
-                "line": line,
-                "odds": float(odd_value)
-            }
-
-        # 1X2 по таймам (Второй тайм)
-        elif market_name == 'second half':
-            if 'h 1' in pick_label:
-                pick_type = '2H1'
-            elif 'h x' in pick_label:
-                pick_type = '2HX'
-            elif 'h 2' in pick_label:
-                pick_type = '2H2'
-            else:
-                return False
-            return {
-                "type_name": 'Second Half 1X2',
-                "type": pick_type,
-                "line": 0,
-                "odds": float(odd_value)
-            }
-
-        # Тоталы по таймам (Второй тайм)
-        elif market_name == 'total goals second half' or market_name == 'total goals second half live':
-            if not special_value:
-                return False
-            try:
-                line = float(special_value)
-            except ValueError:
-                return False
-
-            if 'goals st<' in pick_label or 'h<' in pick_label:
-                pick_type = '2HU'
-            elif 'goals st>' in pick_label or 'h>' in pick_label:
-                pick_type = '2HO'
-            else:
-                return False
-            return {
-                "type_name": 'Second Half Total',
-                "type": pick_type,
-                "line": line,
-                "odds": float(odd_value)
-            }
-
-        else:
-            return False
+        return convert_pick(LIVE_FOOTBALL, pick, market_name,
+                            handicap_param_value, score_difference)
 
     def convert_live_pick_tennis(self, pick: Dict, market_name: str,
                                  handicap_param_value: str = None) -> Dict | bool:
-        market_name = market_name.lower()
-        pick_label = pick.get('liveBetPickLabel', '').lower()
-        odd_value = pick.get('oddValue')
-        special_value = pick.get('specialValue')
-
-        if pick['oddValue'] == 0:
-            return False
-
-        # Moneyline (1X2)
-        if market_name == 'final outcome':
-            if 'ft 1' in pick_label:
-                pick_type = '1'
-            elif 'ft 2' in pick_label:
-                pick_type = '2'
-            else:
-                return False
-            return {
-                "type_name": 'Moneyline',
-                "type": pick_type,
-                "line": 0,
-                "odds": float(odd_value)
-            }
-
-        # Тотал геймов на весь матч
-        # elif 'total games match' in market_name:
-        #     if not special_value:
-        #         return False
-        #     try:
-        #         line = float(special_value)
-        #     except ValueError:
-        #         return False
-        #
-        #     if 'tg<' in pick_label:
-        #         pick_type = 'GU'
-        #     elif 'tg>' in pick_label:
-        #         pick_type = 'GO'
-        #     else:
-        #         return False
-        #     return {
-        #         "type_name": 'Total',
-        #         "type": pick_type,
-        #         "line": line,
-        #         "odds": float(odd_value)
-        #     }
-
-        # Индивидуальные тоталы геймов для игрока 1 (домашнего)
-        elif 'team1 total games' in market_name:
-            if not special_value:
-                return False
-            try:
-                line = float(special_value)
-            except ValueError:
-                return False
-
-            if 'team1 tg<' in pick_label:
-                pick_type = 'GTHU'
-            elif 'team1 tg>' in pick_label:
-                pick_type = 'GTHO'
-            else:
-                return False
-            return {
-                "type_name": 'Individual Total',
-                "type": pick_type,
-                "line": line,
-                "odds": float(odd_value)
-            }
-
-        # Индивидуальные тоталы геймов для игрока 2 (гостевого)
-        elif 'team2 total games' in market_name:
-            if not special_value:
-                return False
-            try:
-                line = float(special_value)
-            except ValueError:
-                return False
-
-            if 'team2 tg<' in pick_label:
-                pick_type = 'GTAU'
-            elif 'team2 tg>' in pick_label:
-                pick_type = 'GTAO'
-            else:
-                return False
-            return {
-                "type_name": 'Individual Total',
-                "type": pick_type,
-                "line": line,
-                "odds": float(odd_value)
-            }
-
-        # Гандикап в геймах
-        elif 'hendicap in games' in market_name:
-            if not handicap_param_value:
-                return False
-            try:
-                line = float(handicap_param_value)
-            except ValueError:
-                return False
-
-            if 'hg 1' in pick_label:
-                pick_type = 'GAH1'
-            elif 'hg 2' in pick_label:
-                pick_type = 'GAH2'
-            else:
-                return False
-            return {
-                "type_name": 'Handicap',
-                "type": pick_type,
-                "line": line,
-                "odds": float(odd_value)
-            }
-
-        # Тотал геймов по сетам
-        elif any(
-                f"{ordinal} set" in market_name and "games" in market_name
-                for ordinal in
-                ["first", "second", "third", "fourth", "fifth"]):
-            set_number = next((i for i, ordinal in enumerate(
-                ["first", "second", "third", "fourth", "fifth"], 1)
-                               if
-                               f"{ordinal} set" in market_name and "games" in market_name),
-                              None)
-            if set_number is None:
-                return False
-
-            if not special_value:
-                return False
-            try:
-                line = float(special_value)
-            except ValueError:
-                return False
-
-            if 'sg<' in pick_label:
-                pick_type = f'{set_number}HGU'
-            elif 'sg>' in pick_label:
-                pick_type = f'{set_number}HGO'
-            else:
-                return False
-
-            return {
-                "type_name": f'Set {set_number} Total Games',
-                "type": pick_type,
-                "line": line,
-                "odds": float(odd_value)
-            }
-
-        # Сетовый победитель
-        elif any(f"{ordinal} set" in market_name for ordinal in
-                 ["first", "second", "third", "fourth", "fifth"]):
-            set_number = next((i for i, ordinal in enumerate(
-                ["first", "second", "third", "fourth", "fifth"], 1)
-                               if f"{ordinal} set" in market_name), None)
-            if set_number is None:
-                return False
-
-            if 's 1' in pick_label:
-                pick_type = f'{set_number}H1'
-            elif 's 2' in pick_label:
-                pick_type = f'{set_number}H2'
-            else:
-                return False
-            return {
-                "type_name": f'Set {set_number} Winner',
-                "type": pick_type,
-                "line": 0,
-                "odds": float(odd_value)
-            }
-
-        else:
-            return False
+        return convert_pick(LIVE_TENNIS, pick, market_name, handicap_param_value)
 
     def convert_timestamp_to_lobbet_format(self, timestamp: int) -> str:
         timestamp_seconds = timestamp / 1000
@@ -576,28 +205,13 @@ class LiveOddsParser:
         return dt.strftime('%Y-%m-%d %H:%M:%S')
 
     def get_sport_and_country(self, match: Dict):
-        sport_data = match.get('sport')
-        league_name = match.get('leagueName') or match.get('league')
-        sport, country = "", ""
-        if sport_data is not None:
-            if sport_data == 'T':
-                sport = 'Tennis'
-                if league_name is not None:
-                    country_match = re.search(r'\(([^)]+)\)', league_name)
-                    if country_match:
-                        country = country_match.group(1).strip()
-                    else:
-                        country = league_name.split(',')[0].strip()
-            elif sport_data == 'S':
-                sport = 'Football'
-                country = league_name.split(',')[
-                    0].strip() if league_name else ''
-            # Добавьте другие виды спорта по необходимости
-            else:
-                sport = 'Unknown'
-        return sport, country
+        return get_sport_and_country(match)
 
     async def get_live_odds(self):
+        # Каждый цикл начинаем с чистых словарей: матчи, пропавшие из выдачи,
+        # не должны накапливаться (вытеснением занимается клиент)
+        self.ALL_MATCHES = {}
+        self.parsed_matches = {}
         semaphore = asyncio.Semaphore(
             20)  # Максимум 20 одновременных запросов
         async with ClientSession(headers=self.HEADERS) as session:
@@ -10,6 +10,9 @@ import websockets
 from parsers.lobbet_me.live import LiveOddsParser
 from parsers.lobbet_me.prematch import PreMatchOddsParser
 from parsers.utils import save_odds_to_jsonl
+from parsers.registry import MatchRegistry
+from parsers.name_keys import event_keys
+from models import to_jsonable
 
 logging.basicConfig(
     level=logging.INFO,
@@ -19,35 +22,71 @@ logging.basicConfig(
 
 BOOKIE = 'lobbet_me'
 
+# Вытеснение матчей из реестров (см. parsers/maxbet/main.py)
+LIVE_MATCH_TTL = 10.0
+PREMATCH_MATCH_TTL = 60.0
+LIVE_MAX_DURATION = 4 * 60 * 60
+MAX_LIVE_MATCHES = 5000
+MAX_PREMATCH_MATCHES = 20000
+
+
+def get_start_time(match):
+    """Время начала матча lobbet (ISO-строка) в виде timestamp."""
+    try:
+        return datetime.fromisoformat(match['start_time']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+
 
 class LobbetClient:
     def __init__(self):
         self.live_parser = LiveOddsParser()
         self.prematch_parser = PreMatchOddsParser()
-        self.ALL_MATCHES = {}
-        self.parsed_matches = {}
         self.connected_clients = set()
         self.lock = asyncio.Lock()
+        # Удаленные из реестров матчи, которые нужно разослать клиентам
+        self.pending_removals = {'Live': {}, 'PreMatch': {}}
+        self.matches = {
+            'Live': MatchRegistry(
+                'lobbet live', ttl=LIVE_MATCH_TTL,
+                kickoff_ttl=LIVE_MAX_DURATION, max_size=MAX_LIVE_MATCHES,
+                on_evict=lambda removed: self.schedule_removals('Live', removed),
+                get_start_time=get_start_time),
+            'PreMatch': MatchRegistry(
+                'lobbet prematch', ttl=PREMATCH_MATCH_TTL,
+                kickoff_ttl=0, max_size=MAX_PREMATCH_MATCHES,
+                on_evict=lambda removed: self.schedule_removals('PreMatch', removed),
+                get_start_time=get_start_time),
+        }
 
-    async def get_live_odds(self):
-        live_matches = await self.live_parser.get_live_odds()
-        async with self.lock:
-            self.ALL_MATCHES = self.live_parser.ALL_MATCHES
-            self.parsed_matches = self.live_parser.parsed_matches
+    def schedule_removals(self, match_type, removed):
+        for match_id in removed:
+            self.pending_removals[match_type][match_id] = None
 
+    async def refresh_registry(self, match_type, matches):
+        registry = self.matches[match_type]
+        async with self.lock:
+            registry.update(matches)
+            registry.expire()
+            snapshot = registry.snapshot()
         logging.info(
-            f"Total live matches: {len(self.live_parser.ALL_MATCHES)}")
-        return self.parsed_matches
+            f"Total {match_type.lower()} matches: {len(snapshot)}, "
+            f"registry stats: {registry.stats()}")
+        return snapshot
 
-    async def get_prematch_odds(self):
-        prematch_matches = await self.prematch_parser.get_prematch_odds()
+    async def pop_removals(self, match_type):
         async with self.lock:
-            self.ALL_MATCHES = self.prematch_parser.ALL_MATCHES
-            self.parsed_matches = self.prematch_parser.parsed_matches
+            removals = self.pending_removals[match_type]
+            self.pending_removals[match_type] = {}
+        return removals
 
-        logging.info(
-            f"Total prematch matches: {len(self.prematch_parser.ALL_MATCHES)}")
-        return self.parsed_matches
+    async def get_live_odds(self):
+        live_matches = await self.live_parser.get_live_odds()
+        return await self.refresh_registry('Live', live_matches)
+
+    async def get_prematch_odds(self):
+        prematch_matches = await self.prematch_parser.get_prematch_odds()
+        return await self.refresh_registry('PreMatch', prematch_matches)
 
     async def update_live_odds_periodically(self, interval=1.5):
         while True:
@@ -55,11 +94,12 @@ class LobbetClient:
             try:
                 live_odds = await self.get_live_odds()
                 logging.info(
-                    f"Live odds updated. Total live matches: {len(self.live_parser.ALL_MATCHES)}")
+                    f"Live odds updated. Total live matches: {len(live_odds)}")
                 odds_data = await self.normalize_odds(live_odds,
                                                       match_type='Live')
+                odds_data.update(await self.pop_removals('Live'))
                 if self.connected_clients:
-                    data_to_send = json.dumps(odds_data)
+                    data_to_send = json.dumps(odds_data, default=to_jsonable)
                     coros = [self.send_data_to_client(client, data_to_send)
                              for client in self.connected_clients]
                     await asyncio.gather(*coros, return_exceptions=True)
@@ -78,11 +118,12 @@ class LobbetClient:
             try:
                 prematch_odds = await self.get_prematch_odds()
                 logging.info(
-                    f"Pre-match odds updated. Total prematch matches: {len(self.prematch_parser.ALL_MATCHES)}")
+                    f"Pre-match odds updated. Total prematch matches: {len(prematch_odds)}")
                 odds_data = await self.normalize_odds(prematch_odds,
                                                       match_type='PreMatch')
+                odds_data.update(await self.pop_removals('PreMatch'))
                 if self.connected_clients:
-                    data_to_send = json.dumps(odds_data)
+                    data_to_send = json.dumps(odds_data, default=to_jsonable)
                     coros = [self.send_data_to_client(client, data_to_send)
                              for client in self.connected_clients]
                     await asyncio.gather(*coros, return_exceptions=True)
@@ -124,6 +165,8 @@ class LobbetClient:
             "outcomes": outcomes,
             "time": match['time'],
             "bookmaker": BOOKIE,
+            "name_keys": event_keys(match['home_team'], match['away_team'],
+                                    match['league'], match['sport']),
         }
 
         log_dir = 'odds_data'
@@ -177,8 +220,7 @@ class LobbetClient:
 
         if updated_match:
             async with self.lock:
-                self.ALL_MATCHES[match_id] = updated_match
-                self.parsed_matches[match_id] = updated_match
+                self.matches[match_type].upsert(match_id, updated_match)
             logging.info(f"Successfully reparsed match ID {match_id}")
             return updated_match
         else:
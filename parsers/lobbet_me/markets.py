@@ -0,0 +1,394 @@
+from typing import Dict
+
+from models import Outcome
+from parsers.markets import MarketTable
+
+# Описание рынка lobbet: {'handler': <разборщик ставки>, ...параметры}.
+# Рынок по названию находится через MarketTable (с кэшем), затем
+# разборщик из HANDLERS превращает конкретную ставку в исход сканера
+# или возвращает False, если ставка не поддерживается.
+
+ORDINALS = ('first', 'second', 'third', 'fourth', 'fifth')
+
+
+def parse_handicap(handicap_param_value: str = None) -> float:
+    return float(handicap_param_value) if handicap_param_value else 0
+
+
+# --- Прематч: разбор по tipType и названию ставки ---
+
+def tip_caption(bet: Dict, entry: Dict, handicap_param_value: str = None):
+    """Основной исход: тип берется из подписи ставки."""
+    if bet.get('tipType') not in entry['tips']:
+        return False
+    return {
+        "type_name": entry['type_name'],
+        "type": bet.get('caption'),
+        "line": 0,
+        "odds": float(bet.get('value'))
+    }
+
+
+def period_result(bet: Dict, entry: Dict, handicap_param_value: str = None):
+    """1X2 по таймам: 'Ih 1' -> '1H1'."""
+    return {
+        "type_name": entry['type_name'],
+        "type": entry['type_prefix'] + bet['name'].replace(entry['strip'], ''),
+        "line": 0,
+        "odds": float(bet.get('value'))
+    }
+
+
+def name_total(bet: Dict, entry: Dict, handicap_param_value: str = None):
+    """Тотал по названию ставки: 'tg 0-2' -> U 2.5, 'tg 3+' -> O 2.5."""
+    name = bet['name']
+    prefix = entry['prefix']
+    if not name.startswith(prefix):
+        return False
+    type_ = entry['over'] if '+' in name else entry['under']
+    if '0-' in name:
+        line = int(name.split('0-')[1]) + 0.5
+    elif '+' in name:
+        line = int(name.split(prefix + ' ')[1].split('+')[0]) - 0.5
+    elif f'{prefix} 0' == name:
+        line = 0.5
+    else:
+        return False
+    return {
+        "type_name": entry['type_name'],
+        "type": type_,
+        "line": line,
+        "odds": float(bet.get('value'))
+    }
+
+
+def team_total(bet: Dict, entry: Dict, handicap_param_value: str = None):
+    """Индивидуальный тотал по названию ставки: 'tg team1 2+'."""
+    name = bet['name']
+    splitter = entry['splitter']
+    if 'tg team' not in name:
+        return False
+    if '0-' in name:
+        line = int(name.split('0-')[1]) + 0.5
+        type_ = entry['under']
+    elif '+' in name:
+        line = int(name.split(splitter)[1].split('+')[0]) - 0.5
+        type_ = entry['over']
+    elif f'{splitter} 0' == name:
+        line = 0.5
+        type_ = entry['under']
+    else:
+        return False
+    return {
+        "type_name": entry['type_name'],
+        "type": type_,
+        "line": line,
+        "odds": float(bet.get('value'))
+    }
+
+
+def tip_handicap(bet: Dict, entry: Dict, handicap_param_value: str = None):
+    """Гандикап по tipType: tips = {tipType: (тип, знак линии)}."""
+    handicap_value = parse_handicap(handicap_param_value)
+    tip = entry['tips'].get(bet['tipType'])
+    if tip is None:
+        return False
+    type_, sign = tip
+    return {
+        "type_name": entry['type_name'],
+        "type": type_,
+        "line": sign * handicap_value + entry['offset'],
+        "odds": float(bet.get('value'))
+    }
+
+
+def set_winner(bet: Dict, entry: Dict, handicap_param_value: str = None):
+    """Победитель сета: 'S2_1' -> '2H1'."""
+    tip_type = bet.get('tipType')
+    if tip_type not in entry['tips']:
+        return False
+    return {
+        "type_name": f'{tip_type[1]}H 1X2',
+        "type": tip_type[1] + 'H' + tip_type[3],
+        "line": 0,
+        "odds": float(bet.get('value'))
+    }
+
+
+def games_total(bet: Dict, entry: Dict, handicap_param_value: str = None):
+    """Тотал геймов в матче: 'tg>' / 'tg<'."""
+    handicap_value = parse_handicap(handicap_param_value)
+    if not bet['name'].startswith('tg'):
+        return False
+    return {
+        "type_name": 'Total (games)',
+        "type": 'GO' if '>' in bet.get('name') else 'GU',
+        "line": handicap_value,
+        "odds": float(bet.get('value'))
+    }
+
+
+SET_GAMES_PERIODS = (('Isg', '1H'), ('IIsg', '2H'), ('IIIsg', '3H'),
+                     ('IVsg', '4H'), ('Vsg', '5H'))
+
+
+def set_games_total(bet: Dict, entry: Dict, handicap_param_value: str = None):
+    """Тотал геймов в сете: 'IIsg>' -> '2HGO'."""
+    tip_type = bet.get('tipType')
+    if not (tip_type in entry['tips']
+            or 'GGP_UNDER' in tip_type or 'GGP_OVER' in tip_type):
+        return False
+
+    bet_name = bet.get('name')
+    if 'sg' not in bet_name:
+        return False
+    period = next((period for prefix, period in SET_GAMES_PERIODS
+                   if bet_name.startswith(prefix)), None)
+    if period is None:
+        return False
+
+    return {
+        "type_name": f'{period} Total (games in set)',
+        "type": f'{period}GO' if '>' in bet_name else f'{period}GU',
+        "line": parse_handicap(handicap_param_value),
+        "odds": float(bet.get('value'))
+    }
+
+
+# --- Лайв: разбор по подписи пика ---
+
+def find_label(pick_label: str, labels):
+    """Первый тип, подстрока которого есть в подписи пика."""
+    return next((type_ for label, type_ in labels if label in pick_label), None)
+
+
+def parse_line(value: str = None):
+    """Линия из specialValue или параметра гандикапа; None, если ее нет."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def label_result(pick: Dict, entry: Dict, handicap_param_value: str = None,
+                 score_difference: int = 0):
+    """Исход без линии (1X2, победитель сета)."""
+    type_ = find_label(pick.get('liveBetPickLabel', '').lower(), entry['labels'])
+    if type_ is None:
+        return False
+    return {
+        "type_name": entry['type_name'],
+        "type": type_,
+        "line": 0,
+        "odds": float(pick.get('oddValue'))
+    }
+
+
+def label_line(pick: Dict, entry: Dict, handicap_param_value: str = None,
+               score_difference: int = 0):
+    """Исход с линией (тоталы, гандикап в геймах)."""
+    line = parse_line(handicap_param_value if entry.get('line') == 'handicap'
+                      else pick.get('specialValue'))
+    if line is None:
+        return False
+    type_ = find_label(pick.get('liveBetPickLabel', '').lower(), entry['labels'])
+    if type_ is None:
+        return False
+    return {
+        "type_name": entry['type_name'],
+        "type": type_,
+        "line": line,
+        "odds": float(pick.get('oddValue'))
+    }
+
+
+def live_handicap(pick: Dict, entry: Dict, handicap_param_value: str = None,
+                  score_difference: int = 0):
+    """
+    Азиатский гандикап в лайве. Европейская линия переводится в азиатскую
+    (-0.5) и сдвигается на текущую разницу счета; для второй команды линия
+    и разница берутся с обратным знаком.
+    """
+    line = parse_line(handicap_param_value)
+    if line is None:
+        return False
+    pick_label = pick.get('liveBetPickLabel', '').lower()
+    if 'h 1' in pick_label:
+        pick_type = 'AH1'
+        adjusted_line = line - 0.5 + score_difference
+        absolute_line = line - 0.5
+    elif 'h 2' in pick_label:
+        pick_type = 'AH2'
+        adjusted_line = -line - 0.5 - score_difference
+        absolute_line = -line - 0.5
+    else:
+        return False
+    return {
+        "type_name": 'Asian Handicap',
+        "type": pick_type,
+        "line": adjusted_line,
+        "odds": float(pick.get('oddValue')),
+        "absolute_line": absolute_line
+    }
+
+
+HANDLERS = {
+    'tip_caption': tip_caption,
+    'period_result': period_result,
+    'name_total': name_total,
+    'team_total': team_total,
+    'tip_handicap': tip_handicap,
+    'set_winner': set_winner,
+    'games_total': games_total,
+    'set_games_total': set_games_total,
+    'label_result': label_result,
+    'label_line': label_line,
+    'live_handicap': live_handicap,
+}
+
+MAIN_TIPS = ('KI_1', 'KI_X', 'KI_2')
+
+# --- Таблицы рынков ---
+
+PREMATCH_FOOTBALL = MarketTable({
+    'full time': {'handler': 'tip_caption', 'type_name': '1X2', 'tips': MAIN_TIPS},
+    'first half': {'handler': 'period_result', 'type_name': 'First Half 1X2',
+                   'type_prefix': '1H', 'strip': 'Ih '},
+    'second half': {'handler': 'period_result', 'type_name': 'Second Half 1X2',
+                    'type_prefix': '2H', 'strip': 'IIh '},
+    'total goals': {'handler': 'name_total', 'type_name': 'Total',
+                    'prefix': 'tg', 'over': 'O', 'under': 'U'},
+    'home team total goals': {'handler': 'team_total', 'type_name': 'Individual Total',
+                              'splitter': 'tg team1 ', 'over': 'THO', 'under': 'THU'},
+    'away team total goals': {'handler': 'team_total', 'type_name': 'Individual Total',
+                              'splitter': 'tg team2 ', 'over': 'TAO', 'under': 'TAU'},
+    **dict.fromkeys(['handicap', 'handicap b', 'handicap c'], {
+        'handler': 'tip_handicap', 'type_name': 'Asian Handicap', 'offset': -0.5,
+        'tips': {'H_1': ('AH1', 1), 'H21': ('AH1', 1), 'H31': ('AH1', 1),
+                 'H_2': ('AH2', -1), 'H22': ('AH2', -1), 'H32': ('AH2', -1)}}),
+    'handicap first half': {'handler': 'tip_handicap', 'offset': -0.5,
+                            'type_name': 'First Half Asian Handicap',
+                            'tips': {'PH_1': ('1HAH1', 1), 'PH_2': ('1HAH2', -1)}},
+}, rules=(
+    ('contains', 'total goals first half', {
+        'handler': 'name_total', 'type_name': 'First Half Total',
+        'prefix': 'Ih', 'over': '1HO', 'under': '1HU'}),
+    ('contains', 'total goals second half', {
+        'handler': 'name_total', 'type_name': 'Second Half Total',
+        'prefix': 'IIh', 'over': '2HO', 'under': '2HU'}),
+))
+
+PREMATCH_TENNIS = MarketTable({
+    'final outcome': {'handler': 'tip_caption', 'type_name': '1X2', 'tips': MAIN_TIPS},
+    'hendicap in sets': {'handler': 'tip_handicap', 'offset': 0,
+                         'type_name': 'Asian Handicap in sets',
+                         'tips': {'HS_1': ('AH1', 1), 'HS_2': ('AH2', -1)}},
+    'hendicap in games': {'handler': 'tip_handicap', 'offset': 0,
+                          'type_name': 'Asian Handicap in games',
+                          'tips': {'GH_1': ('GAH1', 1), 'GH_2': ('GAH2', -1)}},
+    **dict.fromkeys(['first set', 'second set', 'third set', 'iv set', 'v set'], {
+        'handler': 'set_winner',
+        'tips': ('S1_1', 'S1_2', 'S2_1', 'S2_2', 'S3_1', 'S3_2',
+                 'S4_1', 'S4_2', 'S5_1', 'S5_2')}),
+    'total games match': {'handler': 'games_total'},
+    **dict.fromkeys(['first set games alternative', 'first set total games',
+                     'second set games', 'third set games', 'iv set games',
+                     'v set games'], {
+        'handler': 'set_games_total',
+        'tips': ('GGP_MINUS', 'GGP_PLUS', 'G_S2_UNDER', 'G_S2_OVER',
+                 'G_S3_UNDER', 'G_S3_OVER', 'G_S4_UNDER', 'G_S4_OVER',
+                 'G_S5_UNDER', 'G_S5_OVER')}),
+})
+
+LIVE_FOOTBALL = MarketTable({
+    **dict.fromkeys(['full time', 'final result'], {
+        'handler': 'label_result', 'type_name': '1X2',
+        'labels': (('ft 1', '1'), ('ft x', 'X'), ('ft 2', '2'))}),
+    **dict.fromkeys(['total goals live', 'total goals - without overtime'], {
+        'handler': 'label_line', 'type_name': 'Total',
+        'labels': (('goals ft<', 'U'), ('goals ft>', 'O'))}),
+    **dict.fromkeys(['home team total goals', 'home team total goals live'], {
+        'handler': 'label_line', 'type_name': 'Individual Total',
+        'labels': (('team1goal tg<', 'THU'), ('team1goal tg>', 'THO'))}),
+    **dict.fromkeys(['away team total goals', 'away team total goals live'], {
+        'handler': 'label_line', 'type_name': 'Individual Total',
+        'labels': (('team2goal tg<', 'TAU'), ('team2goal tg>', 'TAO'))}),
+    'first half': {'handler': 'label_result', 'type_name': 'First Half 1X2',
+                   'labels': (('h 1', '1H1'), ('h x', '1HX'), ('h 2', '1H2'))},
+    **dict.fromkeys(['total goals first half', 'total goals first half live'], {
+        'handler': 'label_line', 'type_name': 'First Half Total',
+        'labels': (('goals ht<', '1HU'), ('h<', '1HU'),
+                   ('goals ht>', '1HO'), ('h>', '1HO'))}),
+    'second half': {'handler': 'label_result', 'type_name': 'Second Half 1X2',
+                    'labels': (('h 1', '2H1'), ('h x', '2HX'), ('h 2', '2H2'))},
+    **dict.fromkeys(['total goals second half', 'total goals second half live'], {
+        'handler': 'label_line', 'type_name': 'Second Half Total',
+        'labels': (('goals st<', '2HU'), ('h<', '2HU'),
+                   ('goals st>', '2HO'), ('h>', '2HO'))}),
+}, rules=(
+    ('contains', 'handicap', {'handler': 'live_handicap'}),
+))
+
+LIVE_TENNIS = MarketTable({
+    'final outcome': {'handler': 'label_result', 'type_name': 'Moneyline',
+                      'labels': (('ft 1', '1'), ('ft 2', '2'))},
+}, rules=(
+    ('contains', 'team1 total games', {
+        'handler': 'label_line', 'type_name': 'Individual Total',
+        'labels': (('team1 tg<', 'GTHU'), ('team1 tg>', 'GTHO'))}),
+    ('contains', 'team2 total games', {
+        'handler': 'label_line', 'type_name': 'Individual Total',
+        'labels': (('team2 tg<', 'GTAU'), ('team2 tg>', 'GTAO'))}),
+    ('contains', 'hendicap in games', {
+        'handler': 'label_line', 'type_name': 'Handicap', 'line': 'handicap',
+        'labels': (('hg 1', 'GAH1'), ('hg 2', 'GAH2'))}),
+    *(('contains', (f'{ordinal} set', 'games'), {
+        'handler': 'label_line', 'type_name': f'Set {number} Total Games',
+        'labels': (('sg<', f'{number}HGU'), ('sg>', f'{number}HGO'))})
+      for number, ordinal in enumerate(ORDINALS, 1)),
+    *(('contains', f'{ordinal} set', {
+        'handler': 'label_result', 'type_name': f'Set {number} Winner',
+        'labels': (('s 1', f'{number}H1'), ('s 2', f'{number}H2'))})
+      for number, ordinal in enumerate(ORDINALS, 1)),
+))
+
+
+def convert_bet(table: MarketTable, bet: Dict, market_name: str,
+                handicap_param_value: str = None) -> Outcome | bool:
+    """
+    Преобразует прематч-ставку в формат сканера по таблице рынков.
+
+    :param table: Таблица рынков вида спорта
+    :param bet: Ставка (tipType, name, caption, value)
+    :param market_name: Название рынка в нижнем регистре
+    :param handicap_param_value: Параметр гандикапа/тотала
+    :return: Исход или False, если ставка не поддерживается
+    """
+    entry = table.resolve(market_name)
+    if entry is None:
+        return False
+    outcome = HANDLERS[entry['handler']](bet, entry, handicap_param_value)
+    return Outcome(outcome) if outcome else outcome
+
+
+def convert_pick(table: MarketTable, pick: Dict, market_name: str,
+                 handicap_param_value: str = None,
+                 score_difference: int = 0) -> Outcome | bool:
+    """
+    Преобразует лайв-пик в формат сканера по таблице рынков.
+
+    :param table: Таблица рынков вида спорта
+    :param pick: Пик (liveBetPickLabel, oddValue, specialValue)
+    :param market_name: Название рынка
+    :param handicap_param_value: Параметр гандикапа
+    :param score_difference: Разница в счете между командами
+    :return: Исход или False, если пик не поддерживается
+    """
+    entry = table.resolve(market_name.lower())
+    if entry is None:
+        return False
+    outcome = HANDLERS[entry['handler']](pick, entry, handicap_param_value,
+                                         score_difference)
+    return Outcome(outcome) if outcome else outcome
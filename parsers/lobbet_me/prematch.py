@@ -4,10 +4,11 @@ import asyncio
 import logging
 import time
 import random
-import re
 from typing import List, Dict
 from datetime import datetime, timedelta
 from aiohttp import ClientSession
+from parsers.lobbet_me.utils import get_sport_and_country
+from parsers.lobbet_me.markets import PREMATCH_FOOTBALL, PREMATCH_TENNIS, convert_bet
 
 BOOKIE = 'lobbet_me'
 MAIN_URL = 'https://www.lobbet.me'
@@ -189,27 +190,13 @@ class PreMatchOddsParser:
                 self.parsed_matches[match_id] = match
 
     def get_sport_and_country(self, match: Dict):
-        sport_data = match.get('sport')
-        league_name = match.get('leagueName') or match.get('league')
-        sport, country = "", ""
-        if sport_data is not None:
-            if sport_data == 'T':
-                sport = 'Tennis'
-                if league_name is not None:
-                    country_match = re.search(r'\(([^)]+)\)', league_name)
-                    if country_match:
-                        country = country_match.group(1).strip()
-                    else:
-                        country = league_name.split(',')[0].strip()
-            elif sport_data == 'S':
-                sport = 'Football'
-                country = league_name.split(',')[0].strip() if league_name else ''
-            # Add more sports as needed
-            else:
-                sport = 'Unknown'
-        return sport, country
+        return get_sport_and_country(match)
 
     async def get_prematch_odds(self):
+        # Каждый цикл начинаем с чистых словарей: матчи, пропавшие из выдачи,
+        # не должны накапливаться (вытеснением занимается клиент)
+        self.ALL_MATCHES = {}
+        self.parsed_matches = {}
         semaphore = asyncio.Semaphore(30)  # Максимум 20 одновременных запросов
 
         async with ClientSession(headers=self.HEADERS) as session:
@@ -222,275 +209,8 @@ class PreMatchOddsParser:
 
     def convert_to_scanner_format_football(self, bet: Dict, market_name: str,
                                            handicap_param_value: str = None) -> Dict | bool:
-
-        if market_name == 'full time' and bet.get('tipType') in ['KI_1', 'KI_X',
-                                                                 'KI_2']:
-            return {
-                "type_name": '1X2',
-                "type": bet.get('caption'),
-                "line": 0,
-                "odds": float(bet.get('value'))
-            }
-        elif market_name == 'first half':
-            return {
-                "type_name": 'First Half 1X2',
-                "type": '1H' + bet['name'].replace('Ih ', ''),
-                "line": 0,
-                "odds": float(bet.get('value'))
-            }
-
-        elif market_name == 'second half':
-            return {
-                "type_name": 'Second Half 1X2',
-                "type": '2H' + bet['name'].replace('IIh ', ''),
-                "line": 0,
-                "odds": float(bet.get('value'))
-            }
-        elif market_name == 'total goals':
-
-            if not bet['name'].startswith('tg'):
-                return False
-            type_ = 'O' if '+' in bet.get('name') else 'U'
-            if '0-' in bet.get('name'):
-                line = int(bet.get('name').split('0-')[1]) + 0.5
-            elif '+' in bet.get('name'):
-                line = int(bet.get('name').split('tg ')[1].split('+')[0]) - 0.5
-            elif 'tg 0' == bet.get('name'):
-                line = 0.5
-            else:
-                return False
-
-            return {
-                "type_name": 'Total',
-                "type": type_,
-                "line": line,
-                "odds": float(bet.get('value'))
-            }
-
-        elif "total goals first half" in market_name:
-            if not bet['name'].startswith('Ih'):
-                return False
-            type_ = '1HO' if '+' in bet.get('name') else '1HU'
-            if '0-' in bet.get('name'):
-                line = int(bet.get('name').split('0-')[1]) + 0.5
-            elif '+' in bet.get('name'):
-                line = int(bet.get('name').split('Ih ')[1].split('+')[0]) - 0.5
-            elif 'Ih 0' == bet.get('name'):
-                line = 0.5
-            else:
-                return False
-            return {
-                "type_name": 'First Half Total',
-                "type": type_,
-                "line": line,
-                "odds": float(bet.get('value'))
-            }
-
-        elif market_name in ['home team total goals', 'away team total goals']:
-            if 'tg team' not in bet['name']:
-                return False
-            splitter = 'tg team1 ' if market_name == 'home team total goals' else 'tg team2 '
-            if '0-' in bet['name']:
-                line = int(bet.get('name').split('0-')[1]) + 0.5
-                type_ = 'THU' if market_name == 'home team total goals' else 'TAU'
-            elif '+' in bet.get('name'):
-                line = int(bet.get('name').split(splitter)[1].split('+')[0]) - 0.5
-                type_ = 'THO' if market_name == 'home team total goals' else 'TAO'
-            elif f'{splitter} 0' == bet.get('name'):
-                line = 0.5
-                type_ = 'THU' if market_name == 'home team total goals' else 'TAU'
-            else:
-                return False
-            return {
-                "type_name": 'Individual Total',
-                "type": type_,
-                "line": line,
-                "odds": float(bet.get('value'))
-            }
-        elif market_name == 'handicap' or market_name == 'handicap b' or market_name == 'handicap c':
-            handicap_value = float(
-                handicap_param_value) if handicap_param_value else 0
-
-            if bet['tipType'] in ['H_1', 'H21', 'H31']:
-                return {
-                    "type_name": 'Asian Handicap',
-                    "type": "AH1",
-                    "line": handicap_value - 0.5,
-                    "odds": float(bet['value'])
-                }
-            elif bet['tipType'] in ['H_2', 'H22', 'H32']:
-                return {
-                    "type_name": 'Asian Handicap',
-                    "type": "AH2",
-                    "line": (-handicap_value) - 0.5,
-                    "odds": float(bet['value'])
-                }
-            else:
-                return False
-
-        elif market_name == 'handicap first half':
-            handicap_value = float(
-                handicap_param_value) if handicap_param_value else 0
-            if bet['tipType'] in ['PH_1']:
-                return {
-                    "type_name": 'First Half Asian Handicap',
-                    "type": "1HAH1",
-                    "line": handicap_value - 0.5,
-                    "odds": float(bet['value'])
-                }
-            elif bet['tipType'] in ['PH_2']:
-                return {
-                    "type_name": 'First Half Asian Handicap',
-                    "type": "1HAH2",
-                    "line": (-handicap_value) - 0.5,
-                    "odds": float(bet['value'])
-                }
-            else:
-                return False
-
-        elif "total goals second half" in market_name:
-            if not bet['name'].startswith('IIh'):
-                return False
-            type_ = '2HO' if '+' in bet.get('name') else '2HU'
-            if '0-' in bet.get('name'):
-                line = int(bet.get('name').split('0-')[1]) + 0.5
-            elif '+' in bet.get('name'):
-                line = int(bet.get('name').split('IIh ')[1].split('+')[0]) - 0.5
-            elif 'IIh 0' == bet.get('name'):
-                line = 0.5
-            else:
-                return False
-            return {
-                "type_name": 'Second Half Total',
-                "type": type_,
-                "line": line,
-                "odds": float(bet.get('value'))
-            }
-
-        else:
-            return False
+        return convert_bet(PREMATCH_FOOTBALL, bet, market_name, handicap_param_value)
 
     def convert_to_scanner_format_tennis(self, bet: Dict, market_name: str,
                                          handicap_param_value: str = None) -> Dict | bool:
-
-        if market_name == 'final outcome' and bet.get('tipType') in ['KI_1', 'KI_X',
-                                                                     'KI_2']:
-            return {
-                "type_name": '1X2',
-                "type": bet.get('caption'),
-                "line": 0,
-                "odds": float(bet.get('value'))
-            }
-
-        elif market_name == 'hendicap in sets':
-            handicap_value = float(
-                handicap_param_value) if handicap_param_value else 0
-
-            if bet['tipType'] in ['HS_1']:
-                return {
-                    "type_name": 'Asian Handicap in sets',
-                    "type": "AH1",
-                    "line": handicap_value,
-                    "odds": float(bet.get('value'))
-                }
-            elif bet['tipType'] in ['HS_2']:
-                return {
-                    "type_name": 'Asian Handicap in sets',
-                    "type": "AH2",
-                    "line": (-handicap_value),
-                    "odds": float(bet.get('value'))
-                }
-            else:
-                return False
-
-        elif market_name == 'hendicap in games':
-            handicap_value = float(
-                handicap_param_value) if handicap_param_value else 0
-
-            if bet['tipType'] in ['GH_1']:
-                return {
-                    "type_name": 'Asian Handicap in games',
-                    "type": "GAH1",
-                    "line": handicap_value,
-                    "odds": float(bet.get('value'))
-                }
-            elif bet['tipType'] in ['GH_2']:
-                return {
-                    "type_name": 'Asian Handicap in games',
-                    "type": "GAH2",
-                    "line": (-handicap_value),
-                    "odds": float(bet.get('value'))
-                }
-            else:
-                return False
-
-        elif (market_name in ['first set', 'second set', 'third set', 'iv set', 'v set']
-              and bet.get('tipType') in ['S1_1', 'S1_2',
-                                         'S2_1', 'S2_2',
-                                         'S3_1', 'S3_2',
-                                         'S4_1', 'S4_2',
-                                         'S5_1', 'S5_2']):
-            type_ = bet.get('tipType')[1] + 'H' + bet.get('tipType')[3]
-            return {
-                "type_name": f'{bet.get("tipType")[1]}' + 'H 1X2',
-                "type": type_,
-                "line": 0,
-                "odds": float(bet.get('value'))
-            }
-
-        elif market_name == 'total games match':
-            handicap_value = float(
-                handicap_param_value) if handicap_param_value else 0
-            if not bet['name'].startswith('tg'):
-                return False
-            type_ = 'GO' if '>' in bet.get('name') else 'GU'
-
-            return {
-                "type_name": 'Total (games)',
-                "type": type_,
-                "line": handicap_value,
-                "odds": float(bet.get('value'))
-            }
-
-        elif (market_name in ['first set games alternative',
-                              'first set total games',
-                              'second set games',
-                              'third set games',
-                              'iv set games',
-                              'v set games']
-              and (bet.get('tipType') in ['GGP_MINUS', 'GGP_PLUS',
-                                          'G_S2_UNDER', 'G_S2_OVER',
-                                          'G_S3_UNDER', 'G_S3_OVER',
-                                          'G_S4_UNDER', 'G_S4_OVER',
-                                          'G_S5_UNDER', 'G_S5_OVER']
-                   or 'GGP_UNDER' in bet.get('tipType') or 'GGP_OVER' in bet.get('tipType'))):
-
-            bet_name = bet.get('name')
-            if 'sg' not in bet_name:
-                return False
-
-            if bet_name.startswith('Isg'):
-                period = '1H'
-            elif bet_name.startswith('IIsg'):
-                period = '2H'
-            elif bet_name.startswith('IIIsg'):
-                period = '3H'
-            elif bet_name.startswith('IVsg'):
-                period = '4H'
-            elif bet_name.startswith('Vsg'):
-                period = '5H'
-            else:
-                return False
-
-            handicap_value = float(
-                handicap_param_value) if handicap_param_value else 0
-
-            return {
-                "type_name": f'{period} Total (games in set)',
-                "type": f'{period}GO' if '>' in bet.get('name') else f'{period}GU',
-                "line": handicap_value,
-                "odds": float(bet.get('value'))
-            }
-
-        else:
-            return False
+        return convert_bet(PREMATCH_TENNIS, bet, market_name, handicap_param_value)
@@ -0,0 +1,46 @@
+import re
+from functools import lru_cache
+from typing import Dict, Tuple
+
+# Страна теннисного турнира указывается в скобках: 'Challenger (Italy)'
+TENNIS_COUNTRY_REGEX = re.compile(r'\(([^)]+)\)')
+
+
+@lru_cache(maxsize=4096)
+def extract_sport_and_country(sport_data: str, league_name: str) -> Tuple[str, str]:
+    """
+    Определяет вид спорта и страну по коду спорта и названию лиги.
+    Результат кэшируется по паре (код спорта, название лиги).
+
+    :param sport_data: Код спорта lobbet ('S', 'T', ...)
+    :param league_name: Название лиги
+    :return: Кортеж (вид спорта, страна)
+    """
+    sport, country = "", ""
+    if sport_data is not None:
+        if sport_data == 'T':
+            sport = 'Tennis'
+            if league_name is not None:
+                country_match = TENNIS_COUNTRY_REGEX.search(league_name)
+                if country_match:
+                    country = country_match.group(1).strip()
+                else:
+                    country = league_name.split(',')[0].strip()
+        elif sport_data == 'S':
+            sport = 'Football'
+            country = league_name.split(',')[0].strip() if league_name else ''
+        # Добавьте другие виды спорта по необходимости
+        else:
+            sport = 'Unknown'
+    return sport, country
+
+
+def get_sport_and_country(match: Dict) -> Tuple[str, str]:
+    """
+    Возвращает вид спорта и страну матча lobbet.
+
+    :param match: Данные матча
+    :return: Кортеж (вид спорта, страна)
+    """
+    league_name = match.get('leagueName') or match.get('league')
+    return extract_sport_and_country(match.get('sport'), league_name)
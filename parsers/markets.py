@@ -0,0 +1,56 @@
+from functools import lru_cache
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+Pattern = Union[str, Tuple[str, ...]]
+Rule = Tuple[str, Pattern, Dict[str, Any]]
+
+
+class MarketTable:
+    """
+    Декларативная таблица рынков букмекера: ключ рынка -> описание рынка.
+
+    Точные ключи ищутся в словаре, остальные проверяются по упорядоченному
+    списку правил (kind, pattern, entry), где kind:
+        'prefix'   - ключ начинается с pattern;
+        'contains' - ключ содержит pattern (для кортежа - все подстроки).
+    Точные ключи имеют приоритет над правилами, среди правил срабатывает
+    первое подходящее.
+
+    Разрешение ключа кэшируется, поэтому строковые сравнения выполняются
+    один раз на каждый новый рынок, а не на каждый коэффициент.
+    """
+
+    KINDS = ('prefix', 'contains')
+
+    def __init__(self, markets: Dict[str, Dict[str, Any]],
+                 rules: Sequence[Rule] = (), maxsize: int = 4096):
+        self.markets = dict(markets)
+        self.rules = []
+        for kind, pattern, entry in rules:
+            if kind not in self.KINDS:
+                raise ValueError(f"Неизвестный тип правила рынка: {kind}")
+            patterns = (pattern,) if isinstance(pattern, str) else tuple(pattern)
+            self.rules.append((kind, patterns, entry))
+        self.resolve = lru_cache(maxsize=maxsize)(self.lookup)
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Находит описание рынка без кэширования.
+
+        :param key: Ключ или название рынка
+        :return: Описание рынка или None, если рынок не поддерживается
+        """
+        entry = self.markets.get(key)
+        if entry is not None:
+            return entry
+
+        for kind, patterns, entry in self.rules:
+            if kind == 'prefix':
+                if any(key.startswith(pattern) for pattern in patterns):
+                    return entry
+            elif all(pattern in key for pattern in patterns):
+                return entry
+        return None
+
+    def cache_info(self):
+        return self.resolve.cache_info()
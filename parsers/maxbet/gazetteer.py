@@ -0,0 +1,198 @@
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from difflib import get_close_matches
+from functools import lru_cache
+from typing import Dict, Optional
+
+try:
+    from geopy.geocoders import Nominatim
+except ImportError:  # geopy нужен только для фонового дообучения
+    Nominatim = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GAZETTEER_PATH = os.path.join(BASE_DIR, 'gazetteer.json')
+GEO_CACHE_PATH = os.path.join(BASE_DIR, 'geo_cache.json')
+
+DEFAULT_COUNTRY = 'World'
+
+
+def normalize_place(name: str) -> str:
+    """
+    Приводит название города/турнира к ключу поиска: ASCII, нижний регистр,
+    без пунктуации и лишних пробелов.
+
+    :param name: Исходное название
+    :return: Нормализованный ключ
+    """
+    name = unicodedata.normalize('NFKD', name)
+    name = name.encode('ascii', 'ignore').decode('ascii').lower()
+    name = re.sub(r'[^a-z0-9]+', ' ', name)
+    return ' '.join(name.split())
+
+
+class CityGazetteer:
+    """
+    Офлайн-справочник город/турнир -> страна.
+
+    Поиск идет по встроенной таблице (gazetteer.json) и по дисковому кэшу
+    выученных значений (geo_cache.json). Сетевой геокодер никогда не
+    вызывается в потоке парсинга: промахи возвращают 'World' сразу, а
+    геокодирование выполняется в фоне и сохраняется в кэш для следующих
+    запросов и перезапусков.
+    """
+
+    def __init__(self, data_path: str = GAZETTEER_PATH,
+                 cache_path: str = GEO_CACHE_PATH, learn: bool = True,
+                 fuzzy_cutoff: float = 0.88):
+        self.cache_path = cache_path
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.places: Dict[str, str] = {}
+        self.learned: Dict[str, str] = {}
+        self.lock = threading.Lock()
+        self.pending = set()
+
+        self.load_table(data_path)
+        self.learned = self.load_cache()
+        self.place_keys = tuple(self.places)
+
+        self.geolocator = None
+        self.executor = None
+        if learn and Nominatim is not None:
+            self.geolocator = Nominatim(user_agent="tennis_league_processor")
+            # Один поток: не больше одного запроса к Nominatim одновременно
+            self.executor = ThreadPoolExecutor(max_workers=1,
+                                               thread_name_prefix='geocoder')
+
+    def load_table(self, data_path: str):
+        """Загружает встроенную таблицу городов и турниров."""
+        try:
+            with open(data_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logging.error(f"Ошибка при загрузке справочника {data_path}: {e}")
+            return
+
+        for country, cities in data.get('cities', {}).items():
+            for city in cities:
+                self.places[normalize_place(city)] = country
+        for tournament, country in data.get('tournaments', {}).items():
+            self.places[normalize_place(tournament)] = country
+
+    def load_cache(self) -> Dict[str, str]:
+        """Загружает выученные ранее соответствия с диска."""
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logging.error(f"Ошибка при загрузке кэша {self.cache_path}: {e}")
+            return {}
+
+    def save_cache(self):
+        """Атомарно сохраняет выученные соответствия на диск."""
+        dir_name = os.path.dirname(self.cache_path) or '.'
+        try:
+            with self.lock:
+                data = dict(self.learned)
+            with tempfile.NamedTemporaryFile('w', delete=False, dir=dir_name,
+                                             encoding='utf-8') as tmp_file:
+                json.dump(data, tmp_file, indent=2, ensure_ascii=False,
+                          sort_keys=True)
+                temp_name = tmp_file.name
+            os.replace(temp_name, self.cache_path)
+        except Exception as e:
+            logging.error(f"Ошибка при сохранении кэша {self.cache_path}: {e}")
+
+    def lookup(self, name: str) -> Optional[str]:
+        """
+        Ищет страну без обращения к сети.
+
+        Порядок: точное совпадение (таблица и кэш), затем самые длинные
+        подфразы названия ('Challenger Sao Leopoldo 2' -> 'sao leopoldo'),
+        затем нечеткое совпадение по таблице.
+
+        :param name: Название города или турнира
+        :return: Страна или None, если ничего не найдено
+        """
+        key = normalize_place(name)
+        if not key:
+            return None
+
+        country = self.learned.get(key) or self.places.get(key)
+        if country:
+            return country
+
+        words = key.split()
+        for size in range(len(words) - 1, 0, -1):
+            for start in range(len(words) - size + 1):
+                phrase = ' '.join(words[start:start + size])
+                country = self.places.get(phrase)
+                if country:
+                    return country
+
+        return self.fuzzy_lookup(key)
+
+    @lru_cache(maxsize=1000)
+    def fuzzy_lookup(self, key: str) -> Optional[str]:
+        """Нечеткий поиск по встроенной таблице (результат кэшируется)."""
+        close = get_close_matches(key, self.place_keys, n=1,
+                                  cutoff=self.fuzzy_cutoff)
+        if close:
+            return self.places[close[0]]
+        return None
+
+    def get_country(self, city: str) -> str:
+        """
+        Возвращает страну для города, не блокируясь на сети.
+
+        :param city: Название города
+        :return: Страна или 'World', если город пока неизвестен
+        """
+        country = self.lookup(city)
+        if country:
+            return country
+        self.schedule_learning(city)
+        return DEFAULT_COUNTRY
+
+    def schedule_learning(self, city: str):
+        """Ставит неизвестный город в очередь фонового геокодирования."""
+        if self.executor is None:
+            return
+        key = normalize_place(city)
+        with self.lock:
+            if not key or key in self.pending or key in self.learned:
+                return
+            self.pending.add(key)
+        self.executor.submit(self.learn, key, city)
+
+    def learn(self, key: str, city: str):
+        """Геокодирует город в фоне и запоминает результат на диске."""
+        country = DEFAULT_COUNTRY
+        try:
+            location = self.geolocator.geocode(city, language='en',
+                                               timeout=10)
+            if location:
+                # Получаем страну из адреса
+                country = location.address.split(",")[-1].strip()
+                # Обрабатываем специальные случаи
+                if country == "United States":
+                    country = "USA"
+        except Exception as e:
+            logging.warning(f"Не удалось геокодировать '{city}': {e}")
+            with self.lock:
+                self.pending.discard(key)
+            return
+
+        with self.lock:
+            # 'World' тоже запоминаем, чтобы не запрашивать город повторно
+            self.learned[key] = country
+            self.pending.discard(key)
+        self.save_cache()
+        logging.info(f"Геокодирован город '{city}': {country}")
@@ -9,6 +9,7 @@ from parsers.maxbet.utils import (
     process_tennis_team_name, process_league_name, process_country_name,
     extract_city_from_league_name, process_football_team_names, get_country_by_city
 )
+from parsers.maxbet.markets import live_converter
 
 BOOKIE = 'maxbet_me'
 MAIN_URL = 'https://api.maxbet.me'
@@ -258,300 +259,15 @@ class LiveOddsParser:
 
     def convert_odd_to_scanner_format(self, odd_key: str, odd_data: Dict, score_difference: int = 0) -> Dict:
         """
-        Преобразует данные коэффициентов в стандартный формат сканера.
+        Преобразует данные коэффициентов в стандартный формат сканера
+        по таблице рынков (см. parsers/maxbet/markets.py).
 
         :param odd_key: Ключ коэффициента
         :param odd_data: Данные коэффициента
-        :param score_difference: Разница в счете между командами
+        :param score_difference: Разница в счете между командами (не используется)
         :return: Словарь с преобразованными данными
         """
-        # Получаем значение коэффициента
-        odd_value = odd_data.get('value')
-
-        # Проверяем наличие коэффициента
-        if odd_value == 0 or odd_value is None:
-            odd_value = 0.0  # Устанавливаем значение по умолчанию
-
-        parts = odd_key.split(':')
-
-        # Проверяем корректность ключа
-        if len(parts) < 3:
-            return {
-                "type_name": "Unknown",
-                "type": "Unknown",
-                "line": 0.0,
-                "odds": float(odd_value)
-            }
-
-        market_key = parts[1]  # Например, 'ft' для Full Time
-        pick_type = parts[2]   # Например, '1', 'X', '2', 'over', 'under'
-
-        elem_outcomes = {
-            "type_name": market_key,
-            "type": pick_type,
-            "line": 0.0,
-            "odds": float(odd_value)
-        }
-
-        # Преобразуем market_key и pick_type в понятные названия
-        if market_key in ["ft"]:
-            elem_outcomes["type_name"] = "Final Score"
-            elem_outcomes["type"] = pick_type
-        elif market_key == "dc":
-            elem_outcomes["type_name"] = "Double Chance"
-            elem_outcomes["type"] = pick_type
-        elif market_key == "cs":
-            elem_outcomes["type_name"] = "Correct Score"
-            elem_outcomes["type"] = pick_type
-        elif market_key == "tg":
-            elem_outcomes["type_name"] = "Total Goals"
-            if "over" in odd_key:
-                elem_outcomes["type"] = "Over"
-                elem_outcomes["line"] = float(parts[-1].split("|")[-1])
-            elif "under" in odd_key:
-                elem_outcomes["type"] = "Under"
-                elem_outcomes["line"] = float(parts[-1].split("|")[-1])
-        elif market_key == "hf":
-            elem_outcomes["type_name"] = "Half Time - Full Time"
-            elem_outcomes["type"] = pick_type
-        elif market_key == "1x2":
-            elem_outcomes["type_name"] = "1X2"
-            elem_outcomes["type"] = pick_type
-        elif market_key == "dnb":
-            elem_outcomes["type_name"] = "Draw No Bet"
-            elem_outcomes["type"] = pick_type
-        elif market_key == "eo":
-            elem_outcomes["type_name"] = "Even/Odd"
-            elem_outcomes["type"] = pick_type
-        elif market_key == "btts":
-            elem_outcomes["type_name"] = "Both Teams to Score"
-            elem_outcomes["type"] = pick_type
-        elif market_key == "ng":
-            elem_outcomes["type_name"] = "First Team to Score"
-            elem_outcomes["type"] = pick_type.split("|")[-1]
-        elif market_key == "tg1sth":
-            elem_outcomes["type_name"] = "Total Goals First Half"
-            if "over" in odd_key:
-                elem_outcomes["type"] = "Over"
-                elem_outcomes["line"] = float(odd_key.split("|")[-1])
-            elif "under" in odd_key:
-                elem_outcomes["type"] = "Under"
-                elem_outcomes["line"] = float(odd_key.split("|")[-1])
-        elif market_key == "tg2ndh":
-            elem_outcomes["type_name"] = "Total Goals Second Half"
-            if "over" in odd_key:
-                elem_outcomes["type"] = "Over"
-                elem_outcomes["line"] = float(odd_key.split("|")[-1])
-            elif "under" in odd_key:
-                elem_outcomes["type"] = "Under"
-                elem_outcomes["line"] = float(odd_key.split("|")[-1])
-        # else:
-        #     # Если тип рынка не распознан, оставляем оригинальные данные
-        #     elem_outcomes["type_name"] = market_key
-        #     elem_outcomes["type"] = pick_type
-
-        # Process different bet types
-        if market_key == "fr":
-            # Match Winner (Final Result)
-            elem_outcomes["type_name"] = "Match Winner"
-            elem_outcomes["bet_type"] = "MONEYLINE"
-            if pick_type == "1":
-                elem_outcomes["type"] = "1"
-                elem_outcomes["team"] = "PLAYER1"
-            elif pick_type == "2":
-                elem_outcomes["type"] = "2"
-                elem_outcomes["team"] = "PLAYER2"
-            else:
-                elem_outcomes["type"] = "Unknown"
-
-        elif market_key in ["1sw", "2sw"]:
-            # Set Winner (1st Set Winner, 2nd Set Winner)
-            set_number = int(market_key[0])
-            elem_outcomes["type_name"] = f"Set {set_number} Winner"
-            elem_outcomes["bet_type"] = "MONEYLINE"
-            elem_outcomes["period_number"] = set_number
-            if pick_type == "1":
-                elem_outcomes["type"] = f"S{set_number}W1"
-                elem_outcomes["team"] = "PLAYER1"
-            elif pick_type == "2":
-                elem_outcomes["type"] = f"S{set_number}W2"
-                elem_outcomes["team"] = "PLAYER2"
-            else:
-                elem_outcomes["type"] = "Unknown"
-
-        elif market_key == "tg":
-            # Total Games
-            elem_outcomes["type_name"] = "Total Games"
-            elem_outcomes["bet_type"] = "TOTAL_POINTS"
-            try:
-                side, line = pick_type.split('|')
-                elem_outcomes["line"] = float(line)
-                if side.lower() == "over":
-                    elem_outcomes["type"] = "O"
-                    elem_outcomes["side"] = "OVER"
-                elif side.lower() == "under":
-                    elem_outcomes["type"] = "U"
-                    elem_outcomes["side"] = "UNDER"
-                else:
-                    elem_outcomes["type"] = "Unknown"
-            except ValueError:
-                elem_outcomes["type"] = "Unknown"
-                elem_outcomes["line"] = 0.0
-
-        elif market_key in ["tnoght", "tnogat"]:
-            # Total Number of Games Home/Away Team
-            if market_key == "tnoght":
-                elem_outcomes["type_name"] = "Team Total Home"
-                elem_outcomes["team"] = "PLAYER1"
-                type_prefix = "TH"
-            elif market_key == "tnogat":
-                elem_outcomes["type_name"] = "Team Total Away"
-                elem_outcomes["team"] = "PLAYER2"
-                type_prefix = "TA"
-            elem_outcomes["bet_type"] = "TEAM_TOTAL_POINTS"
-            try:
-                side, line = pick_type.split('|')
-                elem_outcomes["line"] = float(line)
-                if side.lower() == "over":
-                    elem_outcomes["type"] = f"{type_prefix}O"
-                    elem_outcomes["side"] = "OVER"
-                elif side.lower() == "under":
-                    elem_outcomes["type"] = f"{type_prefix}U"
-                    elem_outcomes["side"] = "UNDER"
-                else:
-                    elem_outcomes["type"] = "Unknown"
-            except ValueError:
-                elem_outcomes["type"] = "Unknown"
-                elem_outcomes["line"] = 0.0
-
-        elif market_key == "eog":
-            # Even/Odd Games
-            elem_outcomes["type_name"] = "Even/Odd Games"
-            elem_outcomes["bet_type"] = "ODD_EVEN"
-            if pick_type.lower() == "even":
-                elem_outcomes["type"] = "Even"
-            elif pick_type.lower() == "odd":
-                elem_outcomes["type"] = "Odd"
-            else:
-                elem_outcomes["type"] = "Unknown"
-
-        elif market_key == "1stseog":
-            # 1st Set Even/Odd Games
-            elem_outcomes["type_name"] = "1st Set Even/Odd Games"
-            elem_outcomes["bet_type"] = "ODD_EVEN"
-            elem_outcomes["period_number"] = 1
-            if pick_type.lower() == "even":
-                elem_outcomes["type"] = "1stSetEven"
-            elif pick_type.lower() == "odd":
-                elem_outcomes["type"] = "1stSetOdd"
-            else:
-                elem_outcomes["type"] = "Unknown"
-
-        elif market_key == "cs":
-            # Correct Score
-            elem_outcomes["type_name"] = "Correct Score"
-            elem_outcomes["bet_type"] = "CORRECT_SCORE"
-            elem_outcomes["type"] = pick_type
-
-        elif market_key == "nos23":
-            # Number of Sets 2 or 3
-            elem_outcomes["type_name"] = "Number of Sets"
-            elem_outcomes["bet_type"] = "NUMBER_OF_SETS"
-            elem_outcomes["type"] = pick_type
-
-        else:
-            # For other markets, keep the original names for easier debugging
-            elem_outcomes["type_name"] = market_key
-            elem_outcomes["type"] = pick_type
-
-        # Process 'line' field from odd_data if it's not set and 'special_value' exists
-        if elem_outcomes["line"] == 0.0:
-            line = odd_data.get('special_value')
-            if line is not None:
-                try:
-                    elem_outcomes["line"] = float(line)
-                except (ValueError, TypeError):
-                    elem_outcomes["line"] = 0.0
-
-        return elem_outcomes
-
-        # Обрабатываем рынки
-        # if market_key == 'fr':
-        #     # Результат матча (Match Winner)
-        #     elem_outcomes['type_name'] = 'Match Winner'
-        #     elem_outcomes['type'] = pick_type  # '1' или '2'
-        #
-        # elif market_key.endswith('sw'):
-        #     # Победитель сета (Set Winner)
-        #     set_number = market_key[:-2]
-        #     if set_number.isdigit():
-        #         set_number = int(set_number)
-        #         elem_outcomes['type_name'] = f'Set {set_number} Winner'
-        #         elem_outcomes['type'] = pick_type
-        #         elem_outcomes['set_number'] = set_number
-        #     else:
-        #         return None
-        #
-        # elif market_key == 'hg':
-        #     # Гандикап по геймам (Game Handicap)
-        #     team_line = pick_type.split('|')
-        #     if len(team_line) == 2:
-        #         team = team_line[0]
-        #         line = float(team_line[1])
-        #         elem_outcomes['type_name'] = 'Game Handicap'
-        #         elem_outcomes['type'] = f'AH{team}'
-        #         elem_outcomes['line'] = line
-        #     else:
-        #         return None
-        #
-        # elif market_key in ['g', 'tg', 'tnoght', 'tnogat', 'tnogis1', 'tnogis2']:
-        #     # Тотал геймов (Total Games), включая тотал по командам и сетам
-        #     side_line = pick_type.split('|')
-        #     if len(side_line) == 2:
-        #         side = side_line[0].lower()
-        #         line = float(side_line[1])
-        #         if market_key == 'tnoght':
-        #             elem_outcomes['type_name'] = 'Total Games Home Team'
-        #         elif market_key == 'tnogat':
-        #             elem_outcomes['type_name'] = 'Total Games Away Team'
-        #         elif market_key == 'tnogis1':
-        #             elem_outcomes['type_name'] = 'Total Games Set 1'
-        #             elem_outcomes['set_number'] = 1
-        #         elif market_key == 'tnogis2':
-        #             elem_outcomes['type_name'] = 'Total Games Set 2'
-        #             elem_outcomes['set_number'] = 2
-        #         else:
-        #             elem_outcomes['type_name'] = 'Total Games'
-        #         if side in ['over', '(+)']:
-        #             elem_outcomes['type'] = 'O'
-        #         elif side in ['under', '(-)']:
-        #             elem_outcomes['type'] = 'U'
-        #         else:
-        #             return None  # Некорректный тип тотала
-        #         elem_outcomes['line'] = line
-        #     else:
-        #         return None
-        #
-        # elif market_key == 'cs':
-        #     # Точный счет по сетам (Correct Score)
-        #     elem_outcomes['type_name'] = 'Correct Score'
-        #     elem_outcomes['type'] = pick_type
-        #
-        # elif market_key == 'eog':
-        #     # Чет/Нечет по геймам (Even/Odd Games)
-        #     outcome = pick_type.lower()
-        #     if outcome in ['even', 'odd']:
-        #         elem_outcomes['type_name'] = 'Even/Odd Games'
-        #         elem_outcomes['type'] = 'Even' if outcome == 'even' else 'Odd'
-        #     else:
-        #         return None
-        #
-        # else:
-        #     # Для остальных рынков используем названия из БК
-        #     elem_outcomes['type_name'] = market_key
-        #     elem_outcomes['type'] = pick_type
-        #
-        # return elem_outcomes
+        return live_converter.convert(odd_key, odd_data)
 
     def convert_datetime_to_timestamp(self, datetime_str: str, offset_hours: int = 0) -> float:
         try:
@@ -566,6 +282,10 @@ class LiveOddsParser:
         return dt.timestamp()
 
     async def get_live_odds(self) -> Dict[str, Dict]:
+        # Каждый цикл начинаем с чистых словарей: матчи, пропавшие из выдачи,
+        # не должны накапливаться (вытеснением занимается клиент)
+        self.ALL_MATCHES = {}
+        self.parsed_matches = {}
         timeout = ClientTimeout(total=15)
         connector = TCPConnector(limit_per_host=5)
         async with ClientSession(headers=self.HEADERS, timeout=timeout, connector=connector) as session:
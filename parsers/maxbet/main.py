@@ -8,6 +8,9 @@ import websockets
 from parsers.maxbet.live import LiveOddsParser
 from parsers.maxbet.prematch import PreMatchOddsParser
 from parsers.utils import save_odds_to_jsonl
+from parsers.registry import MatchRegistry
+from parsers.name_keys import event_keys
+from models import to_jsonable
 
 # Настройка логирования
 logging.basicConfig(
@@ -22,6 +25,14 @@ BOOKIE = 'maxbet_me'  # Идентификатор букмекера
 LIVE_UPDATE_INTERVAL = 2.0
 PREMATCH_UPDATE_INTERVAL = 16.0
 
+# Вытеснение матчей из реестров: сколько секунд матч может не попадаться
+# в выдаче, сколько он может длиться после начала и сколько матчей храним
+LIVE_MATCH_TTL = 10.0
+PREMATCH_MATCH_TTL = 60.0
+LIVE_MAX_DURATION = 4 * 60 * 60
+MAX_LIVE_MATCHES = 5000
+MAX_PREMATCH_MATCHES = 20000
+
 # Директория для логирования данных
 LOG_DIR = 'odds_data'
 os.makedirs(LOG_DIR, exist_ok=True)
@@ -31,28 +42,52 @@ class MaxbetClient:
     def __init__(self):
         self.live_parser = LiveOddsParser()
         self.prematch_parser = PreMatchOddsParser()
-        self.ALL_MATCHES = {}
-        self.parsed_matches = {}
         self.connected_clients = set()
         self.lock = asyncio.Lock()
+        # Удаленные из реестров матчи, которые нужно разослать клиентам
+        self.pending_removals = {'Live': {}, 'PreMatch': {}}
+        self.matches = {
+            'Live': MatchRegistry(
+                'maxbet live', ttl=LIVE_MATCH_TTL,
+                kickoff_ttl=LIVE_MAX_DURATION, max_size=MAX_LIVE_MATCHES,
+                on_evict=lambda removed: self.schedule_removals('Live', removed)),
+            'PreMatch': MatchRegistry(
+                'maxbet prematch', ttl=PREMATCH_MATCH_TTL,
+                kickoff_ttl=0, max_size=MAX_PREMATCH_MATCHES,
+                on_evict=lambda removed: self.schedule_removals('PreMatch', removed)),
+        }
+
+    def schedule_removals(self, match_type: str, removed: dict):
+        """Запоминает вытесненные матчи, чтобы отправить клиентам {match_id: None}."""
+        for match_id in removed:
+            self.pending_removals[match_type][match_id] = None
+
+    async def refresh_registry(self, match_type: str, matches: dict) -> dict:
+        """
+        Обновляет реестр матчами текущего цикла и вытесняет устаревшие.
+
+        :param match_type: 'Live' или 'PreMatch'
+        :param matches: матчи, полученные парсером в этом цикле
+        :return: актуальные матчи реестра
+        """
+        registry = self.matches[match_type]
+        async with self.lock:
+            registry.update(matches)
+            registry.expire()
+            snapshot = registry.snapshot()
+        logging.info(f"Total {match_type.lower()} matches: {len(snapshot)}, "
+                     f"registry stats: {registry.stats()}")
+        return snapshot
 
     async def get_live_odds(self) -> dict:
         """Получает live коэффициенты и обновляет внутренние структуры."""
         live_matches = await self.live_parser.get_live_odds()
-        async with self.lock:
-            self.ALL_MATCHES.update(self.live_parser.ALL_MATCHES)
-            self.parsed_matches.update(self.live_parser.parsed_matches)
-        logging.info(f"Total live matches: {len(self.live_parser.ALL_MATCHES)}")
-        return self.parsed_matches
+        return await self.refresh_registry('Live', live_matches)
 
     async def get_prematch_odds(self) -> dict:
         """Получает предматчевые коэффициенты и обновляет внутренние структуры."""
         prematch_matches = await self.prematch_parser.get_prematch_odds()
-        async with self.lock:
-            self.ALL_MATCHES.update(self.prematch_parser.ALL_MATCHES)
-            self.parsed_matches.update(self.prematch_parser.parsed_matches)
-        logging.info(f"Total prematch matches: {len(self.prematch_parser.ALL_MATCHES)}")
-        return self.parsed_matches
+        return await self.refresh_registry('PreMatch', prematch_matches)
 
     async def update_odds_periodically(self, get_odds_func, match_type: str, interval: float):
         """
@@ -68,9 +103,14 @@ class MaxbetClient:
                 odds = await get_odds_func()
                 logging.info(f"{match_type} odds updated. Total {match_type.lower()} matches: {len(odds)}")
                 normalized_data = await self.normalize_odds(odds, match_type=match_type)
+                async with self.lock:
+                    removals = self.pending_removals[match_type]
+                    self.pending_removals[match_type] = {}
+                # None сообщает получателям, что матч больше не актуален
+                normalized_data.update(removals)
 
                 if self.connected_clients:
-                    data_to_send = json.dumps(normalized_data)
+                    data_to_send = json.dumps(normalized_data, default=to_jsonable)
                     # Отправляем данные всем подключенным клиентам
                     coros = [self.send_data_to_client(client, data_to_send) for client in self.connected_clients]
                     await asyncio.gather(*coros, return_exceptions=True)
@@ -126,6 +166,8 @@ class MaxbetClient:
             "outcomes": outcomes,
             "time": match['time'],
             "bookmaker": BOOKIE,
+            "name_keys": event_keys(match['home_team'], match['away_team'],
+                                    match['league'], match['sport']),
         }
 
         # Сохраняем данные матча в файл
@@ -186,8 +228,7 @@ class MaxbetClient:
 
         if updated_match:
             async with self.lock:
-                self.ALL_MATCHES[match_id] = updated_match
-                self.parsed_matches[match_id] = updated_match
+                self.matches[match_type].upsert(match_id, updated_match)
             logging.info(f"Successfully reparsed match ID {match_id}")
             return updated_match
         else:
@@ -0,0 +1,212 @@
+from functools import lru_cache
+from typing import Any, Dict, Sequence, Tuple
+
+from models import Outcome
+from parsers.markets import MarketTable
+
+# Описание рынка maxbet:
+#     type_name - название рынка в формате сканера (по умолчанию ключ рынка);
+#     fields    - постоянные поля исхода (bet_type, type, side, team, ...);
+#     picks     - исход по значению пика ('1', '2', 'even', ...);
+#     sides     - исход по стороне пика вида 'сторона|линия' (линия из пика);
+#     line      - 'pick': линия берется из хвоста пика 'over|2.5'.
+# Пики, не описанные в picks/sides, получают тип 'Unknown'.
+# Если линия не определена, она берется из special_value коэффициента.
+
+UNKNOWN = {'type': 'Unknown'}
+
+
+def moneyline(type_name: str, type_prefix: str = '', team: str = 'TEAM',
+              **fields) -> Dict[str, Any]:
+    return {
+        'type_name': type_name,
+        'fields': {'bet_type': 'MONEYLINE', **fields},
+        'picks': {
+            '1': {'type': f'{type_prefix}1', 'team': f'{team}1'},
+            '2': {'type': f'{type_prefix}2', 'team': f'{team}2'},
+        },
+    }
+
+
+def over_under(over: Sequence[str], under: Sequence[str],
+               type_prefix: str = '') -> Dict[str, Dict[str, str]]:
+    sides = {}
+    for side in over:
+        sides[side] = {'type': f'{type_prefix}O', 'side': 'OVER'}
+    for side in under:
+        sides[side] = {'type': f'{type_prefix}U', 'side': 'UNDER'}
+    return sides
+
+
+def fixed_side(type_name: str, type_: str, side: str, bet_type: str,
+               **fields) -> Dict[str, Any]:
+    return {
+        'type_name': type_name,
+        'fields': {'bet_type': bet_type, 'type': type_, 'side': side, **fields},
+    }
+
+
+def labelled(type_name: str, bet_type: str, **fields) -> Dict[str, Any]:
+    return {'type_name': type_name, 'fields': {'bet_type': bet_type, **fields}}
+
+
+PREMATCH_SIDES = over_under(over=('(+)', '+'), under=('(-)', '-'))
+LIVE_SIDES = over_under(over=('over',), under=('under',))
+
+PREMATCH_MARKETS = {
+    'fs': moneyline('1X2'),
+    '1s': moneyline('1H1X2', '1H', period_number=1),
+    '2s': moneyline('2H1X2', '2H', period_number=2),
+    'g': {'type_name': 'Total Goals', 'fields': {'bet_type': 'TOTAL_POINTS'},
+          'sides': PREMATCH_SIDES},
+    'tg': {'type_name': 'Total Goals', 'fields': {'bet_type': 'TOTAL_POINTS'},
+           'sides': PREMATCH_SIDES},
+    'GO': fixed_side('Total Goals', 'O', 'OVER', 'TOTAL_POINTS'),
+    'GU': fixed_side('Total Goals', 'U', 'UNDER', 'TOTAL_POINTS'),
+    'GTHO': fixed_side('Team Total Home', 'GTHO', 'OVER', 'TEAM_TOTAL_POINTS',
+                       team='TEAM1'),
+    'GTHU': fixed_side('Team Total Home', 'GTHU', 'UNDER', 'TEAM_TOTAL_POINTS',
+                       team='TEAM1'),
+    'GTAO': fixed_side('Team Total Away', 'GTAO', 'OVER', 'TEAM_TOTAL_POINTS',
+                       team='TEAM2'),
+    'GTAU': fixed_side('Team Total Away', 'GTAU', 'UNDER', 'TEAM_TOTAL_POINTS',
+                       team='TEAM2'),
+    '1H1X2': moneyline('1H1X2', '1H', period_number=1),
+    '1HGO': fixed_side('1H Total Goals', '1HO', 'OVER', 'TOTAL_POINTS',
+                       period_number=1),
+    '1HGU': fixed_side('1H Total Goals', '1HU', 'UNDER', 'TOTAL_POINTS',
+                       period_number=1),
+}
+
+PREMATCH_RULES = (
+    # Прочие рынки первого периода оставляем как есть, но с номером периода
+    ('prefix', '1H', {'fields': {'period_number': 1}}),
+)
+
+LIVE_MARKETS = {
+    'fr': moneyline('Match Winner', team='PLAYER'),
+    '1sw': moneyline('Set 1 Winner', 'S1W', 'PLAYER', period_number=1),
+    '2sw': moneyline('Set 2 Winner', 'S2W', 'PLAYER', period_number=2),
+    'tg': {'type_name': 'Total Games', 'fields': {'bet_type': 'TOTAL_POINTS'},
+           'sides': LIVE_SIDES},
+    'tnoght': {'type_name': 'Team Total Home',
+               'fields': {'bet_type': 'TEAM_TOTAL_POINTS', 'team': 'PLAYER1'},
+               'sides': over_under(('over',), ('under',), 'TH')},
+    'tnogat': {'type_name': 'Team Total Away',
+               'fields': {'bet_type': 'TEAM_TOTAL_POINTS', 'team': 'PLAYER2'},
+               'sides': over_under(('over',), ('under',), 'TA')},
+    'eog': {**labelled('Even/Odd Games', 'ODD_EVEN'),
+            'picks': {'even': {'type': 'Even'}, 'odd': {'type': 'Odd'}}},
+    '1stseog': {**labelled('1st Set Even/Odd Games', 'ODD_EVEN',
+                           period_number=1),
+                'picks': {'even': {'type': '1stSetEven'},
+                          'odd': {'type': '1stSetOdd'}}},
+    'cs': labelled('Correct Score', 'CORRECT_SCORE'),
+    'nos23': labelled('Number of Sets', 'NUMBER_OF_SETS'),
+    'tg1sth': {'line': 'pick'},
+    'tg2ndh': {'line': 'pick'},
+}
+
+# Рынки, пики которых сравниваются без учета регистра
+CASE_INSENSITIVE_PICKS = {'eog', '1stseog'}
+
+
+class MarketConverter:
+    """
+    Конвертер коэффициентов maxbet в формат сканера по таблице рынков.
+
+    Шаблон исхода для пары (ключ рынка, пик) строится один раз и кэшируется,
+    на каждый коэффициент остается копирование шаблона и подстановка
+    коэффициента и линии.
+    """
+
+    def __init__(self, table: MarketTable,
+                 line_keys: Tuple[str, ...] = ('special_value',),
+                 maxsize: int = 16384):
+        self.table = table
+        self.line_keys = line_keys
+        self.resolve = lru_cache(maxsize=maxsize)(self.build_template)
+
+    def build_template(self, market_key: str, pick_type: str) -> Dict[str, Any]:
+        """
+        Строит шаблон исхода без коэффициента.
+
+        :param market_key: Ключ рынка, например 'fs' или 'tg'
+        :param pick_type: Пик, например '1', 'over|2.5'
+        :return: Словарь исхода без поля odds
+        """
+        entry = self.table.resolve(market_key) or {}
+        outcome = {
+            "type_name": entry.get('type_name', market_key),
+            "type": pick_type,
+            "line": 0.0,
+        }
+        outcome.update(entry.get('fields', {}))
+
+        if 'picks' in entry:
+            pick = pick_type.lower() if market_key in CASE_INSENSITIVE_PICKS else pick_type
+            outcome.update(entry['picks'].get(pick, UNKNOWN))
+
+        elif 'sides' in entry:
+            try:
+                side, line = pick_type.split('|')
+                outcome["line"] = float(line)
+                outcome.update(entry['sides'].get(side.lower(), UNKNOWN))
+            except ValueError:
+                outcome["type"] = "Unknown"
+                outcome["line"] = 0.0
+
+        elif entry.get('line') == 'pick':
+            if 'over' in pick_type or 'under' in pick_type:
+                try:
+                    outcome["line"] = float(pick_type.split('|')[-1])
+                except ValueError:
+                    outcome["line"] = 0.0
+
+        return outcome
+
+    def get_line(self, odd_data: Dict) -> float:
+        """Линия из данных коэффициента (special_value, затем line)."""
+        line = None
+        for key in self.line_keys:
+            line = odd_data.get(key)
+            if line:
+                break
+        if line is None:
+            return 0.0
+        try:
+            return float(line)
+        except (ValueError, TypeError):
+            return 0.0
+
+    def convert(self, odd_key: str, odd_data: Dict) -> Outcome:
+        """
+        Преобразует коэффициент maxbet в стандартный формат сканера.
+
+        :param odd_key: Ключ коэффициента вида 'id:market:pick'
+        :param odd_data: Данные коэффициента
+        :return: Исход в формате сканера
+        """
+        odd_value = odd_data.get('value')
+        if odd_value == 0 or odd_value is None:
+            odd_value = 0.0
+
+        parts = odd_key.split(':')
+        if len(parts) < 3:
+            return Outcome(type_name="Unknown", type="Unknown", line=0.0,
+                           odds=float(odd_value))
+
+        outcome = Outcome(self.resolve(parts[1], parts[2]))
+        outcome["odds"] = float(odd_value)
+        if outcome["line"] == 0.0:
+            outcome["line"] = self.get_line(odd_data)
+        return outcome
+
+    def cache_info(self):
+        return self.resolve.cache_info()
+
+
+prematch_converter = MarketConverter(
+    MarketTable(PREMATCH_MARKETS, PREMATCH_RULES),
+    line_keys=('special_value', 'line'))
+live_converter = MarketConverter(MarketTable(LIVE_MARKETS))
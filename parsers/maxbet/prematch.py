@@ -9,6 +9,7 @@ from parsers.maxbet.utils import (
     process_tennis_team_name, process_league_name, process_country_name,
     extract_city_from_league_name, process_football_team_names, get_country_by_city
 )
+from parsers.maxbet.markets import prematch_converter
 
 BOOKIE = 'maxbet_me'
 MAIN_URL = 'https://api.maxbet.me'
@@ -224,395 +225,15 @@ class PreMatchOddsParser:
 
     def convert_odd_to_scanner_format(self, odd_key: str, odd_data: Dict, score_difference: int = 0) -> Dict:
         """
-        Преобразует данные коэффициентов в стандартный формат сканера.
+        Преобразует данные коэффициентов в стандартный формат сканера
+        по таблице рынков (см. parsers/maxbet/markets.py).
 
         :param odd_key: Ключ коэффициента
         :param odd_data: Данные коэффициента
         :param score_difference: Разница в счете между командами (не используется в данном контексте)
         :return: Словарь с преобразованными данными
         """
-        # Получаем значение коэффициента
-        odd_value = odd_data.get('value')
-
-        # Проверяем наличие коэффициента
-        if odd_value == 0 or odd_value is None:
-            odd_value = 0.0  # Устанавливаем значение по умолчанию
-
-        parts = odd_key.split(':')
-
-        # Проверяем корректность ключа
-        if len(parts) < 3:
-            return {
-                "type_name": "Unknown",
-                "type": "Unknown",
-                "line": 0.0,
-                "odds": float(odd_value)
-            }
-
-        market_key = parts[1]  # Например, 'ft' для Full Time
-        pick_type = parts[2]   # Например, '1', 'X', '2', 'over', 'under'
-
-        elem_outcomes = {
-            "type_name": market_key,
-            "type": pick_type,
-            "line": 0.0,
-            "odds": float(odd_value)
-        }
-
-        # Преобразуем market_key и pick_type в понятные названия
-        # if market_key == "dw":
-        #     elem_outcomes["type_name"] = "Draw"
-        # elif market_key == "fs":
-        #     elem_outcomes["type_name"] = "Full Time Score"
-        # elif market_key == "ht":
-        #     elem_outcomes["type_name"] = "Half Time"
-        # elif market_key == "sh":
-        #     elem_outcomes["type_name"] = "Second Half"
-        # elif market_key == "dc":
-        #     elem_outcomes["type_name"] = "Double Chance"
-        # elif market_key == "oe":
-        #     elem_outcomes["type_name"] = "Odd/Even"
-        # elif market_key == "tg":
-        #     elem_outcomes["type_name"] = "Total Goals"
-        #     if pick_type.endswith('+'):
-        #         try:
-        #             elem_outcomes["line"] = float(pick_type[:-1])
-        #         except ValueError:
-        #             elem_outcomes["line"] = 0.0
-        # elif market_key == "atg":
-        #     elem_outcomes["type_name"] = "Alternative Total Goals"
-        #     if pick_type.endswith('+'):
-        #         try:
-        #             elem_outcomes["line"] = float(pick_type[:-1])
-        #         except ValueError:
-        #             elem_outcomes["line"] = 0.0
-        # elif market_key == "cr":
-        #     elem_outcomes["type_name"] = "Correct Score"
-        #     elem_outcomes["type"] = f"{parts[2]}:{parts[3]}" if len(parts) > 3 else "Unknown"
-        # elif market_key == "gg":
-        #     elem_outcomes["type_name"] = "Both Teams to Score"
-        # elif market_key == "fhg":
-        #     elem_outcomes["type_name"] = "First Half Goals"
-        #     if pick_type.endswith('+'):
-        #         try:
-        #             elem_outcomes["line"] = float(pick_type[:-1])
-        #         except ValueError:
-        #             elem_outcomes["line"] = 0.0
-        # elif market_key == "shg":
-        #     elem_outcomes["type_name"] = "Second Half Goals"
-        #     if pick_type.endswith('+'):
-        #         try:
-        #             elem_outcomes["line"] = float(pick_type[:-1])
-        #         except ValueError:
-        #             elem_outcomes["line"] = 0.0
-
-        # Обрабатываем различные типы ставок
-        if market_key == "fs":
-            # 1X2 (Основной исход)
-            elem_outcomes["type_name"] = "1X2"
-            elem_outcomes["bet_type"] = "MONEYLINE"
-            if pick_type == "1":
-                elem_outcomes["type"] = "1"
-                elem_outcomes["team"] = "TEAM1"
-            elif pick_type == "2":
-                elem_outcomes["type"] = "2"
-                elem_outcomes["team"] = "TEAM2"
-            else:
-                elem_outcomes["type"] = "Unknown"
-
-        elif market_key in ["1s", "2s"]:
-            # Исходы по периодам (например, первый сет)
-            period = int(market_key[0])
-            elem_outcomes["type_name"] = f"{period}H1X2"
-            elem_outcomes["bet_type"] = "MONEYLINE"
-            elem_outcomes["period_number"] = period
-            if pick_type == "1":
-                elem_outcomes["type"] = f"{period}H1"
-                elem_outcomes["team"] = "TEAM1"
-            elif pick_type == "2":
-                elem_outcomes["type"] = f"{period}H2"
-                elem_outcomes["team"] = "TEAM2"
-            else:
-                elem_outcomes["type"] = "Unknown"
-
-        # elif market_key == "hg":
-        #     # Азиатский гандикап
-        #     elem_outcomes["type_name"] = "Asian Handicap"
-        #     elem_outcomes["bet_type"] = "SPREAD"
-        #     try:
-        #         team, line = pick_type.split('|')
-        #         elem_outcomes["line"] = float(line)
-        #         if team == "1":
-        #             elem_outcomes["type"] = "AH1"
-        #             elem_outcomes["team"] = "TEAM1"
-        #         elif team == "2":
-        #             elem_outcomes["type"] = "AH2"
-        #             elem_outcomes["team"] = "TEAM2"
-        #         else:
-        #             elem_outcomes["type"] = "Unknown"
-        #     except ValueError:
-        #         elem_outcomes["type"] = "Unknown"
-        #         elem_outcomes["line"] = 0.0
-
-        # elif market_key == "hs":
-        #     # Азиатский гандикап по сетам
-        #     elem_outcomes["type_name"] = "Asian Handicap"
-        #     elem_outcomes["bet_type"] = "SPREAD"
-        #     try:
-        #         team, line = pick_type.split('|')
-        #         elem_outcomes["line"] = float(line)
-        #         if team == "1":
-        #             elem_outcomes["type"] = "AH1"
-        #             elem_outcomes["team"] = "TEAM1"
-        #         elif team == "2":
-        #             elem_outcomes["type"] = "AH2"
-        #             elem_outcomes["team"] = "TEAM2"
-        #         else:
-        #             elem_outcomes["type"] = "Unknown"
-        #     except ValueError:
-        #         elem_outcomes["type"] = "Unknown"
-        #         elem_outcomes["line"] = 0.0
-
-        elif market_key in ["g", "tg", "GO", "GU"]:
-            # Тотал голов
-            elem_outcomes["type_name"] = "Total Goals"
-            elem_outcomes["bet_type"] = "TOTAL_POINTS"
-            if market_key in ["g", "tg"]:
-                try:
-                    side, line = pick_type.split('|')
-                    elem_outcomes["line"] = float(line)
-                    if side in ["(+)", "+"]:
-                        elem_outcomes["type"] = "O"
-                        elem_outcomes["side"] = "OVER"
-                    elif side in ["(-)", "-"]:
-                        elem_outcomes["type"] = "U"
-                        elem_outcomes["side"] = "UNDER"
-                    else:
-                        elem_outcomes["type"] = "Unknown"
-                except ValueError:
-                    elem_outcomes["type"] = "Unknown"
-                    elem_outcomes["line"] = 0.0
-            else:
-                elem_outcomes["line"] = odd_data.get('special_value', 0.0)
-                if market_key == "GO":
-                    elem_outcomes["type"] = "O"
-                    elem_outcomes["side"] = "OVER"
-                elif market_key == "GU":
-                    elem_outcomes["type"] = "U"
-                    elem_outcomes["side"] = "UNDER"
-
-        elif market_key in ["GTHO", "GTHU", "GTAO", "GTAU"]:
-            # Индивидуальный тотал команды
-            if market_key.startswith("GTH"):
-                elem_outcomes["type_name"] = "Team Total Home"
-                elem_outcomes["team"] = "TEAM1"
-            else:
-                elem_outcomes["type_name"] = "Team Total Away"
-                elem_outcomes["team"] = "TEAM2"
-            elem_outcomes["bet_type"] = "TEAM_TOTAL_POINTS"
-            elem_outcomes["line"] = odd_data.get('special_value', 0.0)
-            if market_key.endswith("O"):
-                elem_outcomes["type"] = market_key
-                elem_outcomes["side"] = "OVER"
-            elif market_key.endswith("U"):
-                elem_outcomes["type"] = market_key
-                elem_outcomes["side"] = "UNDER"
-
-        elif market_key.startswith("1H"):
-            # Ставки на первый период (например, первый тайм)
-            elem_outcomes["period_number"] = 1
-            if market_key == "1H1X2":
-                elem_outcomes["type_name"] = "1H1X2"
-                elem_outcomes["bet_type"] = "MONEYLINE"
-                if pick_type == "1":
-                    elem_outcomes["type"] = "1H1"
-                    elem_outcomes["team"] = "TEAM1"
-                elif pick_type == "2":
-                    elem_outcomes["type"] = "1H2"
-                    elem_outcomes["team"] = "TEAM2"
-                else:
-                    elem_outcomes["type"] = "Unknown"
-            elif market_key in ["1HGO", "1HGU"]:
-                elem_outcomes["type_name"] = "1H Total Goals"
-                elem_outcomes["bet_type"] = "TOTAL_POINTS"
-                elem_outcomes["line"] = odd_data.get('special_value', 0.0)
-                if market_key == "1HGO":
-                    elem_outcomes["type"] = "1HO"
-                    elem_outcomes["side"] = "OVER"
-                elif market_key == "1HGU":
-                    elem_outcomes["type"] = "1HU"
-                    elem_outcomes["side"] = "UNDER"
-
-        else:
-            # Если тип рынка не распознан, оставляем оригинальные данные
-            elem_outcomes["type_name"] = market_key
-            elem_outcomes["type"] = pick_type
-
-        # Если линия не установлена, пытаемся получить ее из odd_data
-        if elem_outcomes["line"] == 0.0:
-            line = odd_data.get('special_value') or odd_data.get('line')
-            if line is not None:
-                try:
-                    elem_outcomes["line"] = float(line)
-                except (ValueError, TypeError):
-                    elem_outcomes["line"] = 0.0
-
-        return elem_outcomes
-
-        # if market_key == "dw":
-        #     elem_outcomes["type_name"] = "Draw"
-        # elif market_key == "fs":
-        #     elem_outcomes["type_name"] = "Full Time Score"
-        # elif market_key == "ht":
-        #     elem_outcomes["type_name"] = "Half Time"
-        # elif market_key == "sh":
-        #     elem_outcomes["type_name"] = "Second Half"
-        # elif market_key == "dc":
-        #     elem_outcomes["type_name"] = "Double Chance"
-        # elif market_key == "oe":
-        #     elem_outcomes["type_name"] = "Odd/Even"
-        # elif market_key == "tg":
-        #     elem_outcomes["type_name"] = "Total Goals"
-        #     if pick_type.endswith('+'):
-        #         try:
-        #             elem_outcomes["line"] = float(pick_type[:-1])
-        #         except ValueError:
-        #             elem_outcomes["line"] = 0.0
-        # elif market_key == "atg":
-        #     elem_outcomes["type_name"] = "Alternative Total Goals"
-        #     if pick_type.endswith('+'):
-        #         try:
-        #             elem_outcomes["line"] = float(pick_type[:-1])
-        #         except ValueError:
-        #             elem_outcomes["line"] = 0.0
-        # elif market_key == "cr":
-        #     elem_outcomes["type_name"] = "Correct Score"
-        #     elem_outcomes["type"] = f"{parts[2]}:{parts[3]}" if len(parts) > 3 else "Unknown"
-        # elif market_key == "gg":
-        #     elem_outcomes["type_name"] = "Both Teams to Score"
-        # elif market_key == "fhg":
-        #     elem_outcomes["type_name"] = "First Half Goals"
-        #     if pick_type.endswith('+'):
-        #         try:
-        #             elem_outcomes["line"] = float(pick_type[:-1])
-        #         except ValueError:
-        #             elem_outcomes["line"] = 0.0
-        # elif market_key == "shg":
-        #     elem_outcomes["type_name"] = "Second Half Goals"
-        #     if pick_type.endswith('+'):
-        #         try:
-        #             elem_outcomes["line"] = float(pick_type[:-1])
-        #         except ValueError:
-        #             elem_outcomes["line"] = 0.0
-        # elif market_key == "1s":  # Победитель 1-го сета
-        #     elem_outcomes["type_name"] = "Set Winner"
-        #     elem_outcomes["set_number"] = 1
-        # elif market_key == "2s":  # Победитель 2-го сета
-        #     elem_outcomes["type_name"] = "Set Winner"
-        #     elem_outcomes["set_number"] = 2
-        # elif market_key == "Full Time Score":  # Победитель матча
-        #     elem_outcomes["type_name"] = "Match Winner"
-        # elif market_key == "hg":  # Гандикап по геймам
-        #     elem_outcomes["type_name"] = "Game Handicap"
-        #     team, line = pick_type.split('|')
-        #     elem_outcomes["type"] = team
-        #     elem_outcomes["line"] = float(line)
-        # elif market_key == "g":  # Тотал геймов
-        #     elem_outcomes["type_name"] = "Total Games"
-        #     side, line = pick_type.split('|')
-        #     elem_outcomes["type"] = side  # '+' или '-'
-        #     elem_outcomes["line"] = float(line)
-        # else:
-        #     # Если тип рынка не распознан, оставляем оригинальные данные
-        #     elem_outcomes["type_name"] = market_key
-        #     elem_outcomes["type"] = pick_type
-
-        # Обрабатываем теннисные рынки
-        # if market_key == "1s" or market_key == "2s":
-        #     # Победитель 1-го или 2-го сета
-        #     elem_outcomes["type_name"] = "Set Winner"
-        #     elem_outcomes["set_number"] = int(market_key[0])  # Номер сета
-        #     if pick_type == "1":
-        #         elem_outcomes["type"] = "1"
-        #     elif pick_type == "2":
-        #         elem_outcomes["type"] = "2"
-        #     else:
-        #         elem_outcomes["type"] = "Unknown"
-        #
-        # elif market_key == "fs":
-        #     # Победитель матча
-        #     elem_outcomes["type_name"] = "Match Winner"
-        #     if pick_type == "1":
-        #         elem_outcomes["type"] = "1"
-        #     elif pick_type == "2":
-        #         elem_outcomes["type"] = "2"
-        #     else:
-        #         elem_outcomes["type"] = "Unknown"
-        #
-        # elif market_key == "hg":
-        #     # Гандикап по геймам
-        #     elem_outcomes["type_name"] = "Game Handicap"
-        #     try:
-        #         team, line = pick_type.split('|')
-        #         elem_outcomes["type"] = f"AH{team}"
-        #         elem_outcomes["line"] = float(line)
-        #     except ValueError:
-        #         elem_outcomes["type"] = "Unknown"
-        #         elem_outcomes["line"] = 0.0
-        #
-        # elif market_key == "hs":
-        #     # Гандикап по сетам
-        #     elem_outcomes["type_name"] = "Set Handicap"
-        #     try:
-        #         team, line = pick_type.split('|')
-        #         elem_outcomes["type"] = f"AH{team}"
-        #         elem_outcomes["line"] = float(line)
-        #     except ValueError:
-        #         elem_outcomes["type"] = "Unknown"
-        #         elem_outcomes["line"] = 0.0
-        #
-        # elif market_key == "g":
-        #     # Тотал геймов
-        #     elem_outcomes["type_name"] = "Total Games"
-        #     try:
-        #         side, line = pick_type.split('|')
-        #         if side == "(+)":
-        #             elem_outcomes["type"] = "O"  # Over
-        #         elif side == "(-)":
-        #             elem_outcomes["type"] = "U"  # Under
-        #         else:
-        #             elem_outcomes["type"] = "Unknown"
-        #         elem_outcomes["line"] = float(line)
-        #     except ValueError:
-        #         elem_outcomes["type"] = "Unknown"
-        #         elem_outcomes["line"] = 0.0
-        #
-        # elif market_key == "cr":
-        #     # Точный счет
-        #     elem_outcomes["type_name"] = "Correct Score"
-        #     if len(parts) >= 4:
-        #         score = f"{parts[2]}:{parts[3]}"
-        #         elem_outcomes["type"] = score
-        #     else:
-        #         elem_outcomes["type"] = pick_type
-        #
-        # # Добавьте другие рынки при необходимости
-        #
-        # elif market_key in ["GTHO", "GTHU", "GTAO", "GTAU"]:
-        #     # Индивидуальный тотал по геймам
-        #     if market_key.startswith("GTH"):
-        #         elem_outcomes["type_name"] = "Team Total Home"
-        #     else:
-        #         elem_outcomes["type_name"] = "Team Total Away"
-        #     elem_outcomes["type"] = market_key
-        #     elem_outcomes["line"] = float(odd_data.get('special_value', 0.0))
-        #
-        # else:
-        #     # Если тип рынка не распознан, оставляем оригинальные данные
-        #     elem_outcomes["type_name"] = market_key
-        #     elem_outcomes["type"] = pick_type
-        #
-        # return elem_outcomes
+        return prematch_converter.convert(odd_key, odd_data)
 
     def convert_datetime_to_timestamp(self, datetime_str: str, offset_hours: int = 0) -> float:
         try:
@@ -627,6 +248,10 @@ class PreMatchOddsParser:
         return dt.timestamp()
 
     async def get_prematch_odds(self) -> Dict[str, Dict]:
+        # Каждый цикл начинаем с чистых словарей: матчи, пропавшие из выдачи,
+        # не должны накапливаться (вытеснением занимается клиент)
+        self.ALL_MATCHES = {}
+        self.parsed_matches = {}
         timeout = ClientTimeout(total=15)
         connector = TCPConnector(limit_per_host=5)
         async with ClientSession(headers=self.HEADERS, timeout=timeout, connector=connector) as session:
@@ -1,10 +1,83 @@
 import re
-from typing import Tuple, Optional
-from geopy.geocoders import Nominatim
 from functools import lru_cache
-
-# Инициализируем геокодер с параметром для английского языка
-geolocator = Nominatim(user_agent="tennis_league_processor")
+from typing import Tuple, Optional
+from parsers.maxbet.gazetteer import CityGazetteer
+from parsers.normalizer import RuleNormalizer
+
+# Офлайн-справочник городов: не обращается к сети в потоке парсинга
+gazetteer = CityGazetteer()
+
+
+# Словарь замены для лиг (футбол), компилируется в одно выражение
+FOOTBALL_LEAGUE_RULES = RuleNormalizer({
+    r'\bMsfl\b': 'Liga MSFL',
+    r'\bCfl\b': 'Liga CFL',
+    r'\bQual\.?\b': 'Qualifiers',
+    r'\bWc\b': 'World Cup',
+    r'\bS\.?america\b': 'South America',
+    r'\bEfl\b': 'EFL',
+    r'\bwe\b': 'Women Empowerment',
+    r'\bVietnam 2\b': 'Vietnam - V League 2',
+    r'\bEngland 4\b': 'England - League 2',
+    r'\bEngland 6 south\b': 'England - National League South',
+    r'\bEngland 7 isthmian\b': 'England - Isthmian Premier League',
+    r'\bEngland EFL trophy\b': 'England - EFL Trophy',
+    r'\bUruguay 1\b': 'Uruguay - Primera Division',
+    r'\bVietnam 1\b': 'Vietnam - V League',
+    r'\bAlgeria 2\b': 'Algeria - Ligue 2',
+    r'\bColombia 1 - quadrangular\b': 'Colombia - Primera A',
+    r'\bCosta rica 1\b': 'Costa Rica - Primera Division',
+    r'\bEngland 7 southern\b': 'England - Southern Premier League',
+    # Новые пары замен
+    r'\bUEFA Champions League Women\b': 'UEFA - Champions League Women',
+    r'\bAlbania Cup\b': 'Albania - Cup',
+    r'\bArgentina Primera C\b': 'Argentina - Primera C Metropolitana',
+    r'\bArmenia 1\b': 'Armenia - Premier League',
+    r'\bBolivia 1\b': 'Bolivia - Primera Division',
+    r'\bBosnia & Herz\.? 1\b': 'Bosnia and Herzegovina - Premier Liga',
+    r'\bBrazil 1\b': 'Brazil - Serie A',
+    r'\bBrazil Camp\.? Carioca B2\b': 'Brazil - Carioca B2',
+    r'\bChile Cup\b': 'Chile - Cup',
+    r'\bCroatia Cup\b': 'Croatia - Cup',
+    r'\bEngland Premier League Cup\b': 'England - Premier League Cup U21',
+    r'\bEngland Women\'?s? League Cup\b': 'England - League Cup Women',
+    r'\bGermany 4 North\b': 'Germany - Regionalliga North',
+    r'\bCoppa Italia Serie D\b': 'Italy - Serie D Cup',
+    r'\bLatvia 1 - Relegation\b': 'Latvia - Virsliga',
+    r'\bMexico Liga Mx U23\b': 'Mexico - U23 League',
+    r'\bSaudi Arabia 2\b': 'Saudi Arabia - Division 1',
+    r'\bSerbia 2\b': 'Serbia - Prva Liga',
+    r'\bSpain 2\b': 'Spain - Segunda Division',
+    r'\bSpain 4 - Group 3\b': 'Spain - Segunda RFEF Group 3',
+    r'\bSpain Tercera Rfef - Group \d+\b': 'Spain - Tercera Division',
+    r'\bSpain Copa - Women\b': 'Spain - Cup Women',
+    r'\bUganda 1\b': 'Uganda - Premier League',
+    r'\bWales 1\b': 'Wales - Premier League',
+    # Динамическая замена для Algeria U21 League X
+    r'\bAlgeria U21 League (\d+)\b': r'Algeria - Ligue \1',
+    # Новые лиги:
+    r'\bGermany 1\b': 'Germany - Bundesliga',
+    r'\bSpain 1\b': 'Spain - La Liga',
+    r'\bFrance 1\b': 'France - Ligue 1',
+    r'\bSerbia 1\b': 'Serbia - Super Liga',
+    r'\bAlgeria 1\b': 'Algeria - Ligue 1',
+    r'\bAustralia 1 - Women\b': 'Australia - A-League Women',
+    r'\bAustralia 1\b': 'Australia - A League',
+})
+
+# Обработка 'Rep.' и 'Rep. X' для футбола
+REPUBLIC_RULES = RuleNormalizer({
+    r'\bRep\.\s?(\d)': r'Republic - \1',
+    r'\bRep\.': 'Republic',
+    r'Republic\s?(\d)': r'Republic - \1',
+})
+
+# Замены для названий стран
+COUNTRY_RULES = RuleNormalizer({
+    r'\bCzech\s*Rep\.?\b': 'Czech Republic',
+    r'\bInternational Youth\b': 'Europe',
+    r'\bRussia\b': 'Russian Federation',
+})
 
 
 def process_tennis_team_name(team_name: str) -> str:
@@ -148,9 +221,11 @@ def can_swap_names(home_team: str, away_team: str) -> bool:
     return True
 
 
+@lru_cache(maxsize=4096)
 def process_league_name(league_name: str, sport: str) -> str:
     """
     Обрабатывает название лиги, применяя специальные правила замены.
+    Результат кэшируется по исходному названию и виду спорта.
 
     :param league_name: Исходное название лиги
     :param sport: Вид спорта ('Tennis', 'Football' и т.д.)
@@ -166,70 +241,11 @@ def process_league_name(league_name: str, sport: str) -> str:
             league_name += ' - '
         return league_name
     elif sport.lower() == 'football':
-        # Словарь замены для лиг (футбол)
-        replacements = {
-            r'\bMsfl\b': 'Liga MSFL',
-            r'\bCfl\b': 'Liga CFL',
-            r'\bQual\.?\b': 'Qualifiers',
-            r'\bWc\b': 'World Cup',
-            r'\bS\.?america\b': 'South America',
-            r'\bEfl\b': 'EFL',
-            r'\bwe\b': 'Women Empowerment',
-            r'\bVietnam 2\b': 'Vietnam - V League 2',
-            r'\bEngland 4\b': 'England - League 2',
-            r'\bEngland 6 south\b': 'England - National League South',
-            r'\bEngland 7 isthmian\b': 'England - Isthmian Premier League',
-            r'\bEngland EFL trophy\b': 'England - EFL Trophy',
-            r'\bUruguay 1\b': 'Uruguay - Primera Division',
-            r'\bVietnam 1\b': 'Vietnam - V League',
-            r'\bAlgeria 2\b': 'Algeria - Ligue 2',
-            r'\bColombia 1 - quadrangular\b': 'Colombia - Primera A',
-            r'\bCosta rica 1\b': 'Costa Rica - Primera Division',
-            r'\bEngland 7 southern\b': 'England - Southern Premier League',
-            # Новые пары замен
-            r'\bUEFA Champions League Women\b': 'UEFA - Champions League Women',
-            r'\bAlbania Cup\b': 'Albania - Cup',
-            r'\bArgentina Primera C\b': 'Argentina - Primera C Metropolitana',
-            r'\bArmenia 1\b': 'Armenia - Premier League',
-            r'\bBolivia 1\b': 'Bolivia - Primera Division',
-            r'\bBosnia & Herz\.? 1\b': 'Bosnia and Herzegovina - Premier Liga',
-            r'\bBrazil 1\b': 'Brazil - Serie A',
-            r'\bBrazil Camp\.? Carioca B2\b': 'Brazil - Carioca B2',
-            r'\bChile Cup\b': 'Chile - Cup',
-            r'\bCroatia Cup\b': 'Croatia - Cup',
-            r'\bEngland Premier League Cup\b': 'England - Premier League Cup U21',
-            r'\bEngland Women\'?s? League Cup\b': 'England - League Cup Women',
-            r'\bGermany 4 North\b': 'Germany - Regionalliga North',
-            r'\bCoppa Italia Serie D\b': 'Italy - Serie D Cup',
-            r'\bLatvia 1 - Relegation\b': 'Latvia - Virsliga',
-            r'\bMexico Liga Mx U23\b': 'Mexico - U23 League',
-            r'\bSaudi Arabia 2\b': 'Saudi Arabia - Division 1',
-            r'\bSerbia 2\b': 'Serbia - Prva Liga',
-            r'\bSpain 2\b': 'Spain - Segunda Division',
-            r'\bSpain 4 - Group 3\b': 'Spain - Segunda RFEF Group 3',
-            r'\bSpain Tercera Rfef - Group \d+\b': 'Spain - Tercera Division',
-            r'\bSpain Copa - Women\b': 'Spain - Cup Women',
-            r'\bUganda 1\b': 'Uganda - Premier League',
-            r'\bWales 1\b': 'Wales - Premier League',
-            # Динамическая замена для Algeria U21 League X
-            r'\bAlgeria U21 League (\d+)\b': r'Algeria - Ligue \1',
-            # Новые лиги:
-            r'\bGermany 1\b': 'Germany - Bundesliga',
-            r'\bSpain 1\b': 'Spain - La Liga',
-            r'\bFrance 1\b': 'France - Ligue 1',
-            r'\bSerbia 1\b': 'Serbia - Super Liga',
-            r'\bAlgeria 1\b': 'Algeria - Ligue 1',
-            r'\bAustralia 1 - Women\b': 'Australia - A-League Women',
-            r'\bAustralia 1\b': 'Australia - A League',
-        }
-
-        # Применяем замены из словаря
-        for pattern, replacement in replacements.items():
-            league_name = re.sub(pattern, replacement, league_name, flags=re.IGNORECASE)
+        # Применяем замены из словаря (одним проходом)
+        league_name = FOOTBALL_LEAGUE_RULES.apply(league_name)
 
         # Обработка 'Rep.' и 'Rep. X' для футбола
-        league_name = re.sub(r'\bRep\.', 'Republic', league_name, flags=re.IGNORECASE)
-        league_name = re.sub(r'Republic\s?(\d)', r'Republic - \1', league_name, flags=re.IGNORECASE)
+        league_name = REPUBLIC_RULES.apply(league_name)
 
         # Удаляем повторяющиеся слова
         words = league_name.split()
@@ -273,6 +289,7 @@ def process_league_name(league_name: str, sport: str) -> str:
         return league_name
 
 
+@lru_cache(maxsize=1024)
 def process_country_name(country_name: str) -> str:
     """
     Обрабатывает название страны, применяя специальные правила замены.
@@ -283,9 +300,7 @@ def process_country_name(country_name: str) -> str:
     country_name = country_name.strip().lower()
 
     # Применяем регулярные выражения для замены
-    country_name = re.sub(r'\bCzech\s*Rep\.?\b', 'Czech Republic', country_name, flags=re.IGNORECASE)
-    country_name = re.sub(r'\bInternational Youth\b', 'Europe', country_name, flags=re.IGNORECASE)
-    country_name = re.sub(r'\bRussia\b', 'Russian Federation', country_name, flags=re.IGNORECASE)
+    country_name = COUNTRY_RULES.apply(country_name)
 
     # Восстанавливаем регистр первой буквы каждого слова
     country_name = ' '.join(word.capitalize() for word in country_name.split())
@@ -325,21 +340,12 @@ def extract_city_from_league_name(league_name: str) -> Optional[str]:
     return None
 
 
-@lru_cache(maxsize=1000)
 def get_country_by_city(city: str) -> str:
     """
-    Получает страну по названию города с помощью geopy.
+    Получает страну по названию города из офлайн-справочника.
+    Неизвестные города геокодируются в фоне и попадают в дисковый кэш.
 
     :param city: Название города
     :return: Страна, в которой находится город
     """
-    location = geolocator.geocode(city, language='en')
-    if location:
-        # Получаем страну из адреса
-        country = location.address.split(",")[-1].strip()
-
-        # Обрабатываем специальные случаи
-        if country == "United States":
-            return "USA"
-        return country
-    return "World"
+    return gazetteer.get_country(city)
@@ -0,0 +1,105 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+# Буквы, которые не раскладываются NFKD на базовую букву и диакритику
+SPECIAL_LETTERS = str.maketrans({
+    'đ': 'dj', 'Đ': 'Dj', 'ø': 'o', 'Ø': 'o', 'ł': 'l', 'Ł': 'l',
+    'ß': 'ss', 'æ': 'ae', 'Æ': 'ae', 'œ': 'oe', 'Œ': 'oe', 'ı': 'i',
+})
+# Пометки Pinnacle у теннисных рынков: "Djokovic (Sets)"
+MARKET_SUFFIX = re.compile(r'\s*\((?:Sets|Games)\)', re.IGNORECASE)
+NON_WORD = re.compile(r'[^a-z0-9/]+')
+
+
+@lru_cache(maxsize=16384)
+def fold(text: Optional[str]) -> str:
+    """
+    Приводит строку к ASCII в нижнем регистре: диакритика снимается
+    ("Đoković" -> "djokovic"), знаки препинания заменяются пробелами,
+    пробелы схлопываются. "/" сохраняется для парных теннисных матчей.
+
+    :param text: Исходная строка
+    :return: Нормализованная строка
+    """
+    if not text:
+        return ''
+    text = MARKET_SUFFIX.sub('', text).translate(SPECIAL_LETTERS)
+    text = unicodedata.normalize('NFKD', text)
+    text = text.encode('ascii', 'ignore').decode('ascii').lower()
+    return ' '.join(NON_WORD.sub(' ', text).split())
+
+
+def sorted_token_key(text: Optional[str]) -> str:
+    """Ключ, не зависящий от порядка слов: "Podgorica Buducnost" == "Buducnost Podgorica"."""
+    return ' '.join(sorted(fold(text).replace('/', ' ').split()))
+
+
+def player_key(name: str) -> str:
+    """
+    Ключ одного теннисиста в форме "фамилия инициал".
+
+    Понимает записи "Novak Djokovic", "Djokovic N.", "N Djokovic" и
+    "Djokovic, Novak": инициалами считаются слова из одной буквы, при
+    запятой фамилия стоит перед ней, иначе фамилия - последнее слово.
+    """
+    if ',' in name:
+        surname, given = name.split(',', 1)
+        surname = fold(surname)
+        given = fold(given).split()
+    else:
+        words = fold(name).split()
+        initials = [word for word in words if len(word) == 1]
+        if initials and len(initials) < len(words):
+            surname = ' '.join(word for word in words if len(word) > 1)
+            given = initials
+        elif len(words) > 1:
+            surname = words[-1]
+            given = words[:-1]
+        else:
+            surname = ' '.join(words)
+            given = []
+    if not given:
+        return surname
+    return f"{surname} {given[0][0]}"
+
+
+def tennis_key(name: Optional[str]) -> str:
+    """Ключ теннисиста или пары ("A / B"), порядок игроков в паре не важен."""
+    if not name:
+        return ''
+    name = MARKET_SUFFIX.sub('', name)
+    players = [player_key(player) for player in name.split('/')
+               if player.strip()]
+    return ' / '.join(sorted(players))
+
+
+@lru_cache(maxsize=16384)
+def team_keys(name: Optional[str], sport: Optional[str]) -> Tuple[str, str]:
+    """(сложенное имя, ключ без учета порядка слов или ключ теннисиста)."""
+    if sport == 'Tennis':
+        return fold(name), tennis_key(name)
+    return fold(name), sorted_token_key(name)
+
+
+def event_keys(home_team: Optional[str], away_team: Optional[str],
+               league: Optional[str], sport: Optional[str]) -> Dict[str, str]:
+    """
+    Канонические ключи события, которые парсер добавляет к матчу ("name_keys").
+
+    home/away - сложенные имена, home_key/away_key - ключи для точного
+    сопоставления (без учета порядка слов, для тенниса "фамилия инициал"),
+    league - сложенное название лиги.
+
+    :return: Словарь ключей
+    """
+    home, home_key = team_keys(home_team, sport)
+    away, away_key = team_keys(away_team, sport)
+    return {
+        'home': home,
+        'away': away,
+        'home_key': home_key,
+        'away_key': away_key,
+        'league': fold(league),
+    }
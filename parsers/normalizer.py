@@ -0,0 +1,63 @@
+import re
+from functools import lru_cache
+from typing import Dict
+
+
+class RuleNormalizer:
+    """
+    Нормализатор строк по словарю правил «регулярное выражение -> замена».
+
+    Все правила компилируются в одно регулярное выражение-альтернацию, так
+    что строка просматривается за один проход вместо отдельного re.sub на
+    каждое правило. Правила применяются слева направо; если в одной позиции
+    подходят несколько правил, срабатывает то, что объявлено раньше (поэтому
+    более длинные шаблоны нужно объявлять перед короткими, например
+    'Australia 1 - Women' перед 'Australia 1'). Замены могут ссылаться на
+    группы своего шаблона (\\1, \\2, ...).
+
+    Результаты кэшируются по исходной строке в ограниченном LRU-кэше.
+    """
+
+    def __init__(self, rules: Dict[str, str], flags: int = re.IGNORECASE,
+                 maxsize: int = 4096):
+        self.rules = dict(rules)
+        self.replacements = {}
+        parts = []
+        group_index = 1
+
+        for pattern, replacement in self.rules.items():
+            inner_groups = re.compile(pattern, flags).groups
+            parts.append(f"({pattern})")
+            if re.search(r'\\\d', replacement):
+                # Переносим номера групп правила в нумерацию общего выражения
+                template = re.sub(
+                    r'\\(\d+)',
+                    lambda m, offset=group_index: f"\\g<{offset + int(m.group(1))}>",
+                    replacement)
+                self.replacements[group_index] = (template, True)
+            else:
+                self.replacements[group_index] = (replacement, False)
+            group_index += 1 + inner_groups
+
+        self.regex = re.compile('|'.join(parts), flags) if parts else None
+        self.normalize = lru_cache(maxsize=maxsize)(self.apply)
+
+    def replace_match(self, match: re.Match) -> str:
+        replacement, is_template = self.replacements[match.lastindex]
+        if is_template:
+            return match.expand(replacement)
+        return replacement
+
+    def apply(self, text: str) -> str:
+        """
+        Применяет все правила к строке без кэширования.
+
+        :param text: Исходная строка
+        :return: Строка после замен
+        """
+        if self.regex is None:
+            return text
+        return self.regex.sub(self.replace_match, text)
+
+    def cache_info(self):
+        return self.normalize.cache_info()
@@ -56,5 +56,10 @@ LOGGING_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
 # Other parameters
 EVENTS_BATCH_SIZE = 100
 
+# Pipelined odds fetching: batches of one cycle are requested concurrently
+# (within RATE_LIMIT), processed as responses arrive and broadcast once
+PIPELINED_BATCHES = True
+MAX_CONCURRENT_BATCHES = 4
+
 
 PRE_MATCH_HOURS_AHEAD = 24
\ No newline at end of file
@@ -4,6 +4,7 @@ import websockets
 
 import config
 from my_utils import *
+from models import to_jsonable
 
 logging.basicConfig(level=getattr(logging, config.LOGGING_LEVEL),
                     format=config.LOGGING_FORMAT)
@@ -29,6 +30,7 @@ class RateLimiter:
                 # Если достигнут лимит, ждем до освобождения места
                 wait_time = self.requests[0] + self.period - now
                 await asyncio.sleep(wait_time)
+                now = time.time()
 
             # Добавляем текущий запрос
             self.requests.append(now)
@@ -55,7 +57,7 @@ class BettingSystem:
             return
 
         logging.info(f"Отправка данных {len(odds_data)}")
-        message = json.dumps(odds_data)
+        message = json.dumps(odds_data, default=to_jsonable)
         await asyncio.gather(
             *[self.send_data_to_client(client, message) for client in
               self.clients]
@@ -84,44 +86,19 @@ class BettingSystem:
                     await asyncio.sleep(0.2)
                     continue
 
-                for i in range(0, len(event_ids), config.EVENTS_BATCH_SIZE):
-                    batch_event_ids = event_ids[
-                                      i:i + config.EVENTS_BATCH_SIZE]
-                    await rate_limiter.acquire()
-
-                    res = await pinMarket.get_events_odds(
-                        sportid=SPORT_IDs[sport],
-                        live=1 if is_live else 0,
-                        eventIds=batch_event_ids,
-                        since=0
-                    )
-                    # print("res:", res)
-
-                    if res and 'leagues' in res:
-                        processed_odds = {}
-                        for league in res.get('leagues', []):
-                            for event in league.get('events', []):
-                                event_id = str(event['id'])
-                                processed_event = process_match_data(event,
-                                                                     is_live)
-                                if processed_event:
-                                    processed_odds[event_id] = processed_event
-
-                        for event_id_ in batch_event_ids:
-                            event_id_ = str(event_id_)
-                            if event_id_ not in processed_odds:
-                                processed_odds[
-                                    event_id_] = process_match_data(
-                                    {"id": int(event_id_)}, is_live
-                                )
-                        # print(processed_odds)
-                        await self.broadcast_odds(processed_odds)
-
-                        # # Обновление времени последнего обновления для обработанных событий
-                        # for league in res.get('leagues', []):
-                        #     for event in league.get('events', []):
-                        #         self.last_update_time[str(event[
-                        #                                       'id'])] = asyncio.get_event_loop().time()
+                batches = [event_ids[i:i + config.EVENTS_BATCH_SIZE]
+                           for i in range(0, len(event_ids),
+                                          config.EVENTS_BATCH_SIZE)]
+
+                if config.PIPELINED_BATCHES:
+                    await self.fetch_batches_pipelined(
+                        sport, batches, is_live, rate_limiter)
+                else:
+                    for batch_event_ids in batches:
+                        processed_odds = await self.fetch_batch(
+                            sport, batch_event_ids, is_live, rate_limiter)
+                        if processed_odds is not None:
+                            await self.broadcast_odds(processed_odds)
 
             except Exception as e:
                 logging.error(
@@ -133,6 +110,74 @@ class BettingSystem:
             remaining_time = max(0, sleep_time - elapsed_time)
             await asyncio.sleep(remaining_time)
 
+    async def fetch_batch(self, sport: str, batch_event_ids: List[str],
+                          is_live: bool, rate_limiter: RateLimiter):
+        """
+        Запрашивает и обрабатывает коэффициенты одной пачки событий.
+
+        :return: {event_id: данные матча или None} или None, если ответа нет
+        """
+        await rate_limiter.acquire()
+
+        res = await pinMarket.get_events_odds(
+            sportid=SPORT_IDs[sport],
+            live=1 if is_live else 0,
+            eventIds=batch_event_ids,
+            since=0
+        )
+
+        if not res or 'leagues' not in res:
+            return None
+
+        processed_odds = {}
+        for league in res.get('leagues', []):
+            for event in league.get('events', []):
+                event_id = str(event['id'])
+                processed_event = process_match_data(event, is_live)
+                if processed_event:
+                    processed_odds[event_id] = processed_event
+
+        for event_id_ in batch_event_ids:
+            event_id_ = str(event_id_)
+            if event_id_ not in processed_odds:
+                processed_odds[event_id_] = process_match_data(
+                    {"id": int(event_id_)}, is_live
+                )
+        return processed_odds
+
+    async def fetch_batches_pipelined(self, sport: str,
+                                      batches: List[List[str]],
+                                      is_live: bool,
+                                      rate_limiter: RateLimiter):
+        """
+        Запрашивает все пачки цикла параллельно (не больше
+        MAX_CONCURRENT_BATCHES одновременно, с учетом RateLimiter),
+        обрабатывает ответы по мере поступления и рассылает
+        результат цикла одним сообщением.
+        """
+        semaphore = asyncio.Semaphore(config.MAX_CONCURRENT_BATCHES)
+
+        async def run_batch(batch_event_ids):
+            async with semaphore:
+                return await self.fetch_batch(sport, batch_event_ids,
+                                              is_live, rate_limiter)
+
+        cycle_odds = {}
+        tasks = [asyncio.create_task(run_batch(batch)) for batch in batches]
+        for future in asyncio.as_completed(tasks):
+            try:
+                processed_odds = await future
+            except Exception as e:
+                logging.error(
+                    f"Ошибка при получении пачки коэффициентов для {sport}: {e}",
+                    exc_info=True)
+                continue
+            if processed_odds:
+                cycle_odds.update(processed_odds)
+
+        if cycle_odds:
+            await self.broadcast_odds(cycle_odds)
+
     def get_all_event_ids(self, sport: str, is_live: bool) -> List[str]:
         global matches_data, matches_data_live
         if is_live:
@@ -14,6 +14,8 @@ import os
 import json
 
 from parsers.utils import save_odds_to_jsonl
+from parsers.name_keys import event_keys
+from models import Outcome
 
 SPORT_IDs = {
     'Football': 29,
@@ -104,17 +106,100 @@ def calculate_margin(odds):
     return sum(1 / o for o in odds.values()) if odds else None
 
 
+def parse_starts(starts):
+    """Converts Pinnacle ISO start time to a timestamp (None if invalid)."""
+    if not starts:
+        return None
+    try:
+        return datetime.fromisoformat(starts.replace('Z', '+00:00')).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+
+def build_event_entry(event):
+    """
+    Precomputes everything process_match_data needs for one fixture:
+    cleaned team names, match type (Sets/Games), start timestamp, league
+    and the canonical name keys.
+    """
+    home_team = event["home"]
+    away_team = event["away"]
+
+    if "Sets" in home_team or "Sets" in away_team:
+        match_type = "Sets"
+    elif "Games" in home_team or "Games" in away_team:
+        match_type = "Games"
+    else:
+        match_type = ""
+
+    home_team = home_team.replace(" (Sets)", "").replace(" (Games)", "")
+    away_team = away_team.replace(" (Sets)", "").replace(" (Games)", "")
+
+    return {
+        "home": event["home"],
+        "away": event["away"],
+        "home_team": home_team,
+        "away_team": away_team,
+        "match_name": f"{home_team} vs {away_team}".replace("/", ""),
+        "match_type": match_type,
+        "bookings": "Bookings" in home_team or "Bookings" in away_team,
+        "start_time": parse_starts(event.get("starts")),
+        "league_id": event.get("league_id"),
+        "league": event.get("league_name"),
+        "country": event.get("country"),
+        "sport": event.get("sport"),
+        "name_keys": event_keys(home_team, away_team, event.get("league_name"),
+                                event.get("sport")),
+    }
+
+
+class EventRegistry:
+    """
+    Index of known fixtures keyed by event_id.
+
+    fetch_and_save_matches / fetch_and_save_matches_live publish the fixtures
+    of one sport at a time; the registry rebuilds the merged index and swaps
+    it in with a single assignment, so lookups need no locks. Prematch
+    fixtures take precedence over live ones, as in the old two-pass lookup.
+    """
+
+    def __init__(self):
+        self.sources = {"PreMatch": {}, "Live": {}}
+        self.events = {}
+        self.lock = threading.Lock()
+
+    def update_sport(self, source, sport, events):
+        """
+        Replaces fixtures of one sport from one source and rebuilds the index.
+
+        :param source: "PreMatch" or "Live"
+        :param sport: Sport name
+        :param events: {event_id: event} as built by process_matches_data
+        """
+        entries = {event_id: build_event_entry(event)
+                   for event_id, event in events.items()}
+        with self.lock:
+            self.sources[source][sport] = entries
+            merged = {}
+            for source_name in ("Live", "PreMatch"):
+                for sport_entries in self.sources[source_name].values():
+                    merged.update(sport_entries)
+            self.events = merged
+
+    def get(self, event_id):
+        return self.events.get(event_id)
+
+    def __len__(self):
+        return len(self.events)
+
+
+event_registry = EventRegistry()
+
+
 def get_team_names_by_event_id(event_id):
-    with matches_lock:
-        for sport in matches_data:
-            event = matches_data[sport]["events"].get(event_id)
-            if event:
-                return event["home"], event["away"]
-    with matches_lock_live:
-        for sport in matches_data_live:
-            event = matches_data_live[sport]["events"].get(event_id)
-            if event:
-                return event["home"], event["away"]
+    entry = event_registry.get(event_id)
+    if entry:
+        return entry["home"], entry["away"]
     return None, None
 
 
@@ -124,18 +209,18 @@ def add_outcome(processed_data, outcome_type_name, outcome_type, line, odds,
     """Adds a new outcome to processed_data."""
     if odds is None:
         return
-    processed_data["outcomes"].append({
-        "type_name": outcome_type_name,
-        "type": outcome_type,
-        "line": line,
-        "odds": odds,
-        "line_id": line_id,
-        "alt_line_id": alt_line_id,
-        "period_number": period_number,
-        "team": team,
-        "side": side,
-        "bet_type": bet_type
-    })
+    processed_data["outcomes"].append(Outcome(
+        type_name=outcome_type_name,
+        type=outcome_type,
+        line=line,
+        odds=odds,
+        line_id=line_id,
+        alt_line_id=alt_line_id,
+        period_number=period_number,
+        team=team,
+        side=side,
+        bet_type=bet_type
+    ))
 
 
 def handle_moneyline(processed_data, moneyline, period_prefix, period_number,
@@ -275,75 +360,41 @@ def handle_team_total(processed_data, team_totals, period_prefix,
 
 def process_match_data(event_data, is_live=False):
     event_id = str(event_data["id"])
-    home_team, away_team = get_team_names_by_event_id(event_id)
-    event_info = None
-    sport_ = None
-
-    with matches_lock:
-        for sport in matches_data:
-            event_info = matches_data[sport]["events"].get(event_id)
-            if event_info:
-                sport_ = sport
-                break
+    event_info = event_registry.get(event_id)
 
     if not event_info:
-        with matches_lock_live:
-            for sport in matches_data_live:
-                event_info = matches_data_live[sport]["events"].get(event_id)
-                if event_info:
-                    sport_ = sport
-                    break
-
-    if event_info:
-        league_id = event_info.get("league_id")
-        league_name = event_info.get("league_name")
-        country = event_info.get("country")
-        starts = event_info.get("starts")
-    else:
         logging.warning(
             f"Match with ID {event_id} not found in either matches_data or matches_data_live")
-        league_id = league_name = country = starts = sport_ = None
-
-    if not home_team or not away_team:
         return
 
-    if "Bookings" in home_team or "Bookings" in away_team:
+    if not event_info["home"] or not event_info["away"]:
         return
 
-    # Determine match type without changing the variable 'type'
-    if "Sets" in home_team or "Sets" in away_team:
-        match_type = "Sets"
-    elif "Games" in home_team or "Games" in away_team:
-        match_type = "Games"
-    else:
-        match_type = ""
-
-    # Clean up team names
-    home_team = home_team.replace(" (Sets)", "").replace(" (Games)", "")
-    away_team = away_team.replace(" (Sets)", "").replace(" (Games)", "")
-
-    # Convert start time to timestamp
-    start_timestamp = datetime.fromisoformat(
-        starts.replace('Z', '+00:00')
-    ).timestamp() if starts else None
+    if event_info["bookings"]:
+        return
 
+    start_timestamp = event_info["start_time"]
     if not start_timestamp:
         logging.warning(f"Invalid start time for match {event_id}")
         return
 
+    sport = event_info["sport"]
+    match_type = event_info["match_type"]
+
     processed_data = {
         "event_id": event_id,
-        "match_name": f"{home_team} vs {away_team}".replace("/", ""),
+        "match_name": event_info["match_name"],
         "start_time": start_timestamp,
-        "home_team": home_team,
-        "away_team": away_team,
-        "league_id": league_id,
-        "league": league_name,
-        "country": country,
-        "sport": sport_,
+        "home_team": event_info["home_team"],
+        "away_team": event_info["away_team"],
+        "league_id": event_info["league_id"],
+        "league": event_info["league"],
+        "country": event_info["country"],
+        "sport": sport,
         "type": "PreMatch" if not is_live else "Live",
         "outcomes": [],
         "time": time.time(),
+        "name_keys": event_info["name_keys"],
     }
     # print(event_data)
 
@@ -453,6 +504,8 @@ async def fetch_and_save_matches():
                         matches_data[sport]["leagues"] = leagues
                         matches_data[sport]["events"] = events_filtered
                         print(f"Updated {sport} matches data")
+                    event_registry.update_sport("PreMatch", sport,
+                                                events_filtered)
         except Exception as e:
             logging.error(f"Error fetching matches: {e}")
         await asyncio.sleep(60)
@@ -483,6 +536,7 @@ async def fetch_and_save_matches_live():
                         matches_data_live[sport]["leagues"] = leagues
                         matches_data_live[sport]["events"] = events_day
                         print(f"Updated {sport} matches data")
+                    event_registry.update_sport("Live", sport, events_day)
         except Exception as e:
             logging.error(f"Error fetching matches: {e}")
         await asyncio.sleep(60)
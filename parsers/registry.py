@@ -0,0 +1,136 @@
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+def default_start_time(match: Dict[str, Any]) -> Optional[float]:
+    start_time = match.get('start_time')
+    return start_time if isinstance(start_time, (int, float)) else None
+
+
+class MatchRegistry:
+    """
+    Ограниченный реестр матчей парсера с вытеснением по времени.
+
+    Матч удаляется, если:
+        - парсер не видел его дольше ttl секунд (last-seen);
+        - прошло kickoff_ttl секунд после начала матча (для прематча 0 -
+          матч ушел в лайв, для лайва - заведомо завершенный матч);
+        - реестр превысил max_size (вытесняются давно не обновлявшиеся).
+
+    Матчи хранятся в порядке последнего обновления, поэтому проверка
+    last-seen останавливается на первом свежем матче. Вытесненные матчи
+    передаются в on_evict одним словарем {match_id: match}, чтобы клиент
+    мог опубликовать удаления дальше по цепочке.
+    """
+
+    def __init__(self, name: str, ttl: float, kickoff_ttl: float = None,
+                 max_size: int = 20000,
+                 on_evict: Callable[[Dict[str, Any]], None] = None,
+                 get_start_time: Callable[[Dict[str, Any]], Optional[float]] = default_start_time):
+        self.name = name
+        self.ttl = ttl
+        self.kickoff_ttl = kickoff_ttl
+        self.max_size = max_size
+        self.on_evict = on_evict
+        self.get_start_time = get_start_time
+
+        self.matches: Dict[str, Any] = {}
+        self.last_seen: Dict[str, float] = {}
+        self.evicted = {'ttl': 0, 'kickoff': 0, 'size': 0, 'removed': 0}
+
+    def __len__(self) -> int:
+        return len(self.matches)
+
+    def __contains__(self, match_id: str) -> bool:
+        return match_id in self.matches
+
+    def get(self, match_id: str, default: Any = None) -> Any:
+        return self.matches.get(match_id, default)
+
+    def upsert(self, match_id: str, match: Dict[str, Any], now: float = None):
+        """
+        Добавляет или обновляет матч и отмечает его как только что увиденный.
+
+        :param match_id: ID матча
+        :param match: Данные матча
+        :param now: Текущее время (по умолчанию time.time())
+        """
+        now = time.time() if now is None else now
+        # Переставляем матч в конец, чтобы порядок оставался по last-seen
+        self.matches.pop(match_id, None)
+        self.last_seen.pop(match_id, None)
+        self.matches[match_id] = match
+        self.last_seen[match_id] = now
+
+    def update(self, matches: Dict[str, Any], now: float = None):
+        now = time.time() if now is None else now
+        for match_id, match in matches.items():
+            self.upsert(match_id, match, now)
+
+    def remove(self, match_id: str) -> Optional[Dict[str, Any]]:
+        match = self.matches.pop(match_id, None)
+        self.last_seen.pop(match_id, None)
+        if match is not None:
+            self.evicted['removed'] += 1
+        return match
+
+    def expire(self, now: float = None) -> Dict[str, Any]:
+        """
+        Удаляет устаревшие матчи и сообщает о них через on_evict.
+
+        :param now: Текущее время (по умолчанию time.time())
+        :return: Словарь вытесненных матчей {match_id: match}
+        """
+        now = time.time() if now is None else now
+        evicted = {}
+
+        for match_id, seen in self.last_seen.items():
+            if now - seen <= self.ttl:
+                break
+            evicted[match_id] = 'ttl'
+
+        if self.kickoff_ttl is not None:
+            for match_id, match in self.matches.items():
+                if match_id in evicted:
+                    continue
+                start_time = self.get_start_time(match)
+                if start_time and now - start_time > self.kickoff_ttl:
+                    evicted[match_id] = 'kickoff'
+
+        overflow = len(self.matches) - len(evicted) - self.max_size
+        if overflow > 0:
+            for match_id in self.last_seen:
+                if overflow <= 0:
+                    break
+                if match_id not in evicted:
+                    evicted[match_id] = 'size'
+                    overflow -= 1
+
+        removed = {}
+        for match_id, reason in evicted.items():
+            removed[match_id] = self.matches.pop(match_id)
+            del self.last_seen[match_id]
+            self.evicted[reason] += 1
+
+        if removed:
+            logging.info(f"{self.name}: evicted {len(removed)} matches, "
+                         f"{len(self.matches)} left")
+            if self.on_evict:
+                self.on_evict(removed)
+        return removed
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Копия словаря матчей для сериализации вне блокировки."""
+        return dict(self.matches)
+
+    def stats(self, now: float = None) -> Dict[str, Any]:
+        """Метрики реестра: размер, возраст самого старого матча, вытеснения."""
+        now = time.time() if now is None else now
+        oldest = next(iter(self.last_seen.values()), None)
+        return {
+            'size': len(self.matches),
+            'max_size': self.max_size,
+            'oldest_age': round(now - oldest, 1) if oldest is not None else 0.0,
+            'evicted': dict(self.evicted),
+        }
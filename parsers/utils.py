@@ -2,6 +2,7 @@ import json
 import os
 import struct
 from snappy import snappy
+from models import to_jsonable
 
 
 def save_odds_to_jsonl(match_id, odds_data):
@@ -15,7 +16,7 @@ def save_odds_to_jsonl(match_id, odds_data):
 
     with open(file_name, "ab") as file:
         # Сериализуем данные в JSON и кодируем в UTF-8
-        json_data = json.dumps(odds_data).encode('utf-8')
+        json_data = json.dumps(odds_data, default=to_jsonable).encode('utf-8')
         # Сжимаем данные с помощью snappy
         compressed_odds_data = snappy.compress(json_data)
         # Записываем длину сжатых данных (4 байта, big-endian)